@@ -0,0 +1,177 @@
+#! /usr/bin/python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Static asset bundles of the web interface
+
+The css and js files of the pages are joined in bundles, minified (when
+rcssmin/rjsmin are installed, the '.min.' files are already minified) and
+written to 'static/dist' with the hash of their content in the file name
+and a gzip variant. 'dist/manifest.json' maps every bundle to its file.
+The templates use asset_url('bundle') and the bundles are served with an
+immutable Cache-Control: a new content is a new file name.
+
+The bundles are built by the install (python3 assets.py) or by the first
+request that needs them.
+"""
+
+import collections
+import gzip
+import hashlib
+import inspect
+import io
+import json
+import os
+import re
+from main import app, logger
+
+try:
+    import rcssmin
+except ImportError:
+    rcssmin = None
+
+try:
+    import rjsmin
+except ImportError:
+    rjsmin = None
+
+ASSET_BUNDLES = collections.OrderedDict([
+    ('site.css', ['css/bootstrap.min.css', 'css/bootstrap-theme.min.css',
+                  'css/main.css']),
+    ('head.js', ['js/vendor/modernizr-2.8.3-respond-1.4.2.min.js']),
+    ('vendor.js', ['js/vendor/jquery-1.11.2.js', 'js/vendor/bootstrap.min.js',
+                   'js/vendor/bootbox.min.js']),
+    ('main.js', ['js/main.js']),
+])
+
+ASSET_MIMETYPES = {
+    '.css': 'text/css; charset=utf-8',
+    '.js': 'application/javascript; charset=utf-8',
+}
+
+ASSETS_DIR = 'dist'
+
+# the bundles of every build in the dist folder, 'main.<hash>.js'
+ASSET_FILE_RE = re.compile(r'^\w+\.[0-9a-f]{12}(\.css|\.js)$')
+
+# the source maps are not copied with the bundles
+SOURCE_MAP_RE = re.compile(
+    r'^\s*(/\*# sourceMappingURL=.*\*/|//# sourceMappingURL=.*)\s*$',
+    re.MULTILINE)
+
+_manifest = None
+
+
+def minify_asset(path, source):
+    """
+    :param path: the path of the file, relative to the static folder
+    :param source: the content of the file
+    :return: the minified content
+    """
+    source = SOURCE_MAP_RE.sub('', source)
+    if '.min.' in os.path.basename(path):
+        return source.strip()
+    if path.endswith('.css') and rcssmin is not None:
+        return rcssmin.cssmin(source)
+    if path.endswith('.js') and rjsmin is not None:
+        return rjsmin.jsmin(source)
+    return source
+
+
+def write_asset_file(path, data):
+    """
+    Write a file of the dist folder, the file is replaced at once so the
+    processes serving it never read a partial file
+    :param path: absolute path of the file
+    :param data: the content (bytes)
+    :return:
+    """
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_folder=None):
+    """
+    Build the bundles of ASSET_BUNDLES and the manifest of the dist folder
+    The files of the previous builds are kept, the pages already loaded
+    by the browsers can still request them
+    :param static_folder: the static folder, the app one by default
+    :return: the manifest, dict bundle -> file name
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    static_folder = static_folder or app.static_folder
+    dist_folder = os.path.join(static_folder, ASSETS_DIR)
+    os.makedirs(dist_folder, exist_ok=True)
+
+    manifest = {}
+    for name, paths in ASSET_BUNDLES.items():
+        parts = []
+        for path in paths:
+            with open(os.path.join(static_folder, path),
+                      encoding='utf-8') as f:
+                parts.append(minify_asset(path, f.read()))
+
+        # the statements of a js file can not continue in the next one
+        separator = ';\n' if name.endswith('.js') else '\n'
+        data = separator.join(parts).encode('utf-8')
+
+        stem, ext = os.path.splitext(name)
+        file_name = "{}.{}{}".format(stem,
+                                     hashlib.sha1(data).hexdigest()[:12],
+                                     ext)
+        file_path = os.path.join(dist_folder, file_name)
+        if not os.path.exists(file_path + '.gz'):
+            write_asset_file(file_path, data)
+            # mtime 0, the same bundle always has the same gzip file
+            gz_data = io.BytesIO()
+            with gzip.GzipFile(fileobj=gz_data, mode='wb', compresslevel=9,
+                               mtime=0) as f:
+                f.write(data)
+            write_asset_file(file_path + '.gz', gz_data.getvalue())
+        manifest[name] = file_name
+
+        logger.debug("{}: {} -> {} ({} bytes)".format(
+            current_f_name, name, file_name, len(data)))
+
+    write_asset_file(
+        os.path.join(dist_folder, 'manifest.json'),
+        json.dumps(manifest, indent=2, sort_keys=True).encode('utf-8'))
+    return manifest
+
+
+def get_asset_manifest():
+    """
+    :return: the manifest of the dist folder, the bundles are built if
+        there is no manifest
+    """
+    global _manifest
+    if _manifest is None:
+        manifest_path = os.path.join(app.static_folder, ASSETS_DIR,
+                                     'manifest.json')
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                _manifest = json.load(f)
+        else:
+            _manifest = build_assets()
+    return _manifest
+
+
+@app.template_global()
+def asset_url(name):
+    """
+    :param name: the name of a bundle of ASSET_BUNDLES
+    :return: the url of the current file of the bundle
+    """
+    return "/{}/{}".format(ASSETS_DIR, get_asset_manifest()[name])
+
+
+if __name__ == "__main__":
+    for bundle, bundle_file in sorted(build_assets().items()):
+        print("{}: {}".format(bundle, bundle_file))
@@ -0,0 +1,44 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Per hop accumulators of the incremental analysis (master_iteration_hop
+-- and master_iteration_edge), folded by register_pinger_result with
+-- MASTER_INCREMENTAL_ANALYSIS enabled. Apply it before enabling the
+-- option on a database created without them, 0003 adds their analysis
+-- level
+--
+
+BEGIN;
+
+CREATE TABLE IF NOT EXISTS public.master_iteration_hop (
+    id serial NOT NULL,
+    master_iteration_id integer NOT NULL,
+    hop text NOT NULL,
+    loss_sum double precision DEFAULT 0 NOT NULL,
+    sample_count integer DEFAULT 0 NOT NULL,
+    CONSTRAINT master_iteration_hop_pkey PRIMARY KEY (id),
+    CONSTRAINT master_iteration_hop_iteration_hop_key UNIQUE (master_iteration_id, hop),
+    CONSTRAINT master_iteration_hop_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.master_iteration_hop OWNER TO piponger_user;
+
+CREATE TABLE IF NOT EXISTS public.master_iteration_edge (
+    id serial NOT NULL,
+    master_iteration_id integer NOT NULL,
+    src_hop text NOT NULL,
+    dst_hop text NOT NULL,
+    CONSTRAINT master_iteration_edge_pkey PRIMARY KEY (id),
+    CONSTRAINT master_iteration_edge_iteration_hops_key UNIQUE (master_iteration_id, src_hop, dst_hop),
+    CONSTRAINT master_iteration_edge_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.master_iteration_edge OWNER TO piponger_user;
+
+COMMIT;
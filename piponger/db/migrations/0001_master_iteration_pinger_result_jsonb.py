@@ -0,0 +1,74 @@
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Store master_iteration_pinger.result as jsonb
+
+The old rows contain the python repr of the pinger result (a list of
+dicts with strings and numbers), they are parsed with ast.literal_eval.
+A row that can not be converted aborts the migration: the transaction is
+rolled back and the original column is kept, nothing is lost.
+
+Applied by migrate.py (upgrade is called in its transaction).
+"""
+
+import ast
+import json
+
+# rows fetched and updated at once
+BATCH_SIZE = 1000
+
+
+def convert_result(result):
+    """
+    :param result: the python repr of a pinger result
+    :return: the pinger result as json text
+    """
+    return json.dumps(ast.literal_eval(result))
+
+
+def upgrade(conn):
+    """
+    :param conn: the connection of the migration, not committed here
+    :return:
+    """
+    cursor = conn.cursor()
+    cursor.execute("ALTER TABLE public.master_iteration_pinger "
+                   "ADD COLUMN result_jsonb jsonb")
+
+    # server side cursor, the results are not loaded at once
+    rows = conn.cursor('master_iteration_pinger_result')
+    rows.itersize = BATCH_SIZE
+    rows.execute("SELECT id, result FROM public.master_iteration_pinger "
+                 "WHERE result IS NOT NULL ORDER BY id")
+
+    failed = []
+    while True:
+        batch = rows.fetchmany(BATCH_SIZE)
+        if not batch:
+            break
+
+        converted = []
+        for row_id, result in batch:
+            try:
+                converted.append((convert_result(result), row_id))
+            except (ValueError, SyntaxError, TypeError) as e:
+                failed.append((row_id, str(e)))
+        cursor.executemany(
+            "UPDATE public.master_iteration_pinger SET result_jsonb = %s "
+            "WHERE id = %s", converted)
+    rows.close()
+
+    if failed:
+        raise ValueError(
+            "master_iteration_pinger results not converted (id, error), "
+            "fix or remove them and apply the migration again: {}".format(
+                failed))
+
+    cursor.execute("ALTER TABLE public.master_iteration_pinger "
+                   "DROP COLUMN result")
+    cursor.execute("ALTER TABLE public.master_iteration_pinger "
+                   "RENAME COLUMN result_jsonb TO result")
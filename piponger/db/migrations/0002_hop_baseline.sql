@@ -0,0 +1,26 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Per hop historic baseline (exponentially weighted mean and variance)
+--
+
+BEGIN;
+
+CREATE TABLE public.hop_baseline (
+    id serial NOT NULL,
+    hop text NOT NULL,
+    ewma_mean double precision DEFAULT 0 NOT NULL,
+    ewma_variance double precision DEFAULT 0 NOT NULL,
+    sample_count integer DEFAULT 0 NOT NULL,
+    last_seen_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT hop_baseline_pkey PRIMARY KEY (id),
+    CONSTRAINT hop_baseline_hop_key UNIQUE (hop)
+);
+
+ALTER TABLE public.hop_baseline OWNER TO piponger_user;
+
+COMMIT;
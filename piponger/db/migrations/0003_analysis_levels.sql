@@ -0,0 +1,43 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Multi resolution analysis: the per hop accumulators and the edges are
+-- kept per analysis level (host, subnet, aggregate) and the graph of the
+-- host and aggregate levels is stored in master_iteration_graph
+-- (master_iteration.json_graph keeps the subnet level)
+--
+
+BEGIN;
+
+ALTER TABLE public.master_iteration_hop
+    ADD COLUMN level text DEFAULT 'subnet'::text NOT NULL;
+ALTER TABLE public.master_iteration_hop
+    DROP CONSTRAINT master_iteration_hop_iteration_hop_key;
+ALTER TABLE public.master_iteration_hop
+    ADD CONSTRAINT master_iteration_hop_iteration_hop_key UNIQUE (master_iteration_id, level, hop);
+
+ALTER TABLE public.master_iteration_edge
+    ADD COLUMN level text DEFAULT 'subnet'::text NOT NULL;
+ALTER TABLE public.master_iteration_edge
+    DROP CONSTRAINT master_iteration_edge_iteration_hops_key;
+ALTER TABLE public.master_iteration_edge
+    ADD CONSTRAINT master_iteration_edge_iteration_hops_key UNIQUE (master_iteration_id, level, src_hop, dst_hop);
+
+CREATE TABLE public.master_iteration_graph (
+    id serial NOT NULL,
+    master_iteration_id integer NOT NULL,
+    level text NOT NULL,
+    json_graph text,
+    CONSTRAINT master_iteration_graph_pkey PRIMARY KEY (id),
+    CONSTRAINT master_iteration_graph_iteration_level_key UNIQUE (master_iteration_id, level),
+    CONSTRAINT master_iteration_graph_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.master_iteration_graph OWNER TO piponger_user;
+
+COMMIT;
@@ -0,0 +1,49 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Replays of the analysis with alternate parameter sets, every replay
+-- has its own result set
+--
+
+BEGIN;
+
+CREATE TABLE public.analysis_replay (
+    id serial NOT NULL,
+    status text DEFAULT 'PENDING'::text NOT NULL,
+    parameters jsonb DEFAULT '{}'::jsonb NOT NULL,
+    master_iteration_id integer,
+    start_date timestamp without time zone,
+    end_date timestamp without time zone,
+    iteration_count integer DEFAULT 0 NOT NULL,
+    error_count integer DEFAULT 0 NOT NULL,
+    elapsed_seconds double precision DEFAULT 0 NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    last_updated_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT analysis_replay_pkey PRIMARY KEY (id),
+    CONSTRAINT analysis_replay_status_fkey FOREIGN KEY (status)
+        REFERENCES public.task_status_type(type_id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.analysis_replay OWNER TO piponger_user;
+
+CREATE TABLE public.analysis_replay_result (
+    id serial NOT NULL,
+    analysis_replay_id integer NOT NULL,
+    master_iteration_id integer NOT NULL,
+    problematic_host text,
+    score numeric,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT analysis_replay_result_pkey PRIMARY KEY (id),
+    CONSTRAINT analysis_replay_result_analysis_replay_id_fkey FOREIGN KEY (analysis_replay_id)
+        REFERENCES public.analysis_replay(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    CONSTRAINT analysis_replay_result_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.analysis_replay_result OWNER TO piponger_user;
+
+COMMIT;
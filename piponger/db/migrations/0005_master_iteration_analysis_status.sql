@@ -0,0 +1,23 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Single flight analysis: state of the analysis of every iteration
+-- (NULL: not requested, PENDING, STARTED, SUCCESS or FAILURE)
+--
+
+BEGIN;
+
+ALTER TABLE public.master_iteration ADD COLUMN analysis_status text;
+ALTER TABLE public.master_iteration ADD COLUMN analysis_date timestamp without time zone;
+ALTER TABLE ONLY public.master_iteration
+    ADD CONSTRAINT master_iteration_analysis_status_fkey FOREIGN KEY (analysis_status) REFERENCES public.task_status_type(type_id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+-- the iterations analysed before this migration are not analysed again
+UPDATE public.master_iteration SET analysis_status = 'SUCCESS', analysis_date = now()
+    WHERE json_graph IS NOT NULL;
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Quorum and deadline finalization: the pingers that did not report
+-- before the iteration was finished are set as TIMED_OUT
+--
+
+BEGIN;
+
+INSERT INTO public.pinger_iteration_status_type VALUES ('TIMED_OUT');
+
+COMMIT;
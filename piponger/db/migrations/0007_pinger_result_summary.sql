@@ -0,0 +1,16 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Pinger side pre-aggregation: segmentation requested by the master to
+-- summarize the results of the iteration (NULL: the paths are sent)
+--
+
+BEGIN;
+
+ALTER TABLE public.pinger_iteration ADD COLUMN result_summary jsonb;
+
+COMMIT;
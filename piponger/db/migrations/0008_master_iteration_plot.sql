@@ -0,0 +1,29 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Pre-rendered plots: the png and svg images of the graph of every
+-- iteration, rendered by render_iteration_plot after the analysis
+--
+
+BEGIN;
+
+CREATE TABLE public.master_iteration_plot (
+    id serial NOT NULL,
+    master_iteration_id integer NOT NULL,
+    format text NOT NULL,
+    graph_hash text NOT NULL,
+    data bytea NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT master_iteration_plot_pkey PRIMARY KEY (id),
+    CONSTRAINT master_iteration_plot_iteration_format_key UNIQUE (master_iteration_id, format),
+    CONSTRAINT master_iteration_plot_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.master_iteration_plot OWNER TO piponger_user;
+
+COMMIT;
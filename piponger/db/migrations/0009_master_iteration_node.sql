@@ -0,0 +1,37 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Subgraph index: a row per node of every analysis level of an iteration
+-- with its parent network (the node of the next coarser level) and its
+-- adjacency, the subgraph views only read the nodes they return
+--
+
+BEGIN;
+
+CREATE TABLE public.master_iteration_node (
+    id serial NOT NULL,
+    master_iteration_id integer NOT NULL,
+    level text NOT NULL,
+    node text NOT NULL,
+    parent text,
+    mean double precision NOT NULL,
+    child_count integer DEFAULT 0 NOT NULL,
+    x double precision,
+    y double precision,
+    successors jsonb DEFAULT '[]'::jsonb NOT NULL,
+    predecessors jsonb DEFAULT '[]'::jsonb NOT NULL,
+    CONSTRAINT master_iteration_node_pkey PRIMARY KEY (id),
+    CONSTRAINT master_iteration_node_iteration_node_key UNIQUE (master_iteration_id, level, node),
+    CONSTRAINT master_iteration_node_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.master_iteration_node OWNER TO piponger_user;
+
+CREATE INDEX master_iteration_node_parent_idx ON public.master_iteration_node USING btree (master_iteration_id, level, parent);
+
+COMMIT;
@@ -0,0 +1,31 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Response cache: the serialized (and compressed) responses of the graph
+-- views of the finished iterations
+--
+
+BEGIN;
+
+CREATE TABLE public.master_iteration_response (
+    id serial NOT NULL,
+    master_iteration_id integer NOT NULL,
+    key text NOT NULL,
+    encoding text NOT NULL,
+    etag text NOT NULL,
+    mimetype text NOT NULL,
+    data bytea NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT master_iteration_response_pkey PRIMARY KEY (id),
+    CONSTRAINT master_iteration_response_iteration_key_encoding_key UNIQUE (master_iteration_id, key, encoding),
+    CONSTRAINT master_iteration_response_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE
+);
+
+ALTER TABLE public.master_iteration_response OWNER TO piponger_user;
+
+COMMIT;
@@ -0,0 +1,28 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Master status cache: the last snapshot of the status shown by the home
+-- view, it is computed again when its version is bumped by a registration,
+-- a pinger result or an iteration event
+--
+
+BEGIN;
+
+CREATE TABLE public.master_status (
+    id integer NOT NULL,
+    version integer DEFAULT 0 NOT NULL,
+    snapshot jsonb,
+    snapshot_version integer,
+    snapshot_date timestamp without time zone,
+    CONSTRAINT master_status_pkey PRIMARY KEY (id)
+);
+
+ALTER TABLE public.master_status OWNER TO piponger_user;
+
+INSERT INTO public.master_status (id, version) VALUES (1, 0);
+
+COMMIT;
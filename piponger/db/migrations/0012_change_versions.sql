@@ -0,0 +1,47 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Change versions for the delta sync of the registries and the iterations:
+-- the id of the transaction that created and last changed every row, and
+-- the removed nodes (kept MASTER_DELTA_RETENTION_HOURS)
+--
+
+BEGIN;
+
+ALTER TABLE public.master_iteration
+    ADD COLUMN created_version bigint DEFAULT txid_current() NOT NULL,
+    ADD COLUMN change_version bigint DEFAULT txid_current() NOT NULL;
+
+ALTER TABLE public.registered_pinger_nodes
+    ADD COLUMN created_version bigint DEFAULT txid_current() NOT NULL,
+    ADD COLUMN change_version bigint DEFAULT txid_current() NOT NULL;
+
+ALTER TABLE public.registered_ponger_nodes
+    ADD COLUMN created_version bigint DEFAULT txid_current() NOT NULL,
+    ADD COLUMN change_version bigint DEFAULT txid_current() NOT NULL;
+
+CREATE INDEX master_iteration_change_version_idx ON public.master_iteration USING btree (change_version);
+CREATE INDEX registered_pinger_nodes_change_version_idx ON public.registered_pinger_nodes USING btree (change_version);
+CREATE INDEX registered_ponger_nodes_change_version_idx ON public.registered_ponger_nodes USING btree (change_version);
+
+CREATE TABLE public.master_removed_node (
+    id serial NOT NULL,
+    kind text NOT NULL,
+    address text NOT NULL,
+    api_port integer NOT NULL,
+    change_version bigint DEFAULT txid_current() NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT master_removed_node_pkey PRIMARY KEY (id)
+);
+
+ALTER TABLE public.master_removed_node OWNER TO piponger_user;
+
+CREATE INDEX master_removed_node_change_version_idx ON public.master_removed_node USING btree (change_version);
+
+ALTER TABLE public.master_status ADD COLUMN pruned_version bigint;
+
+COMMIT;
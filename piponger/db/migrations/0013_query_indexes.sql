@@ -0,0 +1,30 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Indexes of the foreign keys and of the status and date filters of the
+-- pinger tasks and of the master, so these queries do not scan the whole
+-- history of tracert, iperf and the iterations
+--
+
+BEGIN;
+
+CREATE INDEX analysis_replay_result_analysis_replay_id_idx ON public.analysis_replay_result USING btree (analysis_replay_id);
+CREATE INDEX iperf_iteration_status_idx ON public.iperf USING btree (pinger_iteration_id, status);
+CREATE INDEX iperf_ponger_port_id_idx ON public.iperf USING btree (ponger_port_id);
+CREATE INDEX master_iteration_created_date_idx ON public.master_iteration USING btree (created_date);
+CREATE INDEX master_iteration_pinger_iteration_status_idx ON public.master_iteration_pinger USING btree (master_iteration_id, status);
+CREATE INDEX master_iteration_pinger_registered_pinger_id_idx ON public.master_iteration_pinger USING btree (registered_pinger_id);
+CREATE INDEX master_iteration_result_master_iteration_id_idx ON public.master_iteration_result USING btree (master_iteration_id);
+CREATE INDEX master_iteration_unfinished_idx ON public.master_iteration USING btree (created_date) WHERE (status <> 'FINISHED'::text);
+CREATE INDEX pinger_iteration_created_date_idx ON public.pinger_iteration USING btree (created_date);
+CREATE INDEX ponger_pinger_iteration_id_idx ON public.ponger USING btree (pinger_iteration_id);
+CREATE INDEX ponger_port_ponger_id_idx ON public.ponger_port USING btree (ponger_id);
+CREATE INDEX tracert_iteration_port_status_idx ON public.tracert USING btree (pinger_iteration_id, ponger_port_id, status);
+CREATE INDEX tracert_pending_idx ON public.tracert USING btree (pinger_iteration_id) WHERE (status = 'PENDING'::text);
+CREATE INDEX tracert_ponger_port_id_idx ON public.tracert USING btree (ponger_port_id);
+
+COMMIT;
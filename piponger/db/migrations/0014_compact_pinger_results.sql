@@ -0,0 +1,30 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Compact pinger results: the paths of the traceroutes (integer addresses
+-- of the hops per source port) and the sums of the iperfs are extracted
+-- when they are stored, the raw outputs are kept compressed in raw_result
+-- (or dropped, PINGER_RAW_RESULT_ENCODING). The result column is only
+-- read for the rows stored before
+--
+
+BEGIN;
+
+ALTER TABLE public.tracert
+    ADD COLUMN paths jsonb,
+    ADD COLUMN raw_encoding text,
+    ADD COLUMN raw_result bytea;
+
+ALTER TABLE public.iperf
+    ADD COLUMN seconds double precision,
+    ADD COLUMN bytes bigint,
+    ADD COLUMN bits_per_second double precision,
+    ADD COLUMN lost_percent double precision,
+    ADD COLUMN raw_encoding text,
+    ADD COLUMN raw_result bytea;
+
+COMMIT;
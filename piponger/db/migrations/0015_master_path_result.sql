@@ -0,0 +1,58 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Normalized pinger results: one row per measured path (pinger, ponger,
+-- ports, loss and bandwidth) in master_path_result, bulk loaded with COPY
+-- when the pinger result is registered. The paths (list of hops) are
+-- stored once in master_path
+--
+
+BEGIN;
+
+CREATE TABLE public.master_path (
+    id serial NOT NULL,
+    path_hash text NOT NULL,
+    hops text[] NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    last_seen_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT master_path_pkey PRIMARY KEY (id),
+    CONSTRAINT master_path_path_hash_key UNIQUE (path_hash)
+);
+
+ALTER TABLE public.master_path OWNER TO piponger_user;
+
+CREATE INDEX master_path_last_seen_date_idx ON public.master_path USING btree (last_seen_date);
+
+CREATE TABLE public.master_path_result (
+    id bigserial NOT NULL,
+    master_iteration_id integer NOT NULL,
+    master_iteration_pinger_id integer NOT NULL,
+    pinger_address text NOT NULL,
+    ponger_address text NOT NULL,
+    src_port integer,
+    dst_port integer,
+    path_id integer NOT NULL,
+    lost_percent double precision,
+    bits_per_second double precision,
+    bytes bigint,
+    seconds double precision,
+    CONSTRAINT master_path_result_pkey PRIMARY KEY (id),
+    CONSTRAINT master_path_result_master_iteration_id_fkey FOREIGN KEY (master_iteration_id)
+        REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    CONSTRAINT master_path_result_master_iteration_pinger_id_fkey FOREIGN KEY (master_iteration_pinger_id)
+        REFERENCES public.master_iteration_pinger(id) ON UPDATE CASCADE ON DELETE CASCADE,
+    CONSTRAINT master_path_result_path_id_fkey FOREIGN KEY (path_id)
+        REFERENCES public.master_path(id) ON UPDATE CASCADE
+);
+
+ALTER TABLE public.master_path_result OWNER TO piponger_user;
+
+CREATE INDEX master_path_result_master_iteration_id_idx ON public.master_path_result USING btree (master_iteration_id, ponger_address);
+CREATE INDEX master_path_result_master_iteration_pinger_id_idx ON public.master_path_result USING btree (master_iteration_pinger_id);
+CREATE INDEX master_path_result_path_id_idx ON public.master_path_result USING btree (path_id);
+
+COMMIT;
@@ -0,0 +1,16 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Last master iteration added to the baseline of every hop, a retried
+-- analysis does not add its iteration again
+--
+
+BEGIN;
+
+ALTER TABLE public.hop_baseline ADD COLUMN last_master_iteration_id integer;
+
+COMMIT;
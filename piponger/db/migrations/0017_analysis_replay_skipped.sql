@@ -0,0 +1,17 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Iterations skipped by a replay (pinger summaries that the parameter set
+-- can not use), with the reason
+--
+
+BEGIN;
+
+ALTER TABLE public.analysis_replay
+    ADD COLUMN skipped_iterations jsonb DEFAULT '[]'::jsonb NOT NULL;
+
+COMMIT;
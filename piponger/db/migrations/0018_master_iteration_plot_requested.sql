@@ -0,0 +1,17 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Date of the last render of the plots requested by /get_result_plot,
+-- the render is enqueued once until it finishes or times out
+--
+
+BEGIN;
+
+ALTER TABLE public.master_iteration
+    ADD COLUMN plot_requested_date timestamp without time zone;
+
+COMMIT;
@@ -0,0 +1,17 @@
+-- Copyright (c) Facebook, Inc. and its affiliates.
+-- All rights reserved.
+--
+-- This source code is licensed under the BSD-style license found in the
+-- LICENSE file in the root directory of this source tree.
+
+--
+-- Number of pinger results of the unfinished iterations when the master
+-- status snapshot was computed, the pinger results do not bump the
+-- master_status version any more
+--
+
+BEGIN;
+
+ALTER TABLE public.master_status ADD COLUMN snapshot_result_count integer;
+
+COMMIT;
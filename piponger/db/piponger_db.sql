@@ -85,6 +85,124 @@ CREATE TABLE public.allocated_pinger_port (
 
 ALTER TABLE public.allocated_pinger_port OWNER TO piponger_user;
 
+--
+-- Name: analysis_replay; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.analysis_replay (
+    id integer NOT NULL,
+    status text DEFAULT 'PENDING'::text NOT NULL,
+    parameters jsonb DEFAULT '{}'::jsonb NOT NULL,
+    master_iteration_id integer,
+    start_date timestamp without time zone,
+    end_date timestamp without time zone,
+    iteration_count integer DEFAULT 0 NOT NULL,
+    error_count integer DEFAULT 0 NOT NULL,
+    elapsed_seconds double precision DEFAULT 0 NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    last_updated_date timestamp without time zone DEFAULT now() NOT NULL,
+    skipped_iterations jsonb DEFAULT '[]'::jsonb NOT NULL
+);
+
+
+ALTER TABLE public.analysis_replay OWNER TO piponger_user;
+
+--
+-- Name: analysis_replay_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.analysis_replay_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.analysis_replay_id_seq OWNER TO piponger_user;
+
+--
+-- Name: analysis_replay_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.analysis_replay_id_seq OWNED BY public.analysis_replay.id;
+
+
+--
+-- Name: analysis_replay_result; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.analysis_replay_result (
+    id integer NOT NULL,
+    analysis_replay_id integer NOT NULL,
+    master_iteration_id integer NOT NULL,
+    problematic_host text,
+    score numeric,
+    created_date timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.analysis_replay_result OWNER TO piponger_user;
+
+--
+-- Name: analysis_replay_result_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.analysis_replay_result_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.analysis_replay_result_id_seq OWNER TO piponger_user;
+
+--
+-- Name: analysis_replay_result_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.analysis_replay_result_id_seq OWNED BY public.analysis_replay_result.id;
+
+
+--
+-- Name: hop_baseline; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.hop_baseline (
+    id integer NOT NULL,
+    hop text NOT NULL,
+    ewma_mean double precision DEFAULT 0 NOT NULL,
+    ewma_variance double precision DEFAULT 0 NOT NULL,
+    sample_count integer DEFAULT 0 NOT NULL,
+    last_seen_date timestamp without time zone DEFAULT now() NOT NULL,
+    last_master_iteration_id integer
+);
+
+
+ALTER TABLE public.hop_baseline OWNER TO piponger_user;
+
+--
+-- Name: hop_baseline_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.hop_baseline_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.hop_baseline_id_seq OWNER TO piponger_user;
+
+--
+-- Name: hop_baseline_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.hop_baseline_id_seq OWNED BY public.hop_baseline.id;
+
+
 --
 -- Name: iperf_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
@@ -110,7 +228,13 @@ CREATE TABLE public.iperf (
     created_date timestamp without time zone DEFAULT now() NOT NULL,
     result text,
     ponger_port_id integer NOT NULL,
-    src_port integer NOT NULL
+    src_port integer NOT NULL,
+    seconds double precision,
+    bytes bigint,
+    bits_per_second double precision,
+    lost_percent double precision,
+    raw_encoding text,
+    raw_result bytea
 );
 
 
@@ -126,7 +250,8 @@ CREATE TABLE public.pinger_iteration (
     status text,
     remote_id text NOT NULL,
     remote_address text NOT NULL,
-    tracert_qty integer DEFAULT 1 NOT NULL
+    tracert_qty integer DEFAULT 1 NOT NULL,
+    result_summary jsonb
 );
 
 
@@ -161,7 +286,12 @@ CREATE TABLE public.master_iteration (
     id integer NOT NULL,
     created_date timestamp without time zone DEFAULT now() NOT NULL,
     status text DEFAULT 'CREATED'::text NOT NULL,
-    json_graph text
+    json_graph text,
+    analysis_status text,
+    analysis_date timestamp without time zone,
+    created_version bigint DEFAULT txid_current() NOT NULL,
+    change_version bigint DEFAULT txid_current() NOT NULL,
+    plot_requested_date timestamp without time zone
 );
 
 
@@ -189,27 +319,25 @@ ALTER SEQUENCE public.master_iteration_id_seq OWNED BY public.master_iteration.i
 
 
 --
--- Name: master_iteration_pinger; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_edge; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.master_iteration_pinger (
+CREATE TABLE public.master_iteration_edge (
     id integer NOT NULL,
-    master_iteration_id integer,
-    registered_pinger_id integer NOT NULL,
-    status text,
-    result text,
-    created_date timestamp without time zone DEFAULT now() NOT NULL,
-    last_updated_date timestamp without time zone DEFAULT now() NOT NULL
+    master_iteration_id integer NOT NULL,
+    level text DEFAULT 'subnet'::text NOT NULL,
+    src_hop text NOT NULL,
+    dst_hop text NOT NULL
 );
 
 
-ALTER TABLE public.master_iteration_pinger OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_edge OWNER TO piponger_user;
 
 --
--- Name: master_iteration_pinger_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_edge_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-CREATE SEQUENCE public.master_iteration_pinger_id_seq
+CREATE SEQUENCE public.master_iteration_edge_id_seq
     START WITH 1
     INCREMENT BY 1
     NO MINVALUE
@@ -217,35 +345,34 @@ CREATE SEQUENCE public.master_iteration_pinger_id_seq
     CACHE 1;
 
 
-ALTER TABLE public.master_iteration_pinger_id_seq OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_edge_id_seq OWNER TO piponger_user;
 
 --
--- Name: master_iteration_pinger_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+-- Name: master_iteration_edge_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-ALTER SEQUENCE public.master_iteration_pinger_id_seq OWNED BY public.master_iteration_pinger.id;
+ALTER SEQUENCE public.master_iteration_edge_id_seq OWNED BY public.master_iteration_edge.id;
 
 
 --
--- Name: master_iteration_result; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_graph; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.master_iteration_result (
+CREATE TABLE public.master_iteration_graph (
     id integer NOT NULL,
     master_iteration_id integer NOT NULL,
-    problematic_host text,
-    created_date timestamp without time zone DEFAULT now() NOT NULL,
-    score numeric
+    level text NOT NULL,
+    json_graph text
 );
 
 
-ALTER TABLE public.master_iteration_result OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_graph OWNER TO piponger_user;
 
 --
--- Name: master_iteration_result_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_graph_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-CREATE SEQUENCE public.master_iteration_result_id_seq
+CREATE SEQUENCE public.master_iteration_graph_id_seq
     START WITH 1
     INCREMENT BY 1
     NO MINVALUE
@@ -253,47 +380,36 @@ CREATE SEQUENCE public.master_iteration_result_id_seq
     CACHE 1;
 
 
-ALTER TABLE public.master_iteration_result_id_seq OWNER TO piponger_user;
-
---
--- Name: master_iteration_result_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
---
-
-ALTER SEQUENCE public.master_iteration_result_id_seq OWNED BY public.master_iteration_result.id;
-
+ALTER TABLE public.master_iteration_graph_id_seq OWNER TO piponger_user;
 
 --
--- Name: pinger_iteration_status_type; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_graph_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.pinger_iteration_status_type (
-    type_id text NOT NULL
-);
-
+ALTER SEQUENCE public.master_iteration_graph_id_seq OWNED BY public.master_iteration_graph.id;
 
-ALTER TABLE public.pinger_iteration_status_type OWNER TO piponger_user;
 
 --
--- Name: ponger; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_hop; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.ponger (
+CREATE TABLE public.master_iteration_hop (
     id integer NOT NULL,
-    address text,
-    created_date timestamp without time zone DEFAULT now() NOT NULL,
-    pinger_iteration_id integer NOT NULL,
-    api_port integer,
-    api_protocol text
+    master_iteration_id integer NOT NULL,
+    level text DEFAULT 'subnet'::text NOT NULL,
+    hop text NOT NULL,
+    loss_sum double precision DEFAULT 0 NOT NULL,
+    sample_count integer DEFAULT 0 NOT NULL
 );
 
 
-ALTER TABLE public.ponger OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_hop OWNER TO piponger_user;
 
 --
--- Name: ponger_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_hop_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-CREATE SEQUENCE public.ponger_id_seq
+CREATE SEQUENCE public.master_iteration_hop_id_seq
     START WITH 1
     INCREMENT BY 1
     NO MINVALUE
@@ -301,35 +417,41 @@ CREATE SEQUENCE public.ponger_id_seq
     CACHE 1;
 
 
-ALTER TABLE public.ponger_id_seq OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_hop_id_seq OWNER TO piponger_user;
 
 --
--- Name: ponger_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+-- Name: master_iteration_hop_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-ALTER SEQUENCE public.ponger_id_seq OWNED BY public.ponger.id;
+ALTER SEQUENCE public.master_iteration_hop_id_seq OWNED BY public.master_iteration_hop.id;
 
 
 --
--- Name: ponger_port; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_node; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.ponger_port (
-    ponger_id integer NOT NULL,
-    src_port_min integer,
+CREATE TABLE public.master_iteration_node (
     id integer NOT NULL,
-    dst_port integer,
-    src_port_max integer
+    master_iteration_id integer NOT NULL,
+    level text NOT NULL,
+    node text NOT NULL,
+    parent text,
+    mean double precision NOT NULL,
+    child_count integer DEFAULT 0 NOT NULL,
+    x double precision,
+    y double precision,
+    successors jsonb DEFAULT '[]'::jsonb NOT NULL,
+    predecessors jsonb DEFAULT '[]'::jsonb NOT NULL
 );
 
 
-ALTER TABLE public.ponger_port OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_node OWNER TO piponger_user;
 
 --
--- Name: ponger_port_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_node_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-CREATE SEQUENCE public.ponger_port_id_seq
+CREATE SEQUENCE public.master_iteration_node_id_seq
     START WITH 1
     INCREMENT BY 1
     NO MINVALUE
@@ -337,36 +459,37 @@ CREATE SEQUENCE public.ponger_port_id_seq
     CACHE 1;
 
 
-ALTER TABLE public.ponger_port_id_seq OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_node_id_seq OWNER TO piponger_user;
 
 --
--- Name: ponger_port_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+-- Name: master_iteration_node_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-ALTER SEQUENCE public.ponger_port_id_seq OWNED BY public.ponger_port.id;
+ALTER SEQUENCE public.master_iteration_node_id_seq OWNED BY public.master_iteration_node.id;
 
 
 --
--- Name: registered_pinger_nodes; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_pinger; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.registered_pinger_nodes (
+CREATE TABLE public.master_iteration_pinger (
     id integer NOT NULL,
-    address text NOT NULL,
-    api_protocol text NOT NULL,
+    master_iteration_id integer,
+    registered_pinger_id integer NOT NULL,
+    status text,
+    result jsonb,
     created_date timestamp without time zone DEFAULT now() NOT NULL,
-    api_port integer NOT NULL,
     last_updated_date timestamp without time zone DEFAULT now() NOT NULL
 );
 
 
-ALTER TABLE public.registered_pinger_nodes OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_pinger OWNER TO piponger_user;
 
 --
--- Name: registrered_ponger_nodes_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_pinger_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-CREATE SEQUENCE public.registrered_ponger_nodes_id_seq
+CREATE SEQUENCE public.master_iteration_pinger_id_seq
     START WITH 1
     INCREMENT BY 1
     NO MINVALUE
@@ -374,29 +497,36 @@ CREATE SEQUENCE public.registrered_ponger_nodes_id_seq
     CACHE 1;
 
 
-ALTER TABLE public.registrered_ponger_nodes_id_seq OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_pinger_id_seq OWNER TO piponger_user;
 
 --
--- Name: registered_ponger_nodes; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_pinger_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.registered_ponger_nodes (
-    id integer DEFAULT nextval('public.registrered_ponger_nodes_id_seq'::regclass) NOT NULL,
-    address text NOT NULL,
-    api_protocol text NOT NULL,
-    created_date timestamp without time zone DEFAULT now() NOT NULL,
-    api_port integer NOT NULL,
-    last_updated_date timestamp without time zone DEFAULT now() NOT NULL
+ALTER SEQUENCE public.master_iteration_pinger_id_seq OWNED BY public.master_iteration_pinger.id;
+
+
+--
+-- Name: master_iteration_plot; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.master_iteration_plot (
+    id integer NOT NULL,
+    master_iteration_id integer NOT NULL,
+    format text NOT NULL,
+    graph_hash text NOT NULL,
+    data bytea NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL
 );
 
 
-ALTER TABLE public.registered_ponger_nodes OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_plot OWNER TO piponger_user;
 
 --
--- Name: registrered_pinger_nodes_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_plot_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-CREATE SEQUENCE public.registrered_pinger_nodes_id_seq
+CREATE SEQUENCE public.master_iteration_plot_id_seq
     START WITH 1
     INCREMENT BY 1
     NO MINVALUE
@@ -404,47 +534,38 @@ CREATE SEQUENCE public.registrered_pinger_nodes_id_seq
     CACHE 1;
 
 
-ALTER TABLE public.registrered_pinger_nodes_id_seq OWNER TO piponger_user;
-
---
--- Name: registrered_pinger_nodes_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
---
-
-ALTER SEQUENCE public.registrered_pinger_nodes_id_seq OWNED BY public.registered_pinger_nodes.id;
-
+ALTER TABLE public.master_iteration_plot_id_seq OWNER TO piponger_user;
 
 --
--- Name: task_status_type; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_plot_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.task_status_type (
-    type_id text NOT NULL
-);
-
+ALTER SEQUENCE public.master_iteration_plot_id_seq OWNED BY public.master_iteration_plot.id;
 
-ALTER TABLE public.task_status_type OWNER TO piponger_user;
 
 --
--- Name: tracert; Type: TABLE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_response; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-CREATE TABLE public.tracert (
+CREATE TABLE public.master_iteration_response (
     id integer NOT NULL,
-    pinger_iteration_id integer,
-    status text,
-    created_date timestamp without time zone DEFAULT now() NOT NULL,
-    result text,
-    ponger_port_id integer NOT NULL
+    master_iteration_id integer NOT NULL,
+    key text NOT NULL,
+    encoding text NOT NULL,
+    etag text NOT NULL,
+    mimetype text NOT NULL,
+    data bytea NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL
 );
 
 
-ALTER TABLE public.tracert OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_response OWNER TO piponger_user;
 
 --
--- Name: tracert_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+-- Name: master_iteration_response_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-CREATE SEQUENCE public.tracert_id_seq
+CREATE SEQUENCE public.master_iteration_response_id_seq
     START WITH 1
     INCREMENT BY 1
     NO MINVALUE
@@ -452,142 +573,776 @@ CREATE SEQUENCE public.tracert_id_seq
     CACHE 1;
 
 
-ALTER TABLE public.tracert_id_seq OWNER TO piponger_user;
+ALTER TABLE public.master_iteration_response_id_seq OWNER TO piponger_user;
 
 --
--- Name: tracert_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+-- Name: master_iteration_response_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-ALTER SEQUENCE public.tracert_id_seq OWNED BY public.tracert.id;
+ALTER SEQUENCE public.master_iteration_response_id_seq OWNED BY public.master_iteration_response.id;
 
 
 --
--- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_result; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.master_iteration ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_id_seq'::regclass);
+CREATE TABLE public.master_iteration_result (
+    id integer NOT NULL,
+    master_iteration_id integer NOT NULL,
+    problematic_host text,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    score numeric
+);
+
 
+ALTER TABLE public.master_iteration_result OWNER TO piponger_user;
 
 --
--- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_result_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.master_iteration_pinger ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_pinger_id_seq'::regclass);
+CREATE SEQUENCE public.master_iteration_result_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
 
 
+ALTER TABLE public.master_iteration_result_id_seq OWNER TO piponger_user;
+
 --
--- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_result_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.master_iteration_result ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_result_id_seq'::regclass);
+ALTER SEQUENCE public.master_iteration_result_id_seq OWNED BY public.master_iteration_result.id;
 
 
 --
--- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+-- Name: master_path; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.pinger_iteration ALTER COLUMN id SET DEFAULT nextval('public.iteration_id_seq'::regclass);
+CREATE TABLE public.master_path (
+    id integer NOT NULL,
+    path_hash text NOT NULL,
+    hops text[] NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    last_seen_date timestamp without time zone DEFAULT now() NOT NULL
+);
+
 
+ALTER TABLE public.master_path OWNER TO piponger_user;
 
 --
--- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+-- Name: master_path_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.ponger ALTER COLUMN id SET DEFAULT nextval('public.ponger_id_seq'::regclass);
+CREATE SEQUENCE public.master_path_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
 
+ALTER TABLE public.master_path_id_seq OWNER TO piponger_user;
 
 --
--- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+-- Name: master_path_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.ponger_port ALTER COLUMN id SET DEFAULT nextval('public.ponger_port_id_seq'::regclass);
+ALTER SEQUENCE public.master_path_id_seq OWNED BY public.master_path.id;
 
 
 --
--- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+-- Name: master_path_result; Type: TABLE; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.registered_pinger_nodes ALTER COLUMN id SET DEFAULT nextval('public.registrered_pinger_nodes_id_seq'::regclass);
+CREATE TABLE public.master_path_result (
+    id bigint NOT NULL,
+    master_iteration_id integer NOT NULL,
+    master_iteration_pinger_id integer NOT NULL,
+    pinger_address text NOT NULL,
+    ponger_address text NOT NULL,
+    src_port integer,
+    dst_port integer,
+    path_id integer NOT NULL,
+    lost_percent double precision,
+    bits_per_second double precision,
+    bytes bigint,
+    seconds double precision
+);
+
+
+ALTER TABLE public.master_path_result OWNER TO piponger_user;
+
+--
+-- Name: master_path_result_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.master_path_result_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.master_path_result_id_seq OWNER TO piponger_user;
+
+--
+-- Name: master_path_result_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.master_path_result_id_seq OWNED BY public.master_path_result.id;
+
+
+--
+-- Name: master_removed_node; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.master_removed_node (
+    id integer NOT NULL,
+    kind text NOT NULL,
+    address text NOT NULL,
+    api_port integer NOT NULL,
+    change_version bigint DEFAULT txid_current() NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.master_removed_node OWNER TO piponger_user;
+
+--
+-- Name: master_removed_node_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.master_removed_node_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.master_removed_node_id_seq OWNER TO piponger_user;
+
+--
+-- Name: master_removed_node_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.master_removed_node_id_seq OWNED BY public.master_removed_node.id;
+
+
+--
+-- Name: master_status; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.master_status (
+    id integer NOT NULL,
+    version integer DEFAULT 0 NOT NULL,
+    snapshot jsonb,
+    snapshot_version integer,
+    snapshot_date timestamp without time zone,
+    pruned_version bigint,
+    snapshot_result_count integer
+);
+
+
+ALTER TABLE public.master_status OWNER TO piponger_user;
+
+--
+-- Name: pinger_iteration_status_type; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.pinger_iteration_status_type (
+    type_id text NOT NULL
+);
+
+
+ALTER TABLE public.pinger_iteration_status_type OWNER TO piponger_user;
+
+--
+-- Name: ponger; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.ponger (
+    id integer NOT NULL,
+    address text,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    pinger_iteration_id integer NOT NULL,
+    api_port integer,
+    api_protocol text
+);
+
+
+ALTER TABLE public.ponger OWNER TO piponger_user;
+
+--
+-- Name: ponger_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.ponger_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.ponger_id_seq OWNER TO piponger_user;
+
+--
+-- Name: ponger_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.ponger_id_seq OWNED BY public.ponger.id;
+
+
+--
+-- Name: ponger_port; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.ponger_port (
+    ponger_id integer NOT NULL,
+    src_port_min integer,
+    id integer NOT NULL,
+    dst_port integer,
+    src_port_max integer
+);
+
+
+ALTER TABLE public.ponger_port OWNER TO piponger_user;
+
+--
+-- Name: ponger_port_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.ponger_port_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.ponger_port_id_seq OWNER TO piponger_user;
+
+--
+-- Name: ponger_port_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.ponger_port_id_seq OWNED BY public.ponger_port.id;
+
+
+--
+-- Name: registered_pinger_nodes; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.registered_pinger_nodes (
+    id integer NOT NULL,
+    address text NOT NULL,
+    api_protocol text NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    api_port integer NOT NULL,
+    last_updated_date timestamp without time zone DEFAULT now() NOT NULL,
+    created_version bigint DEFAULT txid_current() NOT NULL,
+    change_version bigint DEFAULT txid_current() NOT NULL
+);
+
+
+ALTER TABLE public.registered_pinger_nodes OWNER TO piponger_user;
+
+--
+-- Name: registrered_ponger_nodes_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.registrered_ponger_nodes_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.registrered_ponger_nodes_id_seq OWNER TO piponger_user;
+
+--
+-- Name: registered_ponger_nodes; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.registered_ponger_nodes (
+    id integer DEFAULT nextval('public.registrered_ponger_nodes_id_seq'::regclass) NOT NULL,
+    address text NOT NULL,
+    api_protocol text NOT NULL,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    api_port integer NOT NULL,
+    last_updated_date timestamp without time zone DEFAULT now() NOT NULL,
+    created_version bigint DEFAULT txid_current() NOT NULL,
+    change_version bigint DEFAULT txid_current() NOT NULL
+);
+
+
+ALTER TABLE public.registered_ponger_nodes OWNER TO piponger_user;
+
+--
+-- Name: registrered_pinger_nodes_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.registrered_pinger_nodes_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.registrered_pinger_nodes_id_seq OWNER TO piponger_user;
+
+--
+-- Name: registrered_pinger_nodes_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.registrered_pinger_nodes_id_seq OWNED BY public.registered_pinger_nodes.id;
+
+
+--
+-- Name: schema_migration; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.schema_migration (
+    version text NOT NULL,
+    name text NOT NULL,
+    applied_date timestamp without time zone DEFAULT now() NOT NULL
+);
+
+
+ALTER TABLE public.schema_migration OWNER TO piponger_user;
+
+--
+-- Name: task_status_type; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.task_status_type (
+    type_id text NOT NULL
+);
+
+
+ALTER TABLE public.task_status_type OWNER TO piponger_user;
+
+--
+-- Name: tracert; Type: TABLE; Schema: public; Owner: piponger_user
+--
+
+CREATE TABLE public.tracert (
+    id integer NOT NULL,
+    pinger_iteration_id integer,
+    status text,
+    created_date timestamp without time zone DEFAULT now() NOT NULL,
+    result text,
+    ponger_port_id integer NOT NULL,
+    paths jsonb,
+    raw_encoding text,
+    raw_result bytea
+);
+
+
+ALTER TABLE public.tracert OWNER TO piponger_user;
+
+--
+-- Name: tracert_id_seq; Type: SEQUENCE; Schema: public; Owner: piponger_user
+--
+
+CREATE SEQUENCE public.tracert_id_seq
+    START WITH 1
+    INCREMENT BY 1
+    NO MINVALUE
+    NO MAXVALUE
+    CACHE 1;
+
+
+ALTER TABLE public.tracert_id_seq OWNER TO piponger_user;
+
+--
+-- Name: tracert_id_seq; Type: SEQUENCE OWNED BY; Schema: public; Owner: piponger_user
+--
+
+ALTER SEQUENCE public.tracert_id_seq OWNED BY public.tracert.id;
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_pinger ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_pinger_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_result ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_result_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.pinger_iteration ALTER COLUMN id SET DEFAULT nextval('public.iteration_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.ponger ALTER COLUMN id SET DEFAULT nextval('public.ponger_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.ponger_port ALTER COLUMN id SET DEFAULT nextval('public.ponger_port_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.registered_pinger_nodes ALTER COLUMN id SET DEFAULT nextval('public.registrered_pinger_nodes_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.tracert ALTER COLUMN id SET DEFAULT nextval('public.tracert_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_edge ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_edge_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_hop ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_hop_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.hop_baseline ALTER COLUMN id SET DEFAULT nextval('public.hop_baseline_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_graph ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_graph_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.analysis_replay ALTER COLUMN id SET DEFAULT nextval('public.analysis_replay_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.analysis_replay_result ALTER COLUMN id SET DEFAULT nextval('public.analysis_replay_result_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_plot ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_plot_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_node ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_node_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_response ALTER COLUMN id SET DEFAULT nextval('public.master_iteration_response_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_removed_node ALTER COLUMN id SET DEFAULT nextval('public.master_removed_node_id_seq'::regclass);
+
+
+--
+-- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_path ALTER COLUMN id SET DEFAULT nextval('public.master_path_id_seq'::regclass);
 
 
 --
 -- Name: id; Type: DEFAULT; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.tracert ALTER COLUMN id SET DEFAULT nextval('public.tracert_id_seq'::regclass);
+ALTER TABLE ONLY public.master_path_result ALTER COLUMN id SET DEFAULT nextval('public.master_path_result_id_seq'::regclass);
+
+
+--
+-- Data for Name: master_status; Type: TABLE DATA; Schema: public; Owner: piponger_user
+--
+
+INSERT INTO public.master_status (id, version) VALUES (1, 0);
+
+
+--
+-- Data for Name: pinger_iteration_status_type; Type: TABLE DATA; Schema: public; Owner: piponger_user
+--
+
+INSERT INTO public.pinger_iteration_status_type VALUES ('CREATED');
+INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING');
+INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING_TRACEROUTE');
+INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING_IPERF');
+INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING_FINISHING');
+INSERT INTO public.pinger_iteration_status_type VALUES ('FINISHED');
+INSERT INTO public.pinger_iteration_status_type VALUES ('ERROR');
+INSERT INTO public.pinger_iteration_status_type VALUES ('TIMED_OUT');
+
+
+--
+-- Data for Name: schema_migration; Type: TABLE DATA; Schema: public; Owner: piponger_user
+--
+
+INSERT INTO public.schema_migration (version, name) VALUES ('0000', 'master_iteration_accumulators');
+INSERT INTO public.schema_migration (version, name) VALUES ('0001', 'master_iteration_pinger_result_jsonb');
+INSERT INTO public.schema_migration (version, name) VALUES ('0002', 'hop_baseline');
+INSERT INTO public.schema_migration (version, name) VALUES ('0003', 'analysis_levels');
+INSERT INTO public.schema_migration (version, name) VALUES ('0004', 'analysis_replay');
+INSERT INTO public.schema_migration (version, name) VALUES ('0005', 'master_iteration_analysis_status');
+INSERT INTO public.schema_migration (version, name) VALUES ('0006', 'pinger_iteration_timed_out');
+INSERT INTO public.schema_migration (version, name) VALUES ('0007', 'pinger_result_summary');
+INSERT INTO public.schema_migration (version, name) VALUES ('0008', 'master_iteration_plot');
+INSERT INTO public.schema_migration (version, name) VALUES ('0009', 'master_iteration_node');
+INSERT INTO public.schema_migration (version, name) VALUES ('0010', 'master_iteration_response');
+INSERT INTO public.schema_migration (version, name) VALUES ('0011', 'master_status');
+INSERT INTO public.schema_migration (version, name) VALUES ('0012', 'change_versions');
+INSERT INTO public.schema_migration (version, name) VALUES ('0013', 'query_indexes');
+INSERT INTO public.schema_migration (version, name) VALUES ('0014', 'compact_pinger_results');
+INSERT INTO public.schema_migration (version, name) VALUES ('0015', 'master_path_result');
+INSERT INTO public.schema_migration (version, name) VALUES ('0016', 'hop_baseline_last_iteration');
+INSERT INTO public.schema_migration (version, name) VALUES ('0017', 'analysis_replay_skipped');
+INSERT INTO public.schema_migration (version, name) VALUES ('0018', 'master_iteration_plot_requested');
+INSERT INTO public.schema_migration (version, name) VALUES ('0019', 'master_status_result_count');
+
+
+--
+-- Data for Name: task_status_type; Type: TABLE DATA; Schema: public; Owner: piponger_user
+--
+
+INSERT INTO public.task_status_type VALUES ('PENDING');
+INSERT INTO public.task_status_type VALUES ('STARTED');
+INSERT INTO public.task_status_type VALUES ('SUCCESS');
+INSERT INTO public.task_status_type VALUES ('FAILURE');
+INSERT INTO public.task_status_type VALUES ('RETRY');
+INSERT INTO public.task_status_type VALUES ('REVOKED');
+
+
+--
+-- Name: analysis_replay_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.analysis_replay
+    ADD CONSTRAINT analysis_replay_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: analysis_replay_result_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.analysis_replay_result
+    ADD CONSTRAINT analysis_replay_result_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: hop_baseline_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.hop_baseline
+    ADD CONSTRAINT hop_baseline_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: hop_baseline_hop_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.hop_baseline
+    ADD CONSTRAINT hop_baseline_hop_key UNIQUE (hop);
+
+
+--
+-- Name: iperf_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.iperf
+    ADD CONSTRAINT iperf_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: iteration_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.pinger_iteration
+    ADD CONSTRAINT iteration_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: iteration_remote_id_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.pinger_iteration
+    ADD CONSTRAINT iteration_remote_id_key UNIQUE (remote_id);
+
+
+--
+-- Name: iteration_type_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.pinger_iteration_status_type
+    ADD CONSTRAINT iteration_type_pkey PRIMARY KEY (type_id);
+
+
+--
+-- Name: master_iteration_edge_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_edge
+    ADD CONSTRAINT master_iteration_edge_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: master_iteration_edge_iteration_hops_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_edge
+    ADD CONSTRAINT master_iteration_edge_iteration_hops_key UNIQUE (master_iteration_id, level, src_hop, dst_hop);
+
+
+--
+-- Name: master_iteration_graph_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_graph
+    ADD CONSTRAINT master_iteration_graph_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: master_iteration_graph_iteration_level_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_graph
+    ADD CONSTRAINT master_iteration_graph_iteration_level_key UNIQUE (master_iteration_id, level);
+
+
+--
+-- Name: master_iteration_hop_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_hop
+    ADD CONSTRAINT master_iteration_hop_pkey PRIMARY KEY (id);
 
 
 --
--- Data for Name: pinger_iteration_status_type; Type: TABLE DATA; Schema: public; Owner: piponger_user
+-- Name: master_iteration_hop_iteration_hop_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-INSERT INTO public.pinger_iteration_status_type VALUES ('CREATED');
-INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING');
-INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING_TRACEROUTE');
-INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING_IPERF');
-INSERT INTO public.pinger_iteration_status_type VALUES ('RUNNING_FINISHING');
-INSERT INTO public.pinger_iteration_status_type VALUES ('FINISHED');
-INSERT INTO public.pinger_iteration_status_type VALUES ('ERROR');
+ALTER TABLE ONLY public.master_iteration_hop
+    ADD CONSTRAINT master_iteration_hop_iteration_hop_key UNIQUE (master_iteration_id, level, hop);
 
 
 --
--- Data for Name: task_status_type; Type: TABLE DATA; Schema: public; Owner: piponger_user
+-- Name: master_iteration_node_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-INSERT INTO public.task_status_type VALUES ('PENDING');
-INSERT INTO public.task_status_type VALUES ('STARTED');
-INSERT INTO public.task_status_type VALUES ('SUCCESS');
-INSERT INTO public.task_status_type VALUES ('FAILURE');
-INSERT INTO public.task_status_type VALUES ('RETRY');
-INSERT INTO public.task_status_type VALUES ('REVOKED');
+ALTER TABLE ONLY public.master_iteration_node
+    ADD CONSTRAINT master_iteration_node_pkey PRIMARY KEY (id);
 
 
 --
--- Name: iperf_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_node_iteration_node_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.iperf
-    ADD CONSTRAINT iperf_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.master_iteration_node
+    ADD CONSTRAINT master_iteration_node_iteration_node_key UNIQUE (master_iteration_id, level, node);
 
 
 --
--- Name: iteration_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_pinger_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.pinger_iteration
-    ADD CONSTRAINT iteration_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.master_iteration_pinger
+    ADD CONSTRAINT master_iteration_pinger_pkey PRIMARY KEY (id);
 
 
 --
--- Name: iteration_remote_id_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.pinger_iteration
-    ADD CONSTRAINT iteration_remote_id_key UNIQUE (remote_id);
+ALTER TABLE ONLY public.master_iteration
+    ADD CONSTRAINT master_iteration_pkey PRIMARY KEY (id);
 
 
 --
--- Name: iteration_type_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_plot_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.pinger_iteration_status_type
-    ADD CONSTRAINT iteration_type_pkey PRIMARY KEY (type_id);
+ALTER TABLE ONLY public.master_iteration_plot
+    ADD CONSTRAINT master_iteration_plot_pkey PRIMARY KEY (id);
 
 
 --
--- Name: master_iteration_pinger_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_plot_iteration_format_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.master_iteration_pinger
-    ADD CONSTRAINT master_iteration_pinger_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.master_iteration_plot
+    ADD CONSTRAINT master_iteration_plot_iteration_format_key UNIQUE (master_iteration_id, format);
 
 
 --
--- Name: master_iteration_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+-- Name: master_iteration_response_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
 
-ALTER TABLE ONLY public.master_iteration
-    ADD CONSTRAINT master_iteration_pkey PRIMARY KEY (id);
+ALTER TABLE ONLY public.master_iteration_response
+    ADD CONSTRAINT master_iteration_response_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: master_iteration_response_iteration_key_encoding_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_response
+    ADD CONSTRAINT master_iteration_response_iteration_key_encoding_key UNIQUE (master_iteration_id, key, encoding);
 
 
 --
@@ -598,6 +1353,46 @@ ALTER TABLE ONLY public.master_iteration_result
     ADD CONSTRAINT master_iteration_result_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: master_path_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_path
+    ADD CONSTRAINT master_path_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: master_path_path_hash_key; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_path
+    ADD CONSTRAINT master_path_path_hash_key UNIQUE (path_hash);
+
+
+--
+-- Name: master_path_result_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_path_result
+    ADD CONSTRAINT master_path_result_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: master_removed_node_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_removed_node
+    ADD CONSTRAINT master_removed_node_pkey PRIMARY KEY (id);
+
+
+--
+-- Name: master_status_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_status
+    ADD CONSTRAINT master_status_pkey PRIMARY KEY (id);
+
+
 --
 -- Name: pinger_port_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
@@ -654,6 +1449,14 @@ ALTER TABLE ONLY public.registered_ponger_nodes
     ADD CONSTRAINT registrered_ponger_nodes_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: schema_migration_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.schema_migration
+    ADD CONSTRAINT schema_migration_pkey PRIMARY KEY (version);
+
+
 --
 -- Name: status_type_pkey; Type: CONSTRAINT; Schema: public; Owner: piponger_user
 --
@@ -670,6 +1473,191 @@ ALTER TABLE ONLY public.tracert
     ADD CONSTRAINT tracert_pkey PRIMARY KEY (id);
 
 
+--
+-- Name: analysis_replay_result_analysis_replay_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX analysis_replay_result_analysis_replay_id_idx ON public.analysis_replay_result USING btree (analysis_replay_id);
+
+
+--
+-- Name: iperf_iteration_status_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX iperf_iteration_status_idx ON public.iperf USING btree (pinger_iteration_id, status);
+
+
+--
+-- Name: iperf_ponger_port_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX iperf_ponger_port_id_idx ON public.iperf USING btree (ponger_port_id);
+
+
+--
+-- Name: master_iteration_change_version_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_iteration_change_version_idx ON public.master_iteration USING btree (change_version);
+
+
+--
+-- Name: master_iteration_created_date_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_iteration_created_date_idx ON public.master_iteration USING btree (created_date);
+
+
+--
+-- Name: master_iteration_node_parent_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_iteration_node_parent_idx ON public.master_iteration_node USING btree (master_iteration_id, level, parent);
+
+
+--
+-- Name: master_iteration_pinger_iteration_status_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_iteration_pinger_iteration_status_idx ON public.master_iteration_pinger USING btree (master_iteration_id, status);
+
+
+--
+-- Name: master_iteration_pinger_registered_pinger_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_iteration_pinger_registered_pinger_id_idx ON public.master_iteration_pinger USING btree (registered_pinger_id);
+
+
+--
+-- Name: master_iteration_result_master_iteration_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_iteration_result_master_iteration_id_idx ON public.master_iteration_result USING btree (master_iteration_id);
+
+
+--
+-- Name: master_iteration_unfinished_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_iteration_unfinished_idx ON public.master_iteration USING btree (created_date) WHERE (status <> 'FINISHED'::text);
+
+
+--
+-- Name: master_path_last_seen_date_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_path_last_seen_date_idx ON public.master_path USING btree (last_seen_date);
+
+
+--
+-- Name: master_path_result_master_iteration_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_path_result_master_iteration_id_idx ON public.master_path_result USING btree (master_iteration_id, ponger_address);
+
+
+--
+-- Name: master_path_result_master_iteration_pinger_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_path_result_master_iteration_pinger_id_idx ON public.master_path_result USING btree (master_iteration_pinger_id);
+
+
+--
+-- Name: master_path_result_path_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_path_result_path_id_idx ON public.master_path_result USING btree (path_id);
+
+
+--
+-- Name: master_removed_node_change_version_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX master_removed_node_change_version_idx ON public.master_removed_node USING btree (change_version);
+
+
+--
+-- Name: pinger_iteration_created_date_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX pinger_iteration_created_date_idx ON public.pinger_iteration USING btree (created_date);
+
+
+--
+-- Name: ponger_pinger_iteration_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX ponger_pinger_iteration_id_idx ON public.ponger USING btree (pinger_iteration_id);
+
+
+--
+-- Name: ponger_port_ponger_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX ponger_port_ponger_id_idx ON public.ponger_port USING btree (ponger_id);
+
+
+--
+-- Name: registered_pinger_nodes_change_version_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX registered_pinger_nodes_change_version_idx ON public.registered_pinger_nodes USING btree (change_version);
+
+
+--
+-- Name: registered_ponger_nodes_change_version_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX registered_ponger_nodes_change_version_idx ON public.registered_ponger_nodes USING btree (change_version);
+
+
+--
+-- Name: tracert_iteration_port_status_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX tracert_iteration_port_status_idx ON public.tracert USING btree (pinger_iteration_id, ponger_port_id, status);
+
+
+--
+-- Name: tracert_pending_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX tracert_pending_idx ON public.tracert USING btree (pinger_iteration_id) WHERE (status = 'PENDING'::text);
+
+
+--
+-- Name: tracert_ponger_port_id_idx; Type: INDEX; Schema: public; Owner: piponger_user
+--
+
+CREATE INDEX tracert_ponger_port_id_idx ON public.tracert USING btree (ponger_port_id);
+
+
+--
+-- Name: analysis_replay_status_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.analysis_replay
+    ADD CONSTRAINT analysis_replay_status_fkey FOREIGN KEY (status) REFERENCES public.task_status_type(type_id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: analysis_replay_result_analysis_replay_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.analysis_replay_result
+    ADD CONSTRAINT analysis_replay_result_analysis_replay_id_fkey FOREIGN KEY (analysis_replay_id) REFERENCES public.analysis_replay(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: analysis_replay_result_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.analysis_replay_result
+    ADD CONSTRAINT analysis_replay_result_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
 --
 -- Name: iperf_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
 --
@@ -702,6 +1690,46 @@ ALTER TABLE ONLY public.pinger_iteration
     ADD CONSTRAINT iteration_status_fkey1 FOREIGN KEY (status) REFERENCES public.pinger_iteration_status_type(type_id) ON UPDATE CASCADE ON DELETE CASCADE;
 
 
+--
+-- Name: master_iteration_analysis_status_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration
+    ADD CONSTRAINT master_iteration_analysis_status_fkey FOREIGN KEY (analysis_status) REFERENCES public.task_status_type(type_id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: master_iteration_edge_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_edge
+    ADD CONSTRAINT master_iteration_edge_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: master_iteration_graph_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_graph
+    ADD CONSTRAINT master_iteration_graph_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: master_iteration_hop_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_hop
+    ADD CONSTRAINT master_iteration_hop_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: master_iteration_node_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_node
+    ADD CONSTRAINT master_iteration_node_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
 --
 -- Name: master_iteration_pinger_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
 --
@@ -726,6 +1754,22 @@ ALTER TABLE ONLY public.master_iteration_pinger
     ADD CONSTRAINT master_iteration_pinger_status_fkey FOREIGN KEY (status) REFERENCES public.pinger_iteration_status_type(type_id) ON UPDATE CASCADE ON DELETE CASCADE;
 
 
+--
+-- Name: master_iteration_plot_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_plot
+    ADD CONSTRAINT master_iteration_plot_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: master_iteration_response_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_iteration_response
+    ADD CONSTRAINT master_iteration_response_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
 --
 -- Name: master_iteration_result_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
 --
@@ -742,6 +1786,30 @@ ALTER TABLE ONLY public.master_iteration
     ADD CONSTRAINT master_iteration_status_fkey FOREIGN KEY (status) REFERENCES public.pinger_iteration_status_type(type_id);
 
 
+--
+-- Name: master_path_result_master_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_path_result
+    ADD CONSTRAINT master_path_result_master_iteration_id_fkey FOREIGN KEY (master_iteration_id) REFERENCES public.master_iteration(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: master_path_result_master_iteration_pinger_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_path_result
+    ADD CONSTRAINT master_path_result_master_iteration_pinger_id_fkey FOREIGN KEY (master_iteration_pinger_id) REFERENCES public.master_iteration_pinger(id) ON UPDATE CASCADE ON DELETE CASCADE;
+
+
+--
+-- Name: master_path_result_path_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
+--
+
+ALTER TABLE ONLY public.master_path_result
+    ADD CONSTRAINT master_path_result_path_id_fkey FOREIGN KEY (path_id) REFERENCES public.master_path(id) ON UPDATE CASCADE;
+
+
 --
 -- Name: ponger_iteration_id_fkey; Type: FK CONSTRAINT; Schema: public; Owner: piponger_user
 --
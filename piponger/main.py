@@ -14,6 +14,11 @@ import socket
 from celery import Celery
 from celery.schedules import crontab
 
+try:
+    from orjson import loads as json_loads
+except ImportError:
+    from json import loads as json_loads
+
 
 # define celery object and parameters
 def make_celery(flask_app):
@@ -51,10 +56,15 @@ app.config.from_pyfile('config_default.cfg')
 app.config.from_pyfile('config.cfg')
 app.config.from_envvar('FLASKR_SETTINGS', silent=True)
 
+# decode the JSONB columns with the fastest available parser
+app.config.setdefault('SQLALCHEMY_ENGINE_OPTIONS', {})
+app.config['SQLALCHEMY_ENGINE_OPTIONS'].setdefault(
+    'json_deserializer', json_loads)
+
 app.config['CELERYBEAT_SCHEDULE'] = {
     'finish-old-iterations': {
         'task': 'tasks.master_tasks.finish_old_iterations',
-        'schedule': crontab(minute="*/20"),
+        'schedule': crontab(minute="*/1"),
     },
     'report-to-master': {
         'task': 'tasks.common_tasks.report_to_master',
@@ -64,6 +74,14 @@ app.config['CELERYBEAT_SCHEDULE'] = {
     'remove-old-nodes': {
         'task': 'tasks.master_tasks.remove_old_nodes',
         'schedule': crontab(minute="*/5"),
+    },
+    'remove-old-master-iterations': {
+        'task': 'tasks.master_tasks.remove_old_master_iterations',
+        'schedule': crontab(minute="15"),
+    },
+    'remove-old-pinger-iterations': {
+        'task': 'tasks.common_tasks.remove_old_pinger_iterations',
+        'schedule': crontab(minute="45"),
     }
 }
 
@@ -0,0 +1,389 @@
+#! /usr/bin/python3
+# Copyright (c) Facebook, Inc. and its affiliates.
+# All rights reserved.
+#
+# This source code is licensed under the BSD-style license found in the
+# LICENSE file in the root directory of this source tree.
+
+"""
+Schema migrations of the piponger database
+
+'db/piponger_db.sql' is the schema of a new installation and the scripts
+of 'db/migrations' upgrade the existing databases to it, in the order of
+their version (the 4 digits of the file name). The applied versions are
+recorded in the schema_migration table, the schema of a new installation
+records all of them. A migration is a SQL script or a python module with
+an upgrade(conn) function (data conversions). A database created before
+the schema_migration table gets an empty one, all the migrations are
+applied to it.
+
+    python3 migrate.py               apply the pending migrations
+    python3 migrate.py --status      list the migrations and their state
+    python3 migrate.py --baseline V  record the migrations up to V as
+                                     applied (upgraded by hand with psql)
+    python3 migrate.py --check       compare models.py with piponger_db.sql
+
+Every migration runs in one transaction with the record of its version,
+the migrations of several nodes started at once are serialized by an
+advisory lock.
+"""
+
+import argparse
+import collections
+import importlib.util
+import inspect
+import os
+import re
+import sys
+import sqlalchemy as sa
+from sqlalchemy.dialects import postgresql
+from main import app, logger
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+SCHEMA_PATH = os.path.join(BASE_DIR, 'db', 'piponger_db.sql')
+MIGRATIONS_DIR = os.path.join(BASE_DIR, 'db', 'migrations')
+
+# key of the pg_advisory_lock held while the migrations are applied
+MIGRATION_LOCK_ID = 4711020
+
+MIGRATION_FILE_RE = re.compile(r'^(\d{4})_(\w+)\.(sql|py)$')
+# the migrations are wrapped in BEGIN/COMMIT to be run with psql, the
+# runner makes its own transaction
+TRANSACTION_RE = re.compile(r'^\s*(BEGIN|COMMIT)\s*;\s*$',
+                            re.MULTILINE | re.IGNORECASE)
+
+SCHEMA_MIGRATION_SQL = """
+CREATE TABLE IF NOT EXISTS public.schema_migration (
+    version text NOT NULL,
+    name text NOT NULL,
+    applied_date timestamp without time zone DEFAULT now() NOT NULL,
+    CONSTRAINT schema_migration_pkey PRIMARY KEY (version)
+)"""
+
+TABLE_RE = re.compile(r'^CREATE TABLE public\.(\w+) \(\n(.*?)\n\);',
+                      re.MULTILINE | re.DOTALL)
+CONSTRAINT_RE = re.compile(
+    r'^ALTER TABLE ONLY public\.(\w+)\n'
+    r'    ADD CONSTRAINT (\w+) (PRIMARY KEY|UNIQUE|FOREIGN KEY) \(([^)]*)\)'
+    r'(?: REFERENCES public\.(\w+)\((\w+)\))?', re.MULTILINE)
+INDEX_RE = re.compile(
+    r'^CREATE (?:UNIQUE )?INDEX (\w+) ON public\.(\w+) USING btree '
+    r'\(([^)]*)\)( WHERE .*)?;$', re.MULTILINE)
+SCHEMA_MIGRATION_ROW_RE = re.compile(
+    r"^INSERT INTO public\.schema_migration \(version, name\) "
+    r"VALUES \('(\d{4})', '(\w+)'\);$", re.MULTILINE)
+
+# type names of the schema dump for the compiled types of the models
+SQL_TYPE_NAMES = {
+    'float(53)': 'double precision',
+}
+
+
+def list_migrations(migrations_dir=MIGRATIONS_DIR):
+    """
+    :param migrations_dir: the folder of the migration scripts
+    :return: the migrations in order, list of (version, name, path)
+    """
+    migrations = []
+    for file_name in sorted(os.listdir(migrations_dir)):
+        m = MIGRATION_FILE_RE.match(file_name)
+        if m is None:
+            continue
+        migrations.append((m.group(1), m.group(2),
+                           os.path.join(migrations_dir, file_name)))
+    return migrations
+
+
+def get_applied_migrations(cursor):
+    """
+    :param cursor: a cursor of the database
+    :return: dict version -> applied date, None if the database has no
+        schema_migration table
+    """
+    cursor.execute("SELECT to_regclass('public.schema_migration')")
+    if cursor.fetchone()[0] is None:
+        return None
+    cursor.execute("SELECT version, applied_date FROM public.schema_migration")
+    return dict(cursor.fetchall())
+
+
+def run_migration(conn, path):
+    """
+    Run a migration without committing it
+    :param conn: the connection of the migration
+    :param path: the SQL script or the python module of the migration
+    :return:
+    """
+    if path.endswith('.py'):
+        spec = importlib.util.spec_from_file_location(
+            os.path.splitext(os.path.basename(path))[0], path)
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        module.upgrade(conn)
+        return
+
+    with open(path) as f:
+        conn.cursor().execute(TRANSACTION_RE.sub('', f.read()))
+
+
+def apply_migrations(database_uri=None, baseline=None,
+                     migrations_dir=MIGRATIONS_DIR):
+    """
+    Apply the pending migrations in order
+    :param database_uri: the database, SQLALCHEMY_DATABASE_URI by default
+    :param baseline: record the migrations up to this version as applied
+        without running them (databases upgraded by hand with psql)
+    :param migrations_dir: the folder of the migration scripts
+    :return: the versions applied (or recorded by the baseline)
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    migrations = list_migrations(migrations_dir)
+    if baseline is not None and baseline not in [m[0] for m in migrations]:
+        raise ValueError("unknown migration version: {}".format(baseline))
+
+    engine = sa.create_engine(database_uri or
+                              app.config['SQLALCHEMY_DATABASE_URI'])
+    conn = engine.raw_connection()
+    done = []
+    try:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_advisory_lock(%s)", (MIGRATION_LOCK_ID, ))
+        conn.commit()
+
+        applied = get_applied_migrations(cursor)
+        if applied is None:
+            # created before the schema_migration table, nothing applied
+            logger.info("{}: Creating the schema_migration table".format(
+                current_f_name))
+            cursor.execute(SCHEMA_MIGRATION_SQL)
+            conn.commit()
+            applied = {}
+
+        for version, name, path in migrations:
+            if version in applied:
+                continue
+
+            if baseline is not None:
+                if version > baseline:
+                    break
+                logger.info("{}: Baseline {} {}".format(
+                    current_f_name, version, name))
+            else:
+                logger.info("{}: Applying {} {}".format(
+                    current_f_name, version, name))
+                run_migration(conn, path)
+
+            cursor.execute(
+                "INSERT INTO public.schema_migration (version, name) "
+                "VALUES (%s, %s)", (version, name))
+            # the migration and its version in the same transaction
+            conn.commit()
+            done.append(version)
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        cursor = conn.cursor()
+        cursor.execute("SELECT pg_advisory_unlock(%s)", (MIGRATION_LOCK_ID, ))
+        conn.commit()
+        conn.close()
+        engine.dispose()
+
+    logger.debug("{}: Done: {}".format(current_f_name, done))
+    return done
+
+
+def get_migration_status(database_uri=None, migrations_dir=MIGRATIONS_DIR):
+    """
+    :param database_uri: the database, SQLALCHEMY_DATABASE_URI by default
+    :param migrations_dir: the folder of the migration scripts
+    :return: list of (version, name, applied date or None)
+    """
+    engine = sa.create_engine(database_uri or
+                              app.config['SQLALCHEMY_DATABASE_URI'])
+    conn = engine.raw_connection()
+    try:
+        applied = get_applied_migrations(conn.cursor()) or {}
+    finally:
+        conn.close()
+        engine.dispose()
+
+    return [(version, name, applied.get(version))
+            for version, name, _path in list_migrations(migrations_dir)]
+
+
+def split_columns(names):
+    """
+    :param names: the column list of a constraint or an index, 'a, b'
+    :return: tuple of the column names
+    """
+    return tuple(n.strip() for n in names.split(','))
+
+
+def parse_schema(sql):
+    """
+    Parse the tables of a pg_dump schema
+    :param sql: the content of the schema file
+    :return: dict table -> dict with 'columns' (name -> (type, nullable)),
+        'primary_key', 'uniques', 'foreign_keys' and 'indexes'
+        (name -> (columns, partial))
+    """
+    tables = collections.OrderedDict()
+    for m in TABLE_RE.finditer(sql):
+        columns = collections.OrderedDict()
+        for line in m.group(2).split(',\n'):
+            name, definition = line.strip().split(None, 1)
+            sql_type = re.split(r' DEFAULT | NOT NULL', definition)[0]
+            columns[name] = (sql_type, not definition.endswith('NOT NULL'))
+        tables[m.group(1)] = {'columns': columns, 'primary_key': (),
+                              'uniques': set(), 'foreign_keys': set(),
+                              'indexes': {}}
+
+    for m in CONSTRAINT_RE.finditer(sql):
+        table, _name, kind, names, ref_table, ref_column = m.groups()
+        if table not in tables:
+            continue
+        if kind == 'PRIMARY KEY':
+            tables[table]['primary_key'] = split_columns(names)
+        elif kind == 'UNIQUE':
+            tables[table]['uniques'].add(split_columns(names))
+        else:
+            tables[table]['foreign_keys'].add(
+                (split_columns(names), ref_table, ref_column))
+
+    for m in INDEX_RE.finditer(sql):
+        name, table, names, where = m.groups()
+        if table in tables:
+            tables[table]['indexes'][name] = (split_columns(names),
+                                              where is not None)
+    return tables
+
+
+def get_model_tables(metadata):
+    """
+    :param metadata: the metadata of the models
+    :return: the tables of the models, in the format of parse_schema
+    """
+    dialect = postgresql.dialect()
+    tables = {}
+    for table in metadata.sorted_tables:
+        columns = {}
+        for column in table.columns:
+            sql_type = column.type.compile(dialect=dialect).lower()
+            columns[column.name] = (SQL_TYPE_NAMES.get(sql_type, sql_type),
+                                    column.nullable)
+
+        uniques = set()
+        for constraint in table.constraints:
+            if isinstance(constraint, sa.UniqueConstraint):
+                uniques.add(tuple(c.name for c in constraint.columns))
+
+        indexes = {}
+        for index in table.indexes:
+            names = tuple(c.name for c in index.columns)
+            if index.unique:
+                # Column(unique=True) is a unique index of the metadata
+                uniques.add(names)
+                continue
+            indexes[index.name] = (
+                names,
+                index.dialect_options['postgresql']['where'] is not None)
+
+        tables[table.name] = {
+            'columns': columns,
+            'primary_key': tuple(c.name for c in table.primary_key.columns),
+            'uniques': uniques,
+            'foreign_keys': set(((fk.parent.name, ), fk.column.table.name,
+                                 fk.column.name)
+                                for fk in table.foreign_keys),
+            'indexes': indexes}
+    return tables
+
+
+def check_schema(metadata, schema_path=SCHEMA_PATH,
+                 migrations_dir=MIGRATIONS_DIR):
+    """
+    Compare the models with the schema of a new installation
+    :param metadata: the metadata of the models
+    :param schema_path: the schema file
+    :param migrations_dir: the folder of the migration scripts
+    :return: list of the differences, empty if they are in sync
+    """
+    with open(schema_path) as f:
+        sql = f.read()
+    schema_tables = parse_schema(sql)
+    model_tables = get_model_tables(metadata)
+
+    errors = []
+    for table in sorted(set(schema_tables) | set(model_tables)):
+        if table not in model_tables:
+            errors.append("{}: table not in the models".format(table))
+            continue
+        if table not in schema_tables:
+            errors.append("{}: table not in the schema".format(table))
+            continue
+
+        schema_t = schema_tables[table]
+        model_t = model_tables[table]
+        for column in sorted(set(schema_t['columns']) |
+                             set(model_t['columns'])):
+            if column not in model_t['columns']:
+                errors.append("{}.{}: column not in the models".format(
+                    table, column))
+            elif column not in schema_t['columns']:
+                errors.append("{}.{}: column not in the schema".format(
+                    table, column))
+            elif schema_t['columns'][column] != model_t['columns'][column]:
+                errors.append("{}.{}: (type, nullable) {} in the schema, "
+                              "{} in the models".format(
+                                  table, column, schema_t['columns'][column],
+                                  model_t['columns'][column]))
+
+        for key in ('primary_key', 'uniques', 'foreign_keys', 'indexes'):
+            if schema_t[key] != model_t[key]:
+                errors.append("{}: {} {} in the schema, {} in the "
+                              "models".format(table, key, schema_t[key],
+                                              model_t[key]))
+
+    recorded = SCHEMA_MIGRATION_ROW_RE.findall(sql)
+    migrations = [(version, name)
+                  for version, name, _path in list_migrations(migrations_dir)]
+    if recorded != migrations:
+        errors.append("schema_migration: {} recorded in the schema, {} in "
+                      "{}".format(recorded, migrations, migrations_dir))
+    return errors
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Migrations of the piponger database")
+    group = parser.add_mutually_exclusive_group()
+    group.add_argument('--status', action='store_true',
+                       help="list the migrations and their state")
+    group.add_argument('--baseline', metavar='VERSION',
+                       help="record the migrations up to VERSION as applied")
+    group.add_argument('--check', action='store_true',
+                       help="compare models.py with db/piponger_db.sql")
+    args = parser.parse_args()
+
+    if args.check:
+        import models
+        errors = check_schema(models.metadata)
+        for error in errors:
+            print(error)
+        return 1 if errors else 0
+
+    if args.status:
+        for version, name, applied_date in get_migration_status():
+            print("{} {} {}".format(version, name, applied_date or 'pending'))
+        return 0
+
+    for version in apply_migrations(baseline=args.baseline):
+        print("{}: {}".format('recorded' if args.baseline else 'applied',
+                              version))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
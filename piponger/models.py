@@ -15,8 +15,10 @@ making new explicit queries (back_populates)
 """
 
 # coding: utf-8
-from sqlalchemy import (Column, DateTime, ForeignKey, Integer, Numeric, Text,
-                        UniqueConstraint, text)
+from sqlalchemy import (BigInteger, Column, DateTime, Float, ForeignKey, Index,
+                        Integer, LargeBinary, Numeric, Text, UniqueConstraint,
+                        text)
+from sqlalchemy.dialects.postgresql import ARRAY, JSONB
 from sqlalchemy.orm import relationship
 from sqlalchemy.ext.declarative import declarative_base
 
@@ -31,8 +33,81 @@ class AllocatedPingerPort(Base):
     port = Column(Integer, nullable=False)
 
 
+class AnalysisReplay(Base):
+    __tablename__ = 'analysis_replay'
+
+    id = Column(Integer, primary_key=True)
+    status = Column(
+        ForeignKey(
+            'task_status_type.type_id', ondelete='CASCADE',
+            onupdate='CASCADE'),
+        nullable=False,
+        server_default=text("'PENDING'::text"))
+    parameters = Column(JSONB, nullable=False, server_default=text("'{}'"))
+    master_iteration_id = Column(Integer)
+    start_date = Column(DateTime)
+    end_date = Column(DateTime)
+    iteration_count = Column(
+        Integer, nullable=False, server_default=text("0"))
+    error_count = Column(Integer, nullable=False, server_default=text("0"))
+    elapsed_seconds = Column(
+        Float(53), nullable=False, server_default=text("0"))
+    created_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+    last_updated_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+    skipped_iterations = Column(
+        JSONB, nullable=False, server_default=text("'[]'"))
+
+    analysis_replay_result = relationship(
+        'AnalysisReplayResult', back_populates='analysis_replay')
+    task_status_type = relationship('TaskStatusType')
+
+
+class AnalysisReplayResult(Base):
+    __tablename__ = 'analysis_replay_result'
+    __table_args__ = (Index('analysis_replay_result_analysis_replay_id_idx',
+                            'analysis_replay_id'), )
+
+    id = Column(Integer, primary_key=True)
+    analysis_replay_id = Column(
+        ForeignKey(
+            'analysis_replay.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    problematic_host = Column(Text)
+    score = Column(Numeric)
+    created_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+
+    analysis_replay = relationship(
+        'AnalysisReplay', back_populates='analysis_replay_result')
+    master_iteration = relationship('MasterIteration')
+
+
+class HopBaseline(Base):
+    __tablename__ = 'hop_baseline'
+
+    id = Column(Integer, primary_key=True)
+    hop = Column(Text, nullable=False, unique=True)
+    ewma_mean = Column(Float(53), nullable=False, server_default=text("0"))
+    ewma_variance = Column(
+        Float(53), nullable=False, server_default=text("0"))
+    sample_count = Column(Integer, nullable=False, server_default=text("0"))
+    last_seen_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+    last_master_iteration_id = Column(Integer)
+
+
 class Iperf(Base):
     __tablename__ = 'iperf'
+    __table_args__ = (
+        Index('iperf_iteration_status_idx', 'pinger_iteration_id', 'status'),
+        Index('iperf_ponger_port_id_idx', 'ponger_port_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     pinger_iteration_id = Column(
@@ -49,6 +124,12 @@ class Iperf(Base):
         ForeignKey('ponger_port.id', ondelete='CASCADE', onupdate='CASCADE'),
         nullable=False)
     src_port = Column(Integer, nullable=False)
+    seconds = Column(Float(53))
+    bytes = Column(BigInteger)
+    bits_per_second = Column(Float(53))
+    lost_percent = Column(Float(53))
+    raw_encoding = Column(Text)
+    raw_result = Column(LargeBinary)
 
     pinger_iteration = relationship('PingerIteration', back_populates='iperf')
     ponger_port = relationship('PongerPort')
@@ -57,6 +138,12 @@ class Iperf(Base):
 
 class MasterIteration(Base):
     __tablename__ = 'master_iteration'
+    __table_args__ = (
+        Index('master_iteration_change_version_idx', 'change_version'),
+        Index('master_iteration_created_date_idx', 'created_date'),
+        Index('master_iteration_unfinished_idx', 'created_date',
+              postgresql_where=text("status <> 'FINISHED'::text")),
+    )
 
     id = Column(Integer, primary_key=True)
     created_date = Column(
@@ -66,15 +153,120 @@ class MasterIteration(Base):
         nullable=False,
         server_default=text("'CREATED'::text"))
     json_graph = Column(Text)
+    analysis_status = Column(
+        ForeignKey(
+            'task_status_type.type_id', ondelete='CASCADE',
+            onupdate='CASCADE'))
+    analysis_date = Column(DateTime)
+    created_version = Column(
+        BigInteger, nullable=False, server_default=text("txid_current()"))
+    change_version = Column(
+        BigInteger, nullable=False, server_default=text("txid_current()"))
+    plot_requested_date = Column(DateTime)
 
     master_iteration_pinger = relationship(
         'MasterIterationPinger', back_populates='master_iteration')
     master_iteration_result = relationship(
         'MasterIterationResult', back_populates='master_iteration')
+    master_iteration_hop = relationship(
+        'MasterIterationHop', back_populates='master_iteration')
+    master_iteration_graph = relationship(
+        'MasterIterationGraph', back_populates='master_iteration')
+    master_iteration_plot = relationship(
+        'MasterIterationPlot', back_populates='master_iteration')
+    master_iteration_node = relationship(
+        'MasterIterationNode', back_populates='master_iteration')
+    master_iteration_response = relationship(
+        'MasterIterationResponse', back_populates='master_iteration')
+
+
+class MasterIterationEdge(Base):
+    __tablename__ = 'master_iteration_edge'
+    __table_args__ = (UniqueConstraint('master_iteration_id', 'level',
+                                       'src_hop', 'dst_hop'), )
+
+    id = Column(Integer, primary_key=True)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    level = Column(Text, nullable=False, server_default=text("'subnet'::text"))
+    src_hop = Column(Text, nullable=False)
+    dst_hop = Column(Text, nullable=False)
+
+    master_iteration = relationship('MasterIteration')
+
+
+class MasterIterationGraph(Base):
+    __tablename__ = 'master_iteration_graph'
+    __table_args__ = (UniqueConstraint('master_iteration_id', 'level'), )
+
+    id = Column(Integer, primary_key=True)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    level = Column(Text, nullable=False)
+    json_graph = Column(Text)
+
+    master_iteration = relationship(
+        'MasterIteration', back_populates='master_iteration_graph')
+
+
+class MasterIterationHop(Base):
+    __tablename__ = 'master_iteration_hop'
+    __table_args__ = (UniqueConstraint('master_iteration_id', 'level',
+                                       'hop'), )
+
+    id = Column(Integer, primary_key=True)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    level = Column(Text, nullable=False, server_default=text("'subnet'::text"))
+    hop = Column(Text, nullable=False)
+    loss_sum = Column(Float(53), nullable=False, server_default=text("0"))
+    sample_count = Column(Integer, nullable=False, server_default=text("0"))
+
+    master_iteration = relationship(
+        'MasterIteration', back_populates='master_iteration_hop')
+
+
+class MasterIterationNode(Base):
+    __tablename__ = 'master_iteration_node'
+    __table_args__ = (
+        UniqueConstraint('master_iteration_id', 'level', 'node'),
+        Index('master_iteration_node_parent_idx', 'master_iteration_id',
+              'level', 'parent'),
+    )
+
+    id = Column(Integer, primary_key=True)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    level = Column(Text, nullable=False)
+    node = Column(Text, nullable=False)
+    parent = Column(Text)
+    mean = Column(Float(53), nullable=False)
+    child_count = Column(Integer, nullable=False, server_default=text("0"))
+    x = Column(Float(53))
+    y = Column(Float(53))
+    successors = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"))
+    predecessors = Column(JSONB, nullable=False, server_default=text("'[]'::jsonb"))
+
+    master_iteration = relationship(
+        'MasterIteration', back_populates='master_iteration_node')
 
 
 class MasterIterationPinger(Base):
     __tablename__ = 'master_iteration_pinger'
+    __table_args__ = (
+        Index('master_iteration_pinger_iteration_status_idx',
+              'master_iteration_id', 'status'),
+        Index('master_iteration_pinger_registered_pinger_id_idx',
+              'registered_pinger_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     master_iteration_id = Column(
@@ -91,7 +283,7 @@ class MasterIterationPinger(Base):
             'pinger_iteration_status_type.type_id',
             ondelete='CASCADE',
             onupdate='CASCADE'))
-    result = Column(Text)
+    result = Column(JSONB)
     created_date = Column(
         DateTime, nullable=False, server_default=text("now()"))
     last_updated_date = Column(
@@ -103,8 +295,51 @@ class MasterIterationPinger(Base):
     pinger_iteration_status_type = relationship('PingerIterationStatusType')
 
 
+class MasterIterationPlot(Base):
+    __tablename__ = 'master_iteration_plot'
+    __table_args__ = (UniqueConstraint('master_iteration_id', 'format'), )
+
+    id = Column(Integer, primary_key=True)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    format = Column(Text, nullable=False)
+    graph_hash = Column(Text, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+
+    master_iteration = relationship(
+        'MasterIteration', back_populates='master_iteration_plot')
+
+
+class MasterIterationResponse(Base):
+    __tablename__ = 'master_iteration_response'
+    __table_args__ = (UniqueConstraint('master_iteration_id', 'key',
+                                       'encoding'), )
+
+    id = Column(Integer, primary_key=True)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    key = Column(Text, nullable=False)
+    encoding = Column(Text, nullable=False)
+    etag = Column(Text, nullable=False)
+    mimetype = Column(Text, nullable=False)
+    data = Column(LargeBinary, nullable=False)
+    created_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+
+    master_iteration = relationship(
+        'MasterIteration', back_populates='master_iteration_response')
+
+
 class MasterIterationResult(Base):
     __tablename__ = 'master_iteration_result'
+    __table_args__ = (Index('master_iteration_result_master_iteration_id_idx',
+                            'master_iteration_id'), )
 
     id = Column(Integer, primary_key=True)
     master_iteration_id = Column(
@@ -120,8 +355,85 @@ class MasterIterationResult(Base):
         'MasterIteration', back_populates='master_iteration_result')
 
 
+class MasterPath(Base):
+    __tablename__ = 'master_path'
+    __table_args__ = (Index('master_path_last_seen_date_idx',
+                            'last_seen_date'), )
+
+    id = Column(Integer, primary_key=True)
+    path_hash = Column(Text, nullable=False, unique=True)
+    hops = Column(ARRAY(Text), nullable=False)
+    created_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+    last_seen_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+
+
+class MasterPathResult(Base):
+    __tablename__ = 'master_path_result'
+    __table_args__ = (
+        Index('master_path_result_master_iteration_id_idx',
+              'master_iteration_id', 'ponger_address'),
+        Index('master_path_result_master_iteration_pinger_id_idx',
+              'master_iteration_pinger_id'),
+        Index('master_path_result_path_id_idx', 'path_id'),
+    )
+
+    id = Column(BigInteger, primary_key=True)
+    master_iteration_id = Column(
+        ForeignKey(
+            'master_iteration.id', ondelete='CASCADE', onupdate='CASCADE'),
+        nullable=False)
+    master_iteration_pinger_id = Column(
+        ForeignKey(
+            'master_iteration_pinger.id', ondelete='CASCADE',
+            onupdate='CASCADE'),
+        nullable=False)
+    pinger_address = Column(Text, nullable=False)
+    ponger_address = Column(Text, nullable=False)
+    src_port = Column(Integer)
+    dst_port = Column(Integer)
+    path_id = Column(
+        ForeignKey('master_path.id', onupdate='CASCADE'), nullable=False)
+    lost_percent = Column(Float(53))
+    bits_per_second = Column(Float(53))
+    bytes = Column(BigInteger)
+    seconds = Column(Float(53))
+
+    master_path = relationship('MasterPath')
+
+
+class MasterStatus(Base):
+    __tablename__ = 'master_status'
+
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    version = Column(Integer, nullable=False, server_default=text("0"))
+    snapshot = Column(JSONB)
+    snapshot_version = Column(Integer)
+    snapshot_date = Column(DateTime)
+    pruned_version = Column(BigInteger)
+    snapshot_result_count = Column(Integer)
+
+
+class MasterRemovedNode(Base):
+    __tablename__ = 'master_removed_node'
+    __table_args__ = (Index('master_removed_node_change_version_idx',
+                            'change_version'), )
+
+    id = Column(Integer, primary_key=True)
+    kind = Column(Text, nullable=False)
+    address = Column(Text, nullable=False)
+    api_port = Column(Integer, nullable=False)
+    change_version = Column(
+        BigInteger, nullable=False, server_default=text("txid_current()"))
+    created_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
+
+
 class PingerIteration(Base):
     __tablename__ = 'pinger_iteration'
+    __table_args__ = (Index('pinger_iteration_created_date_idx',
+                            'created_date'), )
 
     id = Column(Integer, primary_key=True)
     created_date = Column(
@@ -134,6 +446,7 @@ class PingerIteration(Base):
     remote_id = Column(Text, nullable=False, unique=True)
     remote_address = Column(Text, nullable=False)
     tracert_qty = Column(Integer, nullable=False, server_default=text("1"))
+    result_summary = Column(JSONB)
 
     pinger_iteration_status_type = relationship('PingerIterationStatusType')
     ponger = relationship('Ponger', back_populates='pinger_iteration')
@@ -149,6 +462,8 @@ class PingerIterationStatusType(Base):
 
 class Ponger(Base):
     __tablename__ = 'ponger'
+    __table_args__ = (Index('ponger_pinger_iteration_id_idx',
+                            'pinger_iteration_id'), )
 
     id = Column(Integer, primary_key=True)
     address = Column(Text)
@@ -167,6 +482,7 @@ class Ponger(Base):
 
 class PongerPort(Base):
     __tablename__ = 'ponger_port'
+    __table_args__ = (Index('ponger_port_ponger_id_idx', 'ponger_id'), )
 
     ponger_id = Column(
         ForeignKey('ponger.id', ondelete='CASCADE', onupdate='CASCADE'),
@@ -181,7 +497,9 @@ class PongerPort(Base):
 
 class RegisteredPingerNode(Base):
     __tablename__ = 'registered_pinger_nodes'
-    __table_args__ = (UniqueConstraint('address', 'api_port'), )
+    __table_args__ = (UniqueConstraint('address', 'api_port'),
+                      Index('registered_pinger_nodes_change_version_idx',
+                            'change_version'))
 
     id = Column(Integer, primary_key=True)
     address = Column(Text, nullable=False)
@@ -191,11 +509,17 @@ class RegisteredPingerNode(Base):
     api_port = Column(Integer, nullable=False)
     last_updated_date = Column(
         DateTime, nullable=False, server_default=text("now()"))
+    created_version = Column(
+        BigInteger, nullable=False, server_default=text("txid_current()"))
+    change_version = Column(
+        BigInteger, nullable=False, server_default=text("txid_current()"))
 
 
 class RegisteredPongerNode(Base):
     __tablename__ = 'registered_ponger_nodes'
-    __table_args__ = (UniqueConstraint('address', 'api_port'), )
+    __table_args__ = (UniqueConstraint('address', 'api_port'),
+                      Index('registered_ponger_nodes_change_version_idx',
+                            'change_version'))
 
     id = Column(Integer, primary_key=True)
     address = Column(Text, nullable=False)
@@ -205,6 +529,19 @@ class RegisteredPongerNode(Base):
     api_port = Column(Integer, nullable=False)
     last_updated_date = Column(
         DateTime, nullable=False, server_default=text("now()"))
+    created_version = Column(
+        BigInteger, nullable=False, server_default=text("txid_current()"))
+    change_version = Column(
+        BigInteger, nullable=False, server_default=text("txid_current()"))
+
+
+class SchemaMigration(Base):
+    __tablename__ = 'schema_migration'
+
+    version = Column(Text, primary_key=True)
+    name = Column(Text, nullable=False)
+    applied_date = Column(
+        DateTime, nullable=False, server_default=text("now()"))
 
 
 class TaskStatusType(Base):
@@ -215,6 +552,13 @@ class TaskStatusType(Base):
 
 class Tracert(Base):
     __tablename__ = 'tracert'
+    __table_args__ = (
+        Index('tracert_iteration_port_status_idx', 'pinger_iteration_id',
+              'ponger_port_id', 'status'),
+        Index('tracert_pending_idx', 'pinger_iteration_id',
+              postgresql_where=text("status = 'PENDING'::text")),
+        Index('tracert_ponger_port_id_idx', 'ponger_port_id'),
+    )
 
     id = Column(Integer, primary_key=True)
     pinger_iteration_id = Column(
@@ -230,6 +574,9 @@ class Tracert(Base):
     ponger_port_id = Column(
         ForeignKey('ponger_port.id', ondelete='CASCADE', onupdate='CASCADE'),
         nullable=False)
+    paths = Column(JSONB)
+    raw_encoding = Column(Text)
+    raw_result = Column(LargeBinary)
 
     pinger_iteration = relationship(
         'PingerIteration', back_populates='tracert')
@@ -1,4 +1,5 @@
 var last_gathered_data;
+var update_interval;
 
 function prepare_label(label) {
     label = label.replace('_', ' ');
@@ -27,216 +28,269 @@ function toHHMMSS(date) {
     return hours + ':' + minutes + ':' + seconds;
 }
 
-function update_info() {
-
-    $('#loading-ico').show();
-
-    $.getJSON("/").done(function(data) {
-        var items = [];
+function render_info(data) {
+    var items = [];
 
-        last_gathered_data = data;
+    last_gathered_data = data;
 
-        if (data.hasOwnProperty('master_info')) {
-            $("#master-table tbody").remove();
-            var tbody = $('<tbody />', {}).appendTo("#master-table table");
+    if (data.hasOwnProperty('master_info')) {
+        $("#master-table tbody").remove();
+        var tbody = $('<tbody />', {}).appendTo("#master-table table");
 
-            if (data.master_info.hasOwnProperty('current_iteration')) {
-                $.each(data.master_info.current_iteration, function(key, val) {
-                    var row = $('<tr />', {}).appendTo(tbody);
+        if (data.master_info.hasOwnProperty('current_iteration')) {
+            $.each(data.master_info.current_iteration, function(key, val) {
+                var row = $('<tr />', {}).appendTo(tbody);
 
-                    if (key == "progress") {
-                        $('<td />', {
-                            'text': prepare_label(key)
-                        }).appendTo(row);
-                        parsed_percent = parseInt(val.percentage, 10) + "%";
-                        $('<td />', {
-                            'text': val.percentage + "%"
-                        }).appendTo(row);
-                        $('#master-progress .progress-bar').attr('aria-valuenow', parsed_percent).css('width', parsed_percent);
-                        $('#master-progress span').text(parsed_percent);
-                        $('#master-progress').next('div').find('span').text(val.count + '/' + val.total);
-                    } else if (key == "status") {
-                        $('<td />', {
-                            'text': prepare_label(key)
-                        }).appendTo(row);
-                        console.log(key, val);
-                        if (val == "FINISHED") {
-                            $('#start-btn').attr('disabled', false);
-                            $('#start-btn').next('span').hide();
-                        } else {
-                            $('#start-btn').attr('disabled', true);
-                            $('#start-btn').next('span').show().css('display', 'block');
-                        }
-                        $('<td />', {
-                            'text': val
-                        }).appendTo(row);
-                    } else if (key == "created_date") {
-                        $('<td />', {
-                            'text': prepare_label(key)
-                        }).appendTo(row);
-                        $('<td />', {
-                            'text': val
-                        }).appendTo(row);
-
-                        var unixTime = Date.parse(val);
-                        var nowTime = Date.now();
-
-                        var row = $('<tr />', {}).appendTo(tbody);
-                        $('<td />', {
-                            'text': "Time since creation"
-                        }).appendTo(row);
-                        $('<td />', {
-                            'text': toHHMMSS((nowTime / 1000) - (unixTime / 1000))
-                        }).appendTo(row);
-                    } else if (key == "problematic_hosts") {
-                        $("#master-prob-table tbody").remove();
-
-                        if (val.length > 0) {
-                            var tbody_prob = $('<tbody />', {}).appendTo("#master-prob-table table");
-                            $.each(val, function(k, v) {
-                                var row = $('<tr />', {}).appendTo(tbody_prob);
-                                $('<td />', {
-                                    'text': v.host
-                                }).appendTo(row);
-                                $('<td />', {
-                                    'text': v.score
-                                }).appendTo(row);
-                            });
-                        }
-                    } else if (key == "has_graph") {
-                        $('<td />', {
-                            'text': prepare_label(key)
-                        }).appendTo(row);
-                        if (val == true) {
-                            $('#load-img-btn').attr('disabled', false);
-                            $('#load-img-btn').next('span').hide();
-
-                            $('#load-net-js-btn').attr('disabled', false);
-                            $('#load-net-js-btn').next('span').hide();
-                        } else {
-                            $('#load-img-btn').attr('disabled', true);
-                            $('#load-img-btn').next('span').show().css('display', 'block');
-
-                            $('#load-net-js-btn').attr('disabled', true);
-                            $('#load-net-js-btn').next('span').show().css('display', 'block');
-                        }
-                        $('<td />', {
-                            'text': val
-                        }).appendTo(row);
+                if (key == "progress") {
+                    $('<td />', {
+                        'text': prepare_label(key)
+                    }).appendTo(row);
+                    parsed_percent = parseInt(val.percentage, 10) + "%";
+                    $('<td />', {
+                        'text': val.percentage + "%"
+                    }).appendTo(row);
+                    $('#master-progress .progress-bar').attr('aria-valuenow', parsed_percent).css('width', parsed_percent);
+                    $('#master-progress span').text(parsed_percent);
+                    $('#master-progress').next('div').find('span').text(val.count + '/' + val.total);
+                } else if (key == "status") {
+                    $('<td />', {
+                        'text': prepare_label(key)
+                    }).appendTo(row);
+                    console.log(key, val);
+                    if (val == "FINISHED") {
+                        $('#start-btn').attr('disabled', false);
+                        $('#start-btn').next('span').hide();
                     } else {
-                        $('<td />', {
-                            'text': prepare_label(key)
-                        }).appendTo(row);
-                        $('<td />', {
-                            'text': val
-                        }).appendTo(row);
+                        $('#start-btn').attr('disabled', true);
+                        $('#start-btn').next('span').show().css('display', 'block');
                     }
-                });
-            }
+                    $('<td />', {
+                        'text': val
+                    }).appendTo(row);
+                } else if (key == "created_date") {
+                    $('<td />', {
+                        'text': prepare_label(key)
+                    }).appendTo(row);
+                    $('<td />', {
+                        'text': val
+                    }).appendTo(row);
+
+                    var unixTime = Date.parse(val);
+                    var nowTime = Date.now();
 
-            $("#master-pinger-list-table tbody").remove();
-            var tbody = $('<tbody />', {}).appendTo("#master-pinger-list-table table");
-            $.each(data.master_info.registrered_pingers, function(key, val) {
-                var row = $('<tr />', {}).appendTo(tbody);
-                $('<td />', {
-                    'text': val.address
-                }).appendTo(row);
-                $('<td />', {
-                    'text': val.api_port
-                }).appendTo(row);
-                $('<td />', {
-                    'text': val.api_protocol
-                }).appendTo(row);
-            });
+                    var row = $('<tr />', {}).appendTo(tbody);
+                    $('<td />', {
+                        'text': "Time since creation"
+                    }).appendTo(row);
+                    $('<td />', {
+                        'text': toHHMMSS((nowTime / 1000) - (unixTime / 1000))
+                    }).appendTo(row);
+                } else if (key == "problematic_hosts") {
+                    $("#master-prob-table tbody").remove();
+
+                    if (val.length > 0) {
+                        var tbody_prob = $('<tbody />', {}).appendTo("#master-prob-table table");
+                        $.each(val, function(k, v) {
+                            var row = $('<tr />', {}).appendTo(tbody_prob);
+                            $('<td />', {
+                                'text': v.host
+                            }).appendTo(row);
+                            $('<td />', {
+                                'text': v.score
+                            }).appendTo(row);
+                        });
+                    }
+                } else if (key == "has_graph") {
+                    $('<td />', {
+                        'text': prepare_label(key)
+                    }).appendTo(row);
+                    if (val == true) {
+                        $('#load-img-btn').attr('disabled', false);
+                        $('#load-img-btn').next('span').hide();
+
+                        $('#load-net-js-btn').attr('disabled', false);
+                        $('#load-net-js-btn').next('span').hide();
+                    } else {
+                        $('#load-img-btn').attr('disabled', true);
+                        $('#load-img-btn').next('span').show().css('display', 'block');
 
-            $("#master-ponger-list-table tbody").remove();
-            var tbody = $('<tbody />', {}).appendTo("#master-ponger-list-table table");
-            $.each(data.master_info.registrered_pongers, function(key, val) {
-                var row = $('<tr />', {}).appendTo(tbody);
-                $('<td />', {
-                    'text': val.address
-                }).appendTo(row);
-                $('<td />', {
-                    'text': val.api_port
-                }).appendTo(row);
-                $('<td />', {
-                    'text': val.api_protocol
-                }).appendTo(row);
+                        $('#load-net-js-btn').attr('disabled', true);
+                        $('#load-net-js-btn').next('span').show().css('display', 'block');
+                    }
+                    $('<td />', {
+                        'text': val
+                    }).appendTo(row);
+                } else {
+                    $('<td />', {
+                        'text': prepare_label(key)
+                    }).appendTo(row);
+                    $('<td />', {
+                        'text': val
+                    }).appendTo(row);
+                }
             });
         }
 
-        if (data.hasOwnProperty('pinger_info')) {
-            var steps_hash_percent = {};
-            steps_hash_percent['CREATED'] = 1;
-            steps_hash_percent['RUNNING'] = 10;
-            steps_hash_percent['RUNNING_TRACEROUTE'] = 40;
-            steps_hash_percent['RUNNING_IPERF'] = 70;
-            steps_hash_percent['RUNNING_FINISHING'] = 90;
-            steps_hash_percent['FINISHED'] = 100;
-            steps_hash_percent['ERROR'] = 100;
-
-            var step_hash = {}
-            step_hash['CREATED'] = 0;
-            step_hash['RUNNING'] = 1;
-            step_hash['RUNNING_TRACEROUTE'] = 2;
-            step_hash['RUNNING_IPERF'] = 3;
-            step_hash['RUNNING_FINISHING'] = 4;
-            step_hash['FINISHED'] = 5;
-            step_hash['ERROR'] = 5;
-
-            $("#pinger-table tbody").remove();
-            var tbody = $('<tbody />', {}).appendTo("#pinger-table table");
-            $.each(data.pinger_info.last_iteration_status, function(key, val) {
-                var row = $('<tr />', {}).appendTo(tbody);
-                $('<td />', {
-                    'text': prepare_label(key)
-                }).appendTo(row);
-                $('<td />', {
-                    'text': val
-                }).appendTo(row);
-
-                if (key == "status") {
-                    parsed_percent = steps_hash_percent[val] + "%";
-                    step = step_hash[val];
-                    $('#pinger-progress .progress-bar').attr('aria-valuenow', parsed_percent).css('width', parsed_percent);
-                    $('#pinger-progress span').text(parsed_percent);
-                    $('#pinger-progress').next('div').find('span').text(step + '/5');
-                }
-            });
+        $("#master-pinger-list-table tbody").remove();
+        var tbody = $('<tbody />', {}).appendTo("#master-pinger-list-table table");
+        $.each(data.master_info.registrered_pingers, function(key, val) {
+            var row = $('<tr />', {}).appendTo(tbody);
+            $('<td />', {
+                'text': val.address
+            }).appendTo(row);
+            $('<td />', {
+                'text': val.api_port
+            }).appendTo(row);
+            $('<td />', {
+                'text': val.api_protocol
+            }).appendTo(row);
+        });
+
+        $("#master-ponger-list-table tbody").remove();
+        var tbody = $('<tbody />', {}).appendTo("#master-ponger-list-table table");
+        $.each(data.master_info.registrered_pongers, function(key, val) {
+            var row = $('<tr />', {}).appendTo(tbody);
+            $('<td />', {
+                'text': val.address
+            }).appendTo(row);
+            $('<td />', {
+                'text': val.api_port
+            }).appendTo(row);
+            $('<td />', {
+                'text': val.api_protocol
+            }).appendTo(row);
+        });
+    }
 
-            $("#ponger-list-table tbody").remove();
-            var tbody = $('<tbody />', {}).appendTo("#ponger-list-table table");
-            console.log(data.pinger_info.ponger_list);
-            $.each(data.pinger_info.ponger_list, function(key, val) {
-                var row = $('<tr />', {}).appendTo(tbody);
-                console.log(val);
-                $('<td />', {
-                    'text': val.address
-                }).appendTo(row);
-                $('<td />', {
-                    'text': val.api_port
-                }).appendTo(row);
-                $('<td />', {
-                    'text': val.api_protocol
-                }).appendTo(row);
-            });
+    if (data.hasOwnProperty('pinger_info')) {
+        var steps_hash_percent = {};
+        steps_hash_percent['CREATED'] = 1;
+        steps_hash_percent['RUNNING'] = 10;
+        steps_hash_percent['RUNNING_TRACEROUTE'] = 40;
+        steps_hash_percent['RUNNING_IPERF'] = 70;
+        steps_hash_percent['RUNNING_FINISHING'] = 90;
+        steps_hash_percent['FINISHED'] = 100;
+        steps_hash_percent['ERROR'] = 100;
+
+        var step_hash = {}
+        step_hash['CREATED'] = 0;
+        step_hash['RUNNING'] = 1;
+        step_hash['RUNNING_TRACEROUTE'] = 2;
+        step_hash['RUNNING_IPERF'] = 3;
+        step_hash['RUNNING_FINISHING'] = 4;
+        step_hash['FINISHED'] = 5;
+        step_hash['ERROR'] = 5;
+
+        $("#pinger-table tbody").remove();
+        var tbody = $('<tbody />', {}).appendTo("#pinger-table table");
+        $.each(data.pinger_info.last_iteration_status, function(key, val) {
+            var row = $('<tr />', {}).appendTo(tbody);
+            $('<td />', {
+                'text': prepare_label(key)
+            }).appendTo(row);
+            $('<td />', {
+                'text': val
+            }).appendTo(row);
+
+            if (key == "status") {
+                parsed_percent = steps_hash_percent[val] + "%";
+                step = step_hash[val];
+                $('#pinger-progress .progress-bar').attr('aria-valuenow', parsed_percent).css('width', parsed_percent);
+                $('#pinger-progress span').text(parsed_percent);
+                $('#pinger-progress').next('div').find('span').text(step + '/5');
+            }
+        });
+
+        $("#ponger-list-table tbody").remove();
+        var tbody = $('<tbody />', {}).appendTo("#ponger-list-table table");
+        console.log(data.pinger_info.ponger_list);
+        $.each(data.pinger_info.ponger_list, function(key, val) {
+            var row = $('<tr />', {}).appendTo(tbody);
+            console.log(val);
+            $('<td />', {
+                'text': val.address
+            }).appendTo(row);
+            $('<td />', {
+                'text': val.api_port
+            }).appendTo(row);
+            $('<td />', {
+                'text': val.api_protocol
+            }).appendTo(row);
+        });
 
 
-        }
+    }
+}
+
+function update_info() {
 
-    }).always(function(data) {
+    $('#loading-ico').show();
+
+    $.getJSON("/").done(render_info).always(function(data) {
         window.setTimeout(function() {
             $('#loading-ico').hide();
         }, 500);
     });
 }
 
+function start_polling() {
+    if (!update_interval) {
+        update_interval = window.setInterval(function() {
+            update_info();
+        }, 2500);
+    }
+}
+
+function stop_polling() {
+    if (update_interval) {
+        window.clearInterval(update_interval);
+        update_interval = undefined;
+    }
+}
+
+function on_master_event(event) {
+    var data = JSON.parse(event.data);
+
+    if (last_gathered_data && (last_gathered_data.capabilities.is_pinger || last_gathered_data.capabilities.is_ponger)) {
+        // the pinger and ponger info are not in the events
+        update_info();
+    } else if (last_gathered_data && data.hasOwnProperty('master_info')) {
+        last_gathered_data.master_info = data.master_info;
+        render_info(last_gathered_data);
+    } else if (last_gathered_data && data.hasOwnProperty('progress')) {
+        // pinger_result only has the progress of its iteration
+        var current_iteration = last_gathered_data.master_info.current_iteration;
+        if (current_iteration && current_iteration.id == data.master_iteration_id) {
+            current_iteration.progress = data.progress;
+            render_info(last_gathered_data);
+        }
+    }
+}
+
+function listen_master_events() {
+    // the master pushes its changes, poll if the stream is not available
+    if (!window.EventSource) {
+        start_polling();
+        return;
+    }
+
+    var source = new EventSource("/api/v1.0/master/events");
+    source.onopen = function() {
+        stop_polling();
+    };
+    source.onerror = function() {
+        start_polling();
+    };
+
+    $.each(['status', 'iteration_created', 'pinger_result', 'iteration_finished', 'analysis_finished', 'nodes_changed'], function(key, val) {
+        source.addEventListener(val, on_master_event);
+    });
+}
+
 $(document).ready(function() {
     $("#year").html((new Date()).getFullYear());
 
-    window.setInterval(function() {
-        update_info();
-    }, 2500);
+    listen_master_events();
 
     $('#start-btn').on('click', function() {
         if ($(this).attr('disabled')) {
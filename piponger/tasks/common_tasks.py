@@ -6,11 +6,23 @@
 # LICENSE file in the root directory of this source tree.
 
 from celery.exceptions import SoftTimeLimitExceeded
+from datetime import datetime, timedelta
 import requests
 from requests.auth import HTTPBasicAuth as requestHTTPAuth
 import inspect
+import gzip
+import json
+import os
+import models
+from sqlalchemy import and_, func, or_
 
-from main import app, celery, logger, pipong_is_pinger, pipong_is_ponger
+from main import (app, db, celery, logger, pipong_is_pinger,
+                  pipong_is_ponger)
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 
 @celery.task(time_limit=120, soft_time_limit=120)
@@ -75,4 +87,166 @@ def report_to_master(local_port, local_protocol):
 
         return str("success")
     except SoftTimeLimitExceeded:
-        return None
\ No newline at end of file
+        return None
+
+
+def encode_raw_result(raw):
+    """
+    Compress a raw traceroute or iperf output with
+    PINGER_RAW_RESULT_ENCODING ('zstd' needs the zstandard package, gzip
+    is used without it)
+    :param raw: the raw output (str)
+    :return: (encoding, data), (None, None) if the raw outputs are dropped
+    """
+    encoding = app.config['PINGER_RAW_RESULT_ENCODING']
+    if encoding is None:
+        return None, None
+
+    data = raw.encode('utf-8')
+    if encoding == 'zstd' and zstandard is not None:
+        return 'zstd', zstandard.ZstdCompressor(level=10).compress(data)
+    return 'gzip', gzip.compress(data, compresslevel=9)
+
+
+def decode_raw_result(row):
+    """
+    :param row: a Tracert or Iperf row
+    :return: the raw output of the row (str), None if it was dropped
+    """
+    if row.raw_result is None:
+        # stored before the compact results
+        return row.result
+
+    data = row.raw_result
+    if row.raw_encoding == 'zstd':
+        data = zstandard.ZstdDecompressor().decompress(data)
+    else:
+        data = gzip.decompress(data)
+    return data.decode('utf-8')
+
+
+def row_to_dict(row):
+    """
+    :param row: a model instance
+    :return: dict column -> value of the row
+    """
+    return {c.name: getattr(row, c.name) for c in row.__table__.columns}
+
+
+def write_iteration_archive(kind, records):
+    """
+    Write the archive of a batch of removed iterations, a gzip file of
+    json lines (one iteration per line) in RETENTION_ARCHIVE_DIR
+    :param kind: 'pinger_iteration' or 'master_iteration'
+    :param records: list of dicts, one per iteration, with an 'id'
+    :return: the path of the archive, None if RETENTION_ARCHIVE_DIR is None
+    """
+    archive_dir = app.config['RETENTION_ARCHIVE_DIR']
+    if archive_dir is None or not records:
+        return None
+
+    os.makedirs(archive_dir, exist_ok=True)
+    path = os.path.join(archive_dir, "{}_{}_{}.json.gz".format(
+        kind, records[0]['id'], records[-1]['id']))
+    tmp_path = "{}.{}.tmp".format(path, os.getpid())
+    with gzip.open(tmp_path, 'wt', encoding='utf-8') as f:
+        for record in records:
+            f.write(json.dumps(record, default=str))
+            f.write('\n')
+    # the archive is complete before the rows are deleted
+    os.replace(tmp_path, path)
+    return path
+
+
+def archive_pinger_iterations(iteration_ids):
+    """
+    :param iteration_ids: ids of the pinger iterations, sorted
+    :return: the records of the archive of the iterations: the iteration,
+        its pongers and ports, traceroutes and iperfs
+    """
+    records = {}
+    for iter_t in db.session.query(models.PingerIteration).filter(
+            models.PingerIteration.id.in_(iteration_ids)):
+        records[iter_t.id] = dict(row_to_dict(iter_t), ponger=[],
+                                  tracert=[], iperf=[])
+
+    ponger_t = db.session.query(models.Ponger).filter(
+        models.Ponger.pinger_iteration_id.in_(iteration_ids))
+    for ponger in ponger_t:
+        records[ponger.pinger_iteration_id]['ponger'].append(dict(
+            row_to_dict(ponger),
+            ponger_port=[row_to_dict(p) for p in ponger.ponger_port]))
+
+    for model in (models.Tracert, models.Iperf):
+        for row in db.session.query(model).filter(
+                model.pinger_iteration_id.in_(iteration_ids)):
+            record = row_to_dict(row)
+            del record['raw_encoding'], record['raw_result']
+            record['result'] = decode_raw_result(row)
+            records[row.pinger_iteration_id][model.__tablename__].append(
+                record)
+
+    return [records[i] for i in iteration_ids if i in records]
+
+
+@celery.task(time_limit=3600, soft_time_limit=3500)
+def remove_old_pinger_iterations():
+    """
+    Archive and delete the pinger iterations older than
+    PINGER_ITERATION_RETENTION_DAYS with their pongers, ports, traceroutes
+    and iperfs (deleted by the foreign keys). The iterations summarised
+    for the master (result_summary) are the only copy of their paths,
+    they are kept PINGER_SUMMARY_RETENTION_DAYS. HOUSEKEEPING_MAX_BATCHES
+    batches of HOUSEKEEPING_BATCH_SIZE iterations are removed per run, each
+    one in its own transaction
+    :return: the number of iterations removed
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_pinger():
+        return None
+
+    retention_days = app.config['PINGER_ITERATION_RETENTION_DAYS']
+    if retention_days is None:
+        return None
+
+    # None or json null without summary
+    summary_type = func.coalesce(
+        func.jsonb_typeof(models.PingerIteration.result_summary), 'null')
+    old_filters = [and_(summary_type != 'object',
+                        models.PingerIteration.created_date <
+                        datetime.now() - timedelta(days=retention_days))]
+    summary_days = app.config['PINGER_SUMMARY_RETENTION_DAYS']
+    if summary_days is not None:
+        old_filters.append(and_(
+            summary_type == 'object',
+            models.PingerIteration.created_date <
+            datetime.now() - timedelta(days=summary_days)))
+
+    removed = 0
+    try:
+        for _batch in range(app.config['HOUSEKEEPING_MAX_BATCHES']):
+            iteration_ids = [e.id for e in db.session.query(
+                models.PingerIteration.id).filter(
+                or_(*old_filters)).order_by(
+                models.PingerIteration.created_date).limit(
+                app.config['HOUSEKEEPING_BATCH_SIZE'])]
+            if not iteration_ids:
+                break
+            iteration_ids.sort()
+
+            archive = write_iteration_archive(
+                'pinger_iteration', archive_pinger_iterations(iteration_ids))
+
+            db.session.query(models.PingerIteration).filter(
+                models.PingerIteration.id.in_(iteration_ids)).delete(
+                synchronize_session=False)
+            db.session.commit()
+            removed += len(iteration_ids)
+
+            logger.info("{}: Removed {} pinger iterations, archive: {}".
+                        format(current_f_name, len(iteration_ids), archive))
+    except SoftTimeLimitExceeded:
+        db.session.rollback()
+
+    return removed
@@ -9,32 +9,55 @@ from datetime import datetime, timedelta
 import models
 import requests
 from requests.auth import HTTPBasicAuth as requestHTTPAuth
+from sqlalchemy import and_
 from sqlalchemy import or_
 from sqlalchemy import desc
+from sqlalchemy import text
+from sqlalchemy import bindparam
+from sqlalchemy import func
+from sqlalchemy import literal
+from sqlalchemy import exists
+from sqlalchemy.dialects.postgresql import insert as pg_insert
 import inspect
+import contextlib
+import itertools
+import functools
 import numpy as np
-import ast
+import scipy.sparse
+from scipy.optimize import lsq_linear
+import billiard
 import collections
-import ipcalc
+import ipaddress
 import networkx as nx
 from networkx.readwrite import json_graph
 import json
-
-from main import app, db, celery, logger, pipong_is_master
-
-
-def outliers_z_score(ys):
-    threshold = 0.9
-
+import time
+import io
+import gzip
+import hashlib
+import redis
+from matplotlib import cm
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from celery.exceptions import SoftTimeLimitExceeded
+
+from main import app, db, celery, logger, pipong_is_master, json_loads
+from tasks.common_tasks import row_to_dict, write_iteration_archive
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+def outliers_z_score(ys, threshold=0.9):
     mean_y = np.mean(ys)
     stdev_y = np.std(ys)
     z_scores = [(y - mean_y) / stdev_y for y in ys]
     return np.where(np.abs(z_scores) > threshold)
 
 
-def upper_outliers_modified_z_score(ys):
-    threshold = 0.5
-
+def upper_outliers_modified_z_score(ys, threshold=0.5):
     median_y = np.median(ys)
     median_absolute_deviation_y = np.median([np.abs(y - median_y) for y in ys])
     modified_z_scores = [
@@ -55,7 +78,8 @@ def upper_outliers_iqr(ys):
     return np.flatnonzero(ys > upper_bound)
 
 
-def get_outliers(values):
+def get_outliers(values, z_score_threshold=0.9,
+                 modified_z_score_threshold=0.5):
     values = list(values)
     counter = collections.Counter(values)
 
@@ -67,19 +91,881 @@ def get_outliers(values):
             break
 
     if more_50p_equal:
-        return outliers_z_score(values)[0]
+        return outliers_z_score(values, z_score_threshold)[0]
     else:
-        return upper_outliers_modified_z_score(values)[0]
+        return upper_outliers_modified_z_score(
+            values, modified_z_score_threshold)[0]
+
+
+class NetworkPrefixIndex(object):
+    """
+    Longest prefix match index used to group the hops by their network
+    The addresses are parsed once into integers and resolved against a
+    binary radix trie of prefix -> netmask entries, prefixes not covered by
+    the table use the default netmask. Every resolved address is memoized
+    """
+
+    def __init__(self, default_netmask=24, prefix_netmasks=None):
+        """
+        :param default_netmask: netmask used when no prefix matches
+        :param prefix_netmasks: dict of 'network/len' -> netmask, for
+            example {'10.0.0.0/16': 31, '10.1.0.0/16': 24}
+        """
+        self.default_netmask = default_netmask
+        self.prefix_netmasks = {}
+        # one trie per ip version, a trie node is [child_0, child_1, netmask]
+        self.tries = {4: [None, None, None], 6: [None, None, None]}
+        self.cache = {}
+
+        for prefix, netmask in (prefix_netmasks or {}).items():
+            self.add_prefix(prefix, netmask)
+
+    def add_prefix(self, prefix, netmask):
+        """
+        Register the netmask to be used for the addresses inside a prefix
+        :param prefix: network in CIDR notation
+        :param netmask: netmask (prefix length) used to group those hops
+        :return:
+        """
+        network = ipaddress.ip_network(prefix, strict=False)
+        self.prefix_netmasks[prefix] = netmask
+        max_len = network.max_prefixlen
+        net_int = int(network.network_address)
+
+        node = self.tries[network.version]
+        for i in range(network.prefixlen):
+            bit = (net_int >> (max_len - 1 - i)) & 1
+            if node[bit] is None:
+                node[bit] = [None, None, None]
+            node = node[bit]
+        node[2] = netmask
+        self.cache.clear()
+
+    def get_netmask(self, version, addr_int):
+        """
+        Longest prefix match of an address against the trie
+        :return: the netmask of the most specific matching prefix
+        """
+        max_len = 32 if version == 4 else 128
+        node = self.tries[version]
+        netmask = node[2]
+        for i in range(max_len):
+            node = node[(addr_int >> (max_len - 1 - i)) & 1]
+            if node is None:
+                break
+            if node[2] is not None:
+                netmask = node[2]
+
+        if netmask is None:
+            netmask = self.default_netmask
+        return min(netmask, max_len)
+
+    def lookup(self, hop):
+        """
+        Get the network address of a hop
+        :param hop: the address of the hop
+        :return: the bare network address, None for unknown hops ("?")
+        """
+        network = self.cache.get(hop)
+        if network is not None or hop == "?":
+            return network
+
+        addr = ipaddress.ip_address(hop)
+        addr_int = int(addr)
+        max_len = addr.max_prefixlen
+        netmask = self.get_netmask(addr.version, addr_int)
+        mask_int = ((1 << max_len) - 1) ^ ((1 << (max_len - netmask)) - 1)
+
+        network = str(ipaddress.ip_address(addr_int & mask_int))
+        self.cache[hop] = network
+        return network
+
+    def lookup_many(self, hops):
+        """
+        Batched lookup of a list of hops (a path)
+        :param hops: list of hop addresses
+        :return: list of network addresses, None for unknown hops
+        """
+        cache = self.cache
+        return [cache[h] if h in cache else self.lookup(h) for h in hops]
+
+
+# analysis levels from the finest to the coarsest, every level groups the
+# networks of the previous one. The subnet level (the network segmentation
+# config) is the one used for the problematic hosts
+ANALYSIS_LEVELS = ('host', 'subnet', 'aggregate')
+DEFAULT_ANALYSIS_LEVEL = 'subnet'
+
+
+def build_level_indexes(default_netmask, prefix_netmasks, aggregate_netmask):
+    """
+    Create the prefix index of every analysis level
+    :param default_netmask: netmask of the subnet level
+    :param prefix_netmasks: per prefix netmasks of the subnet level
+    :param aggregate_netmask: netmask of the aggregate level
+    :return: OrderedDict level -> NetworkPrefixIndex
+    """
+    return collections.OrderedDict([
+        ('host', NetworkPrefixIndex(128)),
+        ('subnet', NetworkPrefixIndex(default_netmask, prefix_netmasks)),
+        ('aggregate', NetworkPrefixIndex(aggregate_netmask))])
+
+
+def get_level_config():
+    """
+    :return: the build_level_indexes arguments of the current config
+    """
+    return (app.config['DEFAULT_NETWORK_SEGMENTATION'],
+            app.config['NETWORK_SEGMENTATION_PREFIXES'],
+            app.config['AGGREGATE_NETWORK_SEGMENTATION'])
+
+
+def level_segmentation(level_indexes):
+    """
+    :param level_indexes: OrderedDict level -> NetworkPrefixIndex
+    :return: dict with the build_level_indexes keyword arguments of the
+        indexes, it can be sent as json
+    """
+    return {'default_netmask': level_indexes['subnet'].default_netmask,
+            'prefix_netmasks': dict(level_indexes['subnet'].prefix_netmasks),
+            'aggregate_netmask': level_indexes['aggregate'].default_netmask}
+
+
+_level_indexes_cache = {}
+
+
+def get_level_indexes():
+    """
+    Get the prefix indexes for the current network segmentation config
+    The indexes (and their memoized lookups) are kept between calls while
+    the config does not change
+    :return: OrderedDict level -> NetworkPrefixIndex
+    """
+    default_netmask, prefix_netmasks, aggregate_netmask = get_level_config()
+    key = (default_netmask, tuple(sorted(prefix_netmasks.items())),
+           aggregate_netmask)
+
+    level_indexes = _level_indexes_cache.get(key)
+    if level_indexes is None:
+        _level_indexes_cache.clear()
+        level_indexes = build_level_indexes(default_netmask, prefix_netmasks,
+                                            aggregate_netmask)
+        _level_indexes_cache[key] = level_indexes
+    return level_indexes
+
+
+def roll_up_levels(level_indexes, host_names):
+    """
+    Hierarchical roll-up of the hosts: the networks of every level are
+    found by grouping the (few) distinct networks of the previous level,
+    the paths are not parsed again
+    :param level_indexes: OrderedDict level -> NetworkPrefixIndex, the
+        first level is the one of host_names
+    :param host_names: list with the address of every host id
+    :return: OrderedDict level -> (hop_names, numpy array host id -> hop
+        id of this level), the hop ids keep the order of first appearance
+    """
+    levels = collections.OrderedDict()
+    names = host_names
+    ids = np.arange(len(host_names), dtype=np.int64)
+    for level, prefix_index in level_indexes.items():
+        if levels:
+            hop_index = {}
+            parent_ids = np.array(
+                [hop_index.setdefault(k, len(hop_index))
+                 for k in prefix_index.lookup_many(names)], dtype=np.int64)
+            names = list(hop_index.keys())
+            ids = parent_ids[ids]
+        levels[level] = (names, ids)
+    return levels
+
+
+def roll_up_edges(edges, ids):
+    """
+    :param edges: set of (host id, host id) tuples
+    :param ids: numpy array host id -> hop id of the level
+    :return: set of (hop id, hop id) tuples of the level
+    """
+    ids = ids.tolist()
+    return {(ids[a], ids[b]) for a, b in edges}
+
+
+def collect_pinger_samples(json_data, hop_index, edges, prefix_index):
+    """
+    Translate the paths of a single pinger result into flat sample arrays
+    Every hop of every path produces one (hop id, packet loss) sample, the
+    hop ids are assigned in order of first appearance using hop_index
+    :param json_data: the list of path results sent by a pinger
+    :param hop_index: dict network address -> integer id (updated in place)
+    :param edges: set of (hop id, hop id) tuples (updated in place)
+    :param prefix_index: NetworkPrefixIndex used to group the hops
+    :return: a tuple of numpy arrays (hop_ids, losses)
+    """
+    hop_ids = []
+    losses = []
+
+    for ping_result in json_data:
+        packet_loss = ping_result['lost_percent']
+        path_ids = []
+
+        # remove repeated paths ("?" hops resolve to None)
+        for network in prefix_index.lookup_many(ping_result['path']):
+            if network is None:
+                path_ids.append(None)
+                continue
+
+            hop_id = hop_index.setdefault(network, len(hop_index))
+            path_ids.append(hop_id)
+            hop_ids.append(hop_id)
+            losses.append(packet_loss)
+
+        for hop_id_1, hop_id_2 in zip(path_ids, path_ids[1:]):
+            if hop_id_1 is not None and hop_id_2 is not None:
+                edges.add((hop_id_1, hop_id_2))
+
+    return (np.array(hop_ids, dtype=np.int64),
+            np.array(losses, dtype=np.float64))
+
+
+def summarize_pinger_samples(hop_ids, losses):
+    """
+    Per hop summary of the samples of a single pinger: number of samples,
+    arithmetic mean and the value shared by more than half of the samples.
+    All the operations are grouped reductions over the sample arrays
+    :param hop_ids: numpy array with the hop id of every sample
+    :param losses: numpy array with the packet loss of every sample
+    :return: a tuple of numpy arrays (hop ids, sample count, mean, has
+        majority, majority value), the majority value is 0 for the hops
+        without majority
+    """
+    if hop_ids.size == 0:
+        return (hop_ids, hop_ids, losses, np.zeros(0, dtype=bool), losses)
+
+    # samples sorted by hop and then by value, so equal (hop, value)
+    # pairs are contiguous and can be counted as runs
+    order = np.lexsort((losses, hop_ids))
+    sorted_hops = hop_ids[order]
+    sorted_losses = losses[order]
+
+    run_start = np.ones(sorted_hops.size, dtype=bool)
+    run_start[1:] = ((sorted_hops[1:] != sorted_hops[:-1]) |
+                     (sorted_losses[1:] != sorted_losses[:-1]))
+    run_index = np.flatnonzero(run_start)
+    run_counts = np.diff(np.append(run_index, sorted_hops.size))
+    run_hops = sorted_hops[run_index]
+    run_values = sorted_losses[run_index]
+
+    hops = np.unique(hop_ids)
+    sample_count = np.bincount(hop_ids)
+    # the mean is accumulated in the original sample order
+    mean = (np.bincount(hop_ids, weights=losses)[hops] / sample_count[hops])
+
+    # at most one value per hop can have more than half of the samples
+    majority = run_counts * 2 > sample_count[run_hops]
+    majority_index = np.searchsorted(hops, run_hops[majority])
+    has_majority = np.zeros(hops.size, dtype=bool)
+    has_majority[majority_index] = True
+    majority_value = np.zeros(hops.size, dtype=np.float64)
+    majority_value[majority_index] = run_values[majority]
+
+    return hops, sample_count[hops], mean, has_majority, majority_value
+
+
+def vote_pinger_samples(hop_ids, losses):
+    """
+    Calculate the loss of every hop seen by a single pinger
+    If more than half of the samples of a hop have the same value this value
+    is used as the hop loss, otherwise the arithmetic mean of the samples
+    is used
+    :param hop_ids: numpy array with the hop id of every sample
+    :param losses: numpy array with the packet loss of every sample
+    :return: a tuple of numpy arrays (hop ids, loss of every hop)
+    """
+    hops, _count, mean, has_majority, majority_value = \
+        summarize_pinger_samples(hop_ids, losses)
+    return hops, np.where(has_majority, majority_value, mean)
+
+
+class HopLossAccumulator(object):
+    """
+    Running totals of the pinger votes of every hop id, the pinger
+    results are merged here as soon as they are reduced so they can be
+    released. The score of a hop is the mean of the loss calculated by
+    every pinger that touched this hop
+    """
+
+    def __init__(self, capacity=1024):
+        self.loss_sum = np.zeros(capacity, dtype=np.float64)
+        self.sample_count = np.zeros(capacity, dtype=np.int64)
+
+    def add(self, hop_ids, loss):
+        """
+        Add the votes of a pinger, every hop id appears at most once
+        :param hop_ids: numpy array of hop ids
+        :param loss: numpy array with the loss of every hop id
+        :return:
+        """
+        if hop_ids.size == 0:
+            return
+
+        needed = int(hop_ids.max()) + 1
+        if needed > self.loss_sum.size:
+            grow = max(needed, self.loss_sum.size * 2) - self.loss_sum.size
+            self.loss_sum = np.concatenate(
+                [self.loss_sum, np.zeros(grow, dtype=np.float64)])
+            self.sample_count = np.concatenate(
+                [self.sample_count, np.zeros(grow, dtype=np.int64)])
+
+        self.loss_sum[hop_ids] += loss
+        self.sample_count[hop_ids] += 1
+
+    def means(self, hop_count):
+        """
+        :param hop_count: the total number of hops, all of them were added
+        :return: numpy array with the mean loss of every hop id
+        """
+        return (self.loss_sum[:hop_count] /
+                np.maximum(self.sample_count[:hop_count], 1))
+
+
+def reduce_pinger_result(json_data, level_indexes):
+    """
+    Per pinger reduction: parse the hosts of the result once, group them
+    by the network of every analysis level and vote the loss of every hop
+    of every level. This step is independent for every pinger
+    :param json_data: the list of path results sent by a pinger, or the
+        summary already reduced by the pinger (summarize_pinger_result)
+    :param level_indexes: OrderedDict level -> NetworkPrefixIndex
+    :return: OrderedDict level -> (hop_names, loss, edges), loss is a numpy
+        array aligned with hop_names and edges a set of (index, index)
+        tuples on hop_names
+    """
+    if isinstance(json_data, dict):
+        return reduce_pinger_summary(json_data, level_indexes)
+
+    hop_index = {}
+    edges = set()
+    hop_ids, losses = collect_pinger_samples(json_data, hop_index, edges,
+                                             level_indexes['host'])
+
+    reduction = collections.OrderedDict()
+    for level, (hop_names, ids) in roll_up_levels(
+            level_indexes, list(hop_index.keys())).items():
+        # every local id has samples, so the voted hops are
+        # 0..len(hop_names)-1
+        _hops, loss = vote_pinger_samples(ids[hop_ids], losses)
+        reduction[level] = (hop_names, loss, roll_up_edges(edges, ids))
+    return reduction
+
+
+def summarize_pinger_result(json_data, level_indexes):
+    """
+    Pinger side pre-aggregation: the first stage of the voting reduction
+    done by the pinger, only a compact summary of every network of every
+    level is sent to the master instead of the paths
+    :param json_data: the list of path results of the pinger
+    :param level_indexes: OrderedDict level -> NetworkPrefixIndex, built
+        with the segmentation requested by the master
+    :return: dict with the segmentation used, the number of paths and for
+        every level the hops, the sample count, mean and majority value
+        (None if no value has more than half of the samples) of every hop
+        and the edges as pairs of indexes on the hops
+    """
+    hop_index = {}
+    edges = set()
+    hop_ids, losses = collect_pinger_samples(json_data, hop_index, edges,
+                                             level_indexes['host'])
+
+    levels = {}
+    for level, (hop_names, ids) in roll_up_levels(
+            level_indexes, list(hop_index.keys())).items():
+        _hops, sample_count, mean, has_majority, majority_value = \
+            summarize_pinger_samples(ids[hop_ids], losses)
+        levels[level] = {
+            'hops': hop_names,
+            'sample_count': sample_count.tolist(),
+            'mean': mean.tolist(),
+            'majority': [v if m else None for v, m in zip(
+                majority_value.tolist(), has_majority.tolist())],
+            'edges': sorted(roll_up_edges(edges, ids))}
+
+    return {'segmentation': level_segmentation(level_indexes),
+            'path_count': len(json_data),
+            'levels': levels}
+
+
+def reduce_pinger_summary(summary, level_indexes):
+    """
+    Per pinger reduction of a result already summarized by the pinger, the
+    voted loss of every hop is the majority value or the mean
+    :param summary: dict returned by summarize_pinger_result
+    :param level_indexes: OrderedDict level -> NetworkPrefixIndex
+    :return: OrderedDict level -> (hop_names, loss, edges), see
+        reduce_pinger_result
+    """
+    if summary['segmentation'] != level_segmentation(level_indexes):
+        raise ValueError(
+            "the pinger summary segmentation {} does not match the "
+            "analysis segmentation {}".format(
+                summary['segmentation'], level_segmentation(level_indexes)))
+
+    reduction = collections.OrderedDict()
+    for level in level_indexes.keys():
+        level_summary = summary['levels'][level]
+        loss = np.array(
+            [m if v is None else v for m, v in zip(
+                level_summary['mean'], level_summary['majority'])],
+            dtype=np.float64)
+        reduction[level] = (level_summary['hops'], loss,
+                            {(a, b) for a, b in level_summary['edges']})
+    return reduction
+
+
+def merge_pinger_reduction(reduction, hop_index, edges, accumulator):
+    """
+    Add the reduction of a pinger to the iteration totals, the local hop
+    indexes are translated to the iteration hop ids
+    :param reduction: the tuple of a level returned by reduce_pinger_result
+    :param hop_index: dict network address -> integer id (updated in place)
+    :param edges: set of (hop id, hop id) tuples (updated in place)
+    :param accumulator: HopLossAccumulator of the iteration
+    :return:
+    """
+    hop_names, loss, local_edges = reduction
+    global_ids = [hop_index.setdefault(k, len(hop_index)) for k in hop_names]
+    edges.update((global_ids[a], global_ids[b]) for a, b in local_edges)
+    accumulator.add(np.array(global_ids, dtype=np.int64), loss)
+
+
+# only the fields used by the analysis are extracted from the results (the
+# summaries of the pingers are already compact), the json text is decoded by
+# the (pool) process that reduces it
+PINGER_RESULT_PROJECTION_SQL = text("""
+    SELECT p.id,
+           (CASE WHEN jsonb_typeof(p.result) = 'array' THEN
+                (SELECT jsonb_agg(jsonb_build_object(
+                            'path', e -> 'path',
+                            'lost_percent', e -> 'lost_percent'))
+                 FROM jsonb_array_elements(p.result) AS e)
+            ELSE p.result END)::text AS result
+    FROM master_iteration_pinger p
+    WHERE p.master_iteration_id = :master_iteration_id
+      AND p.status = 'FINISHED'
+    ORDER BY p.id
+""")
+
+_worker_level_indexes = None
+
+
+def _init_analysis_worker(default_netmask, prefix_netmasks,
+                          aggregate_netmask):
+    """
+    Initializer of the analysis pool processes
+    """
+    global _worker_level_indexes
+    _worker_level_indexes = build_level_indexes(
+        default_netmask, prefix_netmasks, aggregate_netmask)
+
+
+def reduce_pinger_row(row, level_indexes=None, reducer=reduce_pinger_result):
+    """
+    Parse and reduce a 'master_iteration_pinger' result
+    :param row: tuple (master iteration pinger id, result as json text)
+    :param level_indexes: prefix indexes of the levels, the ones of the
+        pool process are used if None
+    :param reducer: per pinger reduction function of the analysis engine
+    :return: tuple (id, reduction, error), reduction is None on errors
+    """
+    p_iter_id, result = row
+    try:
+        json_data = json_loads(result) if result else []
+        return p_iter_id, reducer(
+            json_data, level_indexes or _worker_level_indexes), None
+    except Exception as e:
+        return p_iter_id, None, str(e)
+
+
+def map_pinger_rows(rows, workers, batch_size, reducer=reduce_pinger_result):
+    """
+    Reduce the pinger results, in a pool of 'workers' processes if
+    workers > 1. The reductions are yielded in the same order as the rows
+    The rows are consumed lazily, at most batch_size rows are handed to
+    the pool at once so the memory used does not depend on the number
+    of pingers
+    :param rows: iterable of (master iteration pinger id, result) tuples
+    :param workers: number of processes
+    :param batch_size: number of rows sent to the pool at once
+    :param reducer: per pinger reduction function of the analysis engine
+    :return: generator of reduce_pinger_row tuples
+    """
+    if workers <= 1:
+        level_indexes = get_level_indexes()
+        for row in rows:
+            yield reduce_pinger_row(row, level_indexes, reducer)
+        return
+
+    # billiard pools can be created inside the (daemon) celery workers
+    pool = billiard.Pool(
+        processes=workers,
+        initializer=_init_analysis_worker,
+        initargs=get_level_config())
+    rows = iter(rows)
+    try:
+        while True:
+            # imap would read all the rows at once, feed it by batches
+            batch = list(itertools.islice(rows, max(batch_size, workers)))
+            if not batch:
+                break
+            for reduced in pool.imap(
+                    functools.partial(reduce_pinger_row, reducer=reducer),
+                    batch):
+                yield reduced
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+class PathMatrixBuilder(object):
+    """
+    Rows of the sparse path x hop routing matrix used by the tomography
+    engine, every path is a row with a 1 on the columns of its hops.
+    The pinger results are added as compressed rows (CSR) so they can be
+    released as soon as they are reduced
+    """
+
+    def __init__(self):
+        self.indptr = [np.zeros(1, dtype=np.int64)]
+        self.indices = []
+        self.path_loss = []
+        self.nnz = 0
+
+    def add(self, indptr, hop_ids, path_loss):
+        """
+        Add the paths of a pinger
+        :param indptr: numpy array, the hops of the path i are
+            hop_ids[indptr[i]:indptr[i + 1]]
+        :param hop_ids: numpy array of hop ids
+        :param path_loss: numpy array with the packet loss of every path
+        :return:
+        """
+        if path_loss.size == 0:
+            return
+
+        self.indptr.append(indptr[1:] + self.nnz)
+        self.indices.append(hop_ids)
+        self.path_loss.append(path_loss)
+        self.nnz += hop_ids.size
+
+    def matrix(self, hop_count, hop_map=None):
+        """
+        :param hop_count: the total number of hops (columns)
+        :param hop_map: numpy array that maps the added hop ids to the
+            columns, to roll up the hosts to the networks of a level
+        :return: tuple (routing matrix as scipy.sparse.csr_matrix,
+            numpy array with the packet loss of every path)
+        """
+        indptr = np.concatenate(self.indptr)
+        indices = (np.concatenate(self.indices) if self.indices
+                   else np.zeros(0, dtype=np.int64))
+        path_loss = (np.concatenate(self.path_loss) if self.path_loss
+                     else np.zeros(0, dtype=np.float64))
+        if hop_map is not None:
+            indices = hop_map[indices]
+
+        routing = scipy.sparse.csr_matrix(
+            (np.ones(indices.size, dtype=np.float64), indices, indptr),
+            shape=(indptr.size - 1, hop_count))
+        # a path crosses a network once even if it has several of its hosts
+        routing.sum_duplicates()
+        routing.data[:] = 1.0
+        return routing, path_loss
+
+
+def reduce_pinger_paths(json_data, level_indexes):
+    """
+    Per pinger reduction of the tomography engine: parse the hosts of
+    every path, the paths are not voted, every path is kept as a row with
+    its distinct hosts (they are rolled up to the levels once all the
+    paths are merged)
+    :param json_data: the list of path results sent by a pinger
+    :param level_indexes: OrderedDict level -> NetworkPrefixIndex
+    :return: tuple (hop_names, (indptr, hop_ids, path_loss), edges),
+        hop_ids and edges are indexes on hop_names
+    """
+    if isinstance(json_data, dict):
+        raise ValueError("the tomography analysis needs the paths, the "
+                         "pinger sent a summary")
+
+    prefix_index = level_indexes['host']
+    hop_index = {}
+    edges = set()
+    indptr = [0]
+    hop_ids = []
+    path_loss = []
+
+    for ping_result in json_data:
+        path_ids = [None if network is None
+                    else hop_index.setdefault(network, len(hop_index))
+                    for network in prefix_index.lookup_many(
+                        ping_result['path'])]
+
+        for hop_id_1, hop_id_2 in zip(path_ids, path_ids[1:]):
+            if hop_id_1 is not None and hop_id_2 is not None:
+                edges.add((hop_id_1, hop_id_2))
+
+        path_hops = sorted(set(path_ids) - {None})
+        if not path_hops:
+            continue
+
+        hop_ids.extend(path_hops)
+        indptr.append(len(hop_ids))
+        path_loss.append(ping_result['lost_percent'])
+
+    return list(hop_index.keys()), (
+        np.array(indptr, dtype=np.int64), np.array(hop_ids, dtype=np.int64),
+        np.array(path_loss, dtype=np.float64)), edges
+
+
+def merge_pinger_paths(reduction, hop_index, edges, builder):
+    """
+    Add the paths of a pinger to the routing matrix of the iteration, the
+    local hop indexes are translated to the iteration hop ids
+    :param reduction: tuple returned by reduce_pinger_paths
+    :param hop_index: dict network address -> integer id (updated in place)
+    :param edges: set of (hop id, hop id) tuples (updated in place)
+    :param builder: PathMatrixBuilder of the iteration
+    :return:
+    """
+    hop_names, (indptr, hop_ids, path_loss), local_edges = reduction
+    global_ids = [hop_index.setdefault(k, len(hop_index)) for k in hop_names]
+    edges.update((global_ids[a], global_ids[b]) for a, b in local_edges)
+    builder.add(indptr, np.array(global_ids, dtype=np.int64)[hop_ids],
+                path_loss)
+
+
+def solve_hop_loss(routing, path_loss):
+    """
+    Network tomography: estimate the packet loss of every hop from the
+    packet loss of the paths that cross it.
+    The success rate of a path is the product of the success rates of its
+    hops, so with x = -log(1 - hop loss) and y = -log(1 - path loss) the
+    problem is the linear system routing * x = y with x >= 0, solved by
+    bounded least squares (LSMR on the sparse matrix).
+    Before solving, the hops that are only crossed by loss free paths are
+    set to 0 (the least squares solution for them is 0 anyway) and these
+    paths are removed, usually this leaves a small system
+    :param routing: scipy.sparse.csr_matrix of shape (paths, hops)
+    :param path_loss: numpy array with the packet loss (%) of every path
+    :return: numpy array with the estimated packet loss (%) of every hop
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    path_count, hop_count = routing.shape
+    hop_loss = np.zeros(hop_count, dtype=np.float64)
+    if path_count == 0 or hop_count == 0:
+        return hop_loss
+
+    success = np.clip(1.0 - path_loss / 100.0,
+                      app.config['MASTER_TOMOGRAPHY_MIN_SUCCESS'], 1.0)
+    y = -np.log(success)
+
+    lossy_paths = y > 0
+    lossy_hops = np.flatnonzero(routing[lossy_paths].getnnz(axis=0))
+    if lossy_hops.size == 0:
+        return hop_loss
+
+    # keep the paths that cross at least one candidate hop
+    reduced = routing[:, lossy_hops].tocsr()
+    kept_paths = np.flatnonzero(reduced.getnnz(axis=1))
+    reduced = reduced[kept_paths]
+    y = y[kept_paths]
+
+    logger.debug("{}: paths:{} hops:{} reduced to paths:{} hops:{}".format(
+        current_f_name, path_count, hop_count, reduced.shape[0],
+        reduced.shape[1]))
+
+    solution = lsq_linear(
+        reduced, y, bounds=(0, np.inf), method='trf', lsq_solver='lsmr',
+        lsmr_tol='auto', max_iter=app.config['MASTER_TOMOGRAPHY_MAX_ITER'])
+    logger.debug("{}: lsq_linear status:{} iterations:{} cost:{}".format(
+        current_f_name, solution.status, solution.nit, solution.cost))
+
+    hop_loss[lossy_hops] = 100.0 * -np.expm1(-solution.x)
+    return hop_loss
+
+
+class VotingAnalysis(object):
+    """
+    Iteration totals of the voting engine, the voted loss of every hop is
+    accumulated per analysis level
+    """
+    reducer = staticmethod(reduce_pinger_result)
+
+    def __init__(self):
+        self.levels = collections.OrderedDict(
+            (level, ({}, set(), HopLossAccumulator()))
+            for level in ANALYSIS_LEVELS)
+
+    def merge(self, reduction):
+        """
+        :param reduction: the reduction of a pinger (reduce_pinger_result)
+        :return:
+        """
+        for level, (hop_index, edges, accumulator) in self.levels.items():
+            merge_pinger_reduction(reduction[level], hop_index, edges,
+                                   accumulator)
+
+    def results(self):
+        """
+        :return: OrderedDict level -> (hop_names, hop_means, edges)
+        """
+        return collections.OrderedDict(
+            (level, (list(hop_index.keys()),
+                     accumulator.means(len(hop_index)), edges))
+            for level, (hop_index, edges, accumulator) in self.levels.items())
+
+
+class TomographyAnalysis(object):
+    """
+    Iteration totals of the tomography engine, the paths are kept at the
+    host level and the routing matrix of every level is rolled up from it
+    """
+    reducer = staticmethod(reduce_pinger_paths)
+
+    def __init__(self):
+        self.hop_index = {}
+        self.edges = set()
+        self.builder = PathMatrixBuilder()
+
+    def merge(self, reduction):
+        """
+        :param reduction: the reduction of a pinger (reduce_pinger_paths)
+        :return:
+        """
+        merge_pinger_paths(reduction, self.hop_index, self.edges,
+                           self.builder)
+
+    def results(self):
+        """
+        :return: OrderedDict level -> (hop_names, hop_means, edges)
+        """
+        levels = collections.OrderedDict()
+        for level, (hop_names, ids) in roll_up_levels(
+                get_level_indexes(), list(self.hop_index.keys())).items():
+            hop_loss = solve_hop_loss(
+                *self.builder.matrix(len(hop_names), ids))
+            levels[level] = (hop_names, hop_loss,
+                             roll_up_edges(self.edges, ids))
+        return levels
+
+
+ANALYSIS_ENGINES = {
+    'voting': VotingAnalysis,
+    'tomography': TomographyAnalysis,
+}
+
+
+# analyse_iteration time limit, a STARTED analysis older than this is dead
+ANALYSIS_TIME_LIMIT = 1200
+
+
+def request_iteration_analysis(master_iteration_id):
+    """
+    Single flight trigger of the analysis of a finished iteration: only
+    the first request (or the first one after a failed analysis) enqueues
+    analyse_iteration, the state is changed with a conditional update so
+    concurrent requests can not enqueue it twice
+    :param master_iteration_id: the master iteration id
+    :return: dict returned by get_iteration_analysis, 'requested' is True
+        if this call enqueued the analysis
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    master_table = models.MasterIteration.__table__
+    stmt = master_table.update().where(and_(
+        master_table.c.id == master_iteration_id,
+        or_(master_table.c.analysis_status.is_(None),
+            master_table.c.analysis_status == 'FAILURE'))).values(
+        analysis_status='PENDING',
+        analysis_date=datetime.now()).returning(master_table.c.id)
+    requested = db.session.execute(stmt).first() is not None
+    db.session.commit()
+
+    if requested:
+        analyse_iteration.apply_async(args=[master_iteration_id], kwargs={})
+
+    outcome = get_iteration_analysis(master_iteration_id)
+    outcome['requested'] = requested
+    logger.debug("{}: Master iteration {} analysis requested:{} status:{}".
+                 format(current_f_name, master_iteration_id, requested,
+                        outcome['analysis_status']))
+    return outcome
+
+
+def claim_iteration_analysis(master_iteration_id):
+    """
+    Move the analysis of an iteration to STARTED, only one caller can
+    claim it. A finished (SUCCESS) or running analysis can not be claimed,
+    unless it is STARTED for longer than the analysis time limit
+    :param master_iteration_id: the master iteration id
+    :return: True if the analysis was claimed
+    """
+    master_table = models.MasterIteration.__table__
+    stale_date = datetime.now() - timedelta(seconds=ANALYSIS_TIME_LIMIT)
+    stmt = master_table.update().where(and_(
+        master_table.c.id == master_iteration_id,
+        or_(master_table.c.analysis_status.is_(None),
+            master_table.c.analysis_status.in_(['PENDING', 'FAILURE']),
+            and_(master_table.c.analysis_status == 'STARTED',
+                 master_table.c.analysis_date < stale_date)))).values(
+        analysis_status='STARTED',
+        analysis_date=datetime.now()).returning(master_table.c.id)
+    claimed = db.session.execute(stmt).first() is not None
+    db.session.commit()
+    return claimed
+
+
+def finish_iteration_analysis(master_iteration_id, analysis_status):
+    """
+    :param master_iteration_id: the master iteration id
+    :param analysis_status: SUCCESS or FAILURE
+    :return:
+    """
+    db.session.query(models.MasterIteration).filter_by(
+        id=master_iteration_id).update({
+            'analysis_status': analysis_status,
+            'analysis_date': datetime.now()
+        })
+    db.session.commit()
 
 
-def get_network(ip, netmask=24):
-    addr = ipcalc.IP(ip, mask=netmask)
-    network_with_cidr = str(addr.guess_network())
-    bare_network = network_with_cidr.split('/')[0]
-    return addr, network_with_cidr, bare_network
+def get_iteration_analysis(master_iteration_id):
+    """
+    Get the state of the analysis of an iteration and its stored
+    problematic hosts once it is finished
+    :param master_iteration_id: the master iteration id
+    :return: dict with the 'analysis_status' and the 'problematic_hosts'
+        (a list of dicts with the host and its score)
+    """
+    master_it = db.session.query(models.MasterIteration).filter_by(
+        id=master_iteration_id).first()
+    if master_it is None:
+        return {'analysis_status': None, 'problematic_hosts': []}
+
+    problematic_hosts = []
+    if master_it.analysis_status == 'SUCCESS':
+        result_t = db.session.query(models.MasterIterationResult).filter_by(
+            master_iteration_id=master_iteration_id).order_by(
+            models.MasterIterationResult.id)
+        problematic_hosts = [{'host': r.problematic_host,
+                              'score': float(r.score)} for r in result_t]
 
+    return {'analysis_status': master_it.analysis_status,
+            'problematic_hosts': problematic_hosts}
 
-@celery.task(time_limit=1200, soft_time_limit=1100)
+
+@celery.task(time_limit=ANALYSIS_TIME_LIMIT,
+             soft_time_limit=ANALYSIS_TIME_LIMIT - 100)
 def analyse_iteration(master_iteration_id):
     """
     Analyse a iteration, the results of this iteration will be added to the
@@ -88,7 +974,9 @@ def analyse_iteration(master_iteration_id):
         - the lost_percent using iperf must be 0 for healty paths
         - if the paths have a lost_percent > 0 then this is a problematic path
         - for every pinger result the addresses of the hops are grouped by
-            their network address
+            their network address, the netmask of every hop is the one of
+            the longest matching prefix of NETWORK_SEGMENTATION_PREFIXES
+            (DEFAULT_NETWORK_SEGMENTATION if no prefix matches)
         - for every network addres on a pinger result a packet_loss
             result is stored
         - then a voting mechanism is performed, if more than half of the
@@ -103,148 +991,1348 @@ def analyse_iteration(master_iteration_id):
         - then its calculated the mean of those measurements
         - the scores are then classified using a 25% outlier percentile metric
         - the outliers are then added to the database
-    :return:
+    The network addresses are mapped to integer ids and the samples are kept
+    in numpy arrays, so the voting and the means are grouped reductions
+    instead of python list operations.
+    The per pinger steps run in a pool of MASTER_ANALYSIS_WORKERS processes
+    when it is greater than 1, the results are merged in the same order so
+    they are identical to the serial ones.
+    With MASTER_INCREMENTAL_ANALYSIS the per pinger steps were already
+    done by fold_pinger_result when every result arrived, and only the
+    per hop accumulators of the iteration are read.
+    With MASTER_ANALYSIS_ENGINE = 'tomography' the paths are not voted,
+    all of them are added to a sparse path x hop matrix and the loss of
+    every hop is estimated by solve_hop_loss, the outliers of these
+    estimations are stored in the same way.
+    The hosts are parsed once and rolled up to every analysis level
+    (host, subnet and aggregate), the graph of every level is stored and
+    the outliers are the ones of the subnet level.
+    Only one analysis runs for every iteration (claim_iteration_analysis),
+    the repeated calls return the stored problematic hosts or None if
+    the analysis is still running.
+    :return: the list of problematic hosts
     """
     current_f_name = inspect.currentframe().f_code.co_name
 
-    network_segmentation = app.config['DEFAULT_NETWORK_SEGMENTATION']
     logger.debug("{}: Analyse_iteration called".format(current_f_name))
 
-    pinger_iteration_t = db.session.query(
-        models.MasterIterationPinger).filter_by(
-        master_iteration_id=master_iteration_id, status="FINISHED")
+    if not claim_iteration_analysis(master_iteration_id):
+        outcome = get_iteration_analysis(master_iteration_id)
+        logger.info("{}: Master iteration {} analysis is {}, skipped".format(
+            current_f_name, master_iteration_id, outcome['analysis_status']))
+        if outcome['analysis_status'] != 'SUCCESS':
+            return None
+        return [h['host'] for h in outcome['problematic_hosts']]
+
+    try:
+        problematic_nodes = run_iteration_analysis(master_iteration_id)
+    except Exception as e:
+        logger.error("{}: Master iteration {} analysis failed: {}".format(
+            current_f_name, master_iteration_id, str(e)))
+        db.session.rollback()
+        finish_iteration_analysis(master_iteration_id, 'FAILURE')
+        publish_master_event('analysis_finished',
+                             master_iteration_id=master_iteration_id,
+                             analysis_status='FAILURE')
+        raise
+
+    finish_iteration_analysis(master_iteration_id, 'SUCCESS')
+    publish_master_event('analysis_finished',
+                         master_iteration_id=master_iteration_id,
+                         analysis_status='SUCCESS')
+    render_iteration_plot.apply_async(args=[master_iteration_id], kwargs={})
+    return problematic_nodes
 
-    logger.debug("{}: Found: {} results".format(current_f_name,
-                                                pinger_iteration_t.count()))
 
-    s = db.session()
+def run_iteration_analysis(master_iteration_id):
+    """
+    Analyse the iteration and store the results (see analyse_iteration)
+    :param master_iteration_id: the master iteration id
+    :return: the list of problematic hosts
+    """
+    # the accumulators of the incremental analysis only have the votes,
+    # the tomography engine always reads the pinger results
+    if (app.config['MASTER_INCREMENTAL_ANALYSIS'] and
+            app.config['MASTER_ANALYSIS_ENGINE'] == 'voting'):
+        levels = collections.OrderedDict(
+            (level, load_hop_accumulators(master_iteration_id, level))
+            for level in ANALYSIS_LEVELS)
+        return store_iteration_analysis(master_iteration_id, levels)
 
-    node_data = []
-    edges = set()
-    for p_iter in pinger_iteration_t:
-        try:
-            json_data = ast.literal_eval(p_iter.result)
-        except Exception as e:
+    levels = analyse_pinger_results(master_iteration_id,
+                                    app.config['MASTER_ANALYSIS_WORKERS'])
+    return store_iteration_analysis(master_iteration_id, levels)
+
+
+def analyse_pinger_results(master_iteration_id, workers):
+    """
+    Run the analysis engine (MASTER_ANALYSIS_ENGINE) on the stored pinger
+    results of an iteration, nothing is stored
+    :param master_iteration_id: the master iteration id
+    :param workers: number of processes used to reduce the pinger results
+    :return: OrderedDict level -> (hop_names, hop_means, edges)
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    engine = app.config['MASTER_ANALYSIS_ENGINE']
+    batch_size = app.config['MASTER_ANALYSIS_BATCH_SIZE']
+
+    pinger_count = db.session.query(models.MasterIterationPinger).filter_by(
+        master_iteration_id=master_iteration_id, status="FINISHED").count()
+
+    logger.debug("{}: Found: {} results workers:{}".format(
+        current_f_name, pinger_count, workers))
+
+    # server side cursor, only batch_size results are fetched at once
+    pinger_result_t = db.session.execute(
+        PINGER_RESULT_PROJECTION_SQL.execution_options(
+            stream_results=True, max_row_buffer=batch_size),
+        {'master_iteration_id': master_iteration_id})
+    rows = ((row.id, row.result) for row in pinger_result_t)
+
+    analysis = ANALYSIS_ENGINES[engine]()
+    # calculate loss by voting (if it is 0) or by mean (or keep the paths
+    # for the tomography), then join the result with the other traces and
+    # release it
+    for p_iter_id, reduction, error in map_pinger_rows(
+            rows, workers, batch_size, analysis.reducer):
+        if reduction is None:
             logger.error(
-                "{}: Error loading data. Master pinger {} result:{} error:{}".
-                    format(current_f_name, p_iter.id, p_iter.result, str(e)))
+                "{}: Error loading data. Master pinger {} error:{}".format(
+                    current_f_name, p_iter_id, error))
             continue
 
-        node_data_local = {}
-
-        for ping_result in json_data:
-            src = ping_result['pinger_address']
-            dst = ping_result['ponger_address']
-            packet_loss = ping_result['lost_percent']
-
-            path = ping_result['path']
-
-            logger.debug(
-                "{}: Testing path:{} src:{} dst:{} lost_percent:{}".format(
-                    current_f_name, path, src, dst, packet_loss))
-
-            for i in range(len(path)):
-                hop = path[i]
-                # remove repeated paths
-                if hop == "?":
-                    continue
-
-                a1, n1, bn1 = get_network(hop, netmask=network_segmentation)
-
-                if i < len(path) - 1:
-                    hop2 = path[i + 1]
-                    a2, n2, bn2 = get_network(
-                        hop2, netmask=network_segmentation)
-                    edges.add((bn1, bn2))
-
-                if bn1 not in node_data_local.keys():
-                    node_data_local[bn1] = {'samples': [packet_loss]}
-                else:
-                    node_data_local[bn1] = {
-                        'samples':
-                            node_data_local[bn1]['samples'] + [packet_loss]
-                    }
-
-        # calculate loss by voting (if it is 0) or by mean
-        for k, v in node_data_local.items():
-            # count the number of samples
-            samples = v['samples']
-            max_e = max(samples, key=samples.count)
-            count_max_e = samples.count(max_e)
-
-            if count_max_e > len(samples) / 2:
-                v['loss'] = max_e
-                logger.debug(
-                    "{}: k:{} loss:{} using max value:{} count:{}".format(
-                        current_f_name, k, v['loss'], max_e, count_max_e))
-            else:
-                # or calculate the mean
-                v['loss'] = sum(samples) / len(samples)
-                logger.debug("{}: k:{} loss:{} using mean:{}".format(
-                    current_f_name, k, v['loss'], samples))
-            pass
-
-        node_data.append(node_data_local)
-
-    # after filtering the information locally for every trace
-    # now the traces are joined and the information shared
-    node_data_final = {}
-    for nd in node_data:
-        for k, v in nd.items():
-            if k in node_data_final.keys():
-                node_data_final[k] = {
-                    'samples': node_data_final[k]['samples'] + [v['loss']]
-                }
-            else:
-                node_data_final[k] = {'samples': [v['loss']]}
-    for _k, v in node_data_final.items():
-        v['mean'] = sum(v['samples']) / len(v['samples'])
+        analysis.merge(reduction)
 
-    sorted_by_value = sorted(
-        node_data_final.items(), key=lambda kv: kv[1]['mean'], reverse=True)
-    logger.debug("{}: Node score:{}".format(current_f_name, sorted_by_value))
+    return analysis.results()
 
-    problematic_nodes = []
 
-    if len(sorted_by_value) > 0:
-        values = [e[1]['mean'] for e in sorted_by_value]
-        outliers_index = get_outliers(values)
-        logger.debug("{}: outliers_index:{}".format(current_f_name,
-                                                    outliers_index))
-        for i in outliers_index:
-            k = sorted_by_value[i][0]
-            score = sorted_by_value[i][1]['mean']
-            logger.debug("{}: problematic host:{} score:{}".format(
-                current_f_name, k, score))
+def fold_pinger_result(master_iteration_id, pinger_result):
+    """
+    Incremental analysis: vote the hops of a single pinger result and
+    merge them into the per hop accumulators of every level of the
+    iteration ('master_iteration_hop' and 'master_iteration_edge' tables).
+    The changes are added to the current session, the caller commits them
+    :param master_iteration_id: the master iteration id
+    :param pinger_result: the list of path results sent by a pinger
+    :return: True if the result was merged
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
 
-            s.add(
-                models.MasterIterationResult(
-                    master_iteration_id=master_iteration_id,
-                    problematic_host=k,
-                    score=score))
+    try:
+        reduction = reduce_pinger_result(pinger_result, get_level_indexes())
+    except Exception as e:
+        logger.error("{}: Error loading data. Master iteration {} error:{}".
+                     format(current_f_name, master_iteration_id, str(e)))
+        return False
 
-            problematic_nodes.append(k)
+    s = db.session()
 
-        s.commit()
+    hop_rows = []
+    edge_rows = []
+    for level, (hop_names, loss, edges) in reduction.items():
+        hop_rows.extend(
+            {'master_iteration_id': master_iteration_id,
+             'level': level,
+             'hop': hop_names[h],
+             'loss_sum': l,
+             'sample_count': 1} for h, l in enumerate(loss.tolist()))
+        edge_rows.extend(
+            {'master_iteration_id': master_iteration_id,
+             'level': level,
+             'src_hop': hop_names[e[0]],
+             'dst_hop': hop_names[e[1]]} for e in edges)
+
+    if not hop_rows:
+        return True
+
+    # rows sorted by hop, so concurrent pingers lock them in the same order
+    hop_rows.sort(key=lambda r: (r['level'], r['hop']))
+    hop_table = models.MasterIterationHop.__table__
+    stmt = pg_insert(hop_table).values(hop_rows)
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['master_iteration_id', 'level', 'hop'],
+        set_={
+            'loss_sum': hop_table.c.loss_sum + stmt.excluded.loss_sum,
+            'sample_count':
+                hop_table.c.sample_count + stmt.excluded.sample_count
+        })
+    s.execute(stmt)
+
+    if edge_rows:
+        edge_rows.sort(
+            key=lambda r: (r['level'], r['src_hop'], r['dst_hop']))
+        stmt = pg_insert(models.MasterIterationEdge.__table__).values(
+            edge_rows).on_conflict_do_nothing()
+        s.execute(stmt)
+
+    logger.debug("{}: Master iteration {} folded hops:{} edges:{}".format(
+        current_f_name, master_iteration_id, len(hop_rows), len(edge_rows)))
+    return True
+
+
+MASTER_PATH_RESULT_COLUMNS = (
+    'master_iteration_id', 'master_iteration_pinger_id', 'pinger_address',
+    'ponger_address', 'src_port', 'dst_port', 'path_id', 'lost_percent',
+    'bits_per_second', 'bytes', 'seconds')
+
+
+def get_path_hash(hops):
+    """
+    :param hops: the hops of a path
+    :return: the key of the path in master_path
+    """
+    return hashlib.sha1('\n'.join(hops).encode('utf-8')).hexdigest()
 
-    # generate the graph with the probabilities
+
+def store_master_paths(paths):
+    """
+    Add the paths that are not in master_path yet, the rows are written in
+    hash order so concurrent pinger results lock them in a consistent
+    order. The last seen date of the known paths (retention of the unused
+    paths) is updated at most once a day
+    The changes are added to the current session, the caller commits them
+    :param paths: dict path hash -> hops
+    :return: dict path hash -> master_path id
+    """
+    if not paths:
+        return {}
+
+    path_table = models.MasterPath.__table__
+    stmt = pg_insert(path_table).values(
+        [{'path_hash': path_hash, 'hops': paths[path_hash]}
+         for path_hash in sorted(paths)])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=[path_table.c.path_hash],
+        set_={'last_seen_date': func.now()},
+        where=path_table.c.last_seen_date < func.now() - timedelta(days=1))
+    db.session.execute(stmt)
+
+    return dict(db.session.query(
+        models.MasterPath.path_hash, models.MasterPath.id).filter(
+        models.MasterPath.path_hash.in_(list(paths))))
+
+
+def copy_value(value):
+    """
+    :param value: a value of a row of COPY
+    :return: the value in the text format of COPY
+    """
+    if value is None:
+        return '\\N'
+    return str(value).replace('\\', '\\\\').replace('\t', '\\t').replace(
+        '\n', '\\n').replace('\r', '\\r')
+
+
+def store_pinger_path_results(master_iteration_id, master_iteration_pinger_id,
+                              pinger_result):
+    """
+    Bulk load the path results of a pinger into master_path_result with
+    COPY, one row per measured path with the id of its hops in master_path
+    The changes are added to the current session (the transaction of the
+    pinger result), the caller commits them
+    :param master_iteration_id: the master iteration id
+    :param master_iteration_pinger_id: the master iteration pinger id
+    :param pinger_result: list of path results of the pinger
+    :return: the number of rows loaded
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    paths = {}
+    rows = []
+    for e in pinger_result:
+        if not isinstance(e, dict) or 'ponger_address' not in e:
+            logger.error("{}: Invalid path result: {}".format(
+                current_f_name, e))
+            continue
+        hops = [str(h) for h in e.get('path', [])]
+        path_hash = get_path_hash(hops)
+        paths[path_hash] = hops
+        rows.append((e, path_hash))
+
+    path_ids = store_master_paths(paths)
+
+    data = io.StringIO()
+    for e, path_hash in rows:
+        values = (master_iteration_id, master_iteration_pinger_id,
+                  e['pinger_address'], e['ponger_address'],
+                  e.get('src_port'), e.get('dst_port'), path_ids[path_hash],
+                  e.get('lost_percent'), e.get('bits_per_second'),
+                  None if e.get('bytes') is None else int(e['bytes']),
+                  e.get('seconds'))
+        data.write('\t'.join(copy_value(v) for v in values))
+        data.write('\n')
+    data.seek(0)
+
+    # the connection of the session, in the transaction of the result
+    cursor = db.session.connection().connection.cursor()
+    cursor.copy_expert(
+        "COPY public.master_path_result ({}) FROM STDIN".format(
+            ', '.join(MASTER_PATH_RESULT_COLUMNS)), data)
+
+    logger.debug("{}: Master iteration:{} pinger:{} path results:{} "
+                 "paths:{}".format(current_f_name, master_iteration_id,
+                                   master_iteration_pinger_id, len(rows),
+                                   len(paths)))
+    return len(rows)
+
+
+def get_path_results(master_iteration_id, ponger_address=None):
+    """
+    :param master_iteration_id: the master iteration id
+    :param ponger_address: only the paths to this ponger
+    :return: list of the path results of the iteration (master_path_result
+        with the hops of their path)
+    """
+    result_t = db.session.query(
+        models.MasterPathResult, models.MasterPath.hops).join(
+        models.MasterPath,
+        models.MasterPathResult.path_id == models.MasterPath.id).filter(
+        models.MasterPathResult.master_iteration_id == master_iteration_id)
+    if ponger_address is not None:
+        result_t = result_t.filter(
+            models.MasterPathResult.ponger_address == ponger_address)
+
+    results = []
+    for row, hops in result_t.order_by(models.MasterPathResult.id):
+        result = {c: getattr(row, c) for c in MASTER_PATH_RESULT_COLUMNS}
+        result['path'] = hops
+        results.append(result)
+    return results
+
+
+def load_hop_accumulators(master_iteration_id, level=DEFAULT_ANALYSIS_LEVEL):
+    """
+    Read the per hop accumulators of an iteration
+    :param master_iteration_id: the master iteration id
+    :param level: the analysis level
+    :return: a tuple (hop_names, hop_means, edges) as used by
+        store_iteration_analysis
+    """
+    hop_t = db.session.query(
+        models.MasterIterationHop.hop, models.MasterIterationHop.loss_sum,
+        models.MasterIterationHop.sample_count).filter_by(
+        master_iteration_id=master_iteration_id, level=level).order_by(
+        models.MasterIterationHop.id).all()
+
+    hop_names = [row.hop for row in hop_t]
+    loss_sum = np.array([row.loss_sum for row in hop_t], dtype=np.float64)
+    sample_count = np.array([row.sample_count for row in hop_t],
+                            dtype=np.float64)
+    hop_means = loss_sum / np.maximum(sample_count, 1)
+
+    hop_index = {k: i for i, k in enumerate(hop_names)}
+    edge_t = db.session.query(
+        models.MasterIterationEdge.src_hop,
+        models.MasterIterationEdge.dst_hop).filter_by(
+        master_iteration_id=master_iteration_id, level=level)
+    edges = set()
+    for row in edge_t:
+        if row.src_hop in hop_index and row.dst_hop in hop_index:
+            edges.add((hop_index[row.src_hop], hop_index[row.dst_hop]))
+
+    return hop_names, hop_means, edges
+
+
+def rank_hop_outliers(hop_names, hop_means):
+    """
+    Sort the hops by score and find the outliers
+    :param hop_names: list with the network address of every hop id
+    :param hop_means: numpy array with the score of every hop id
+    :return: list of (host, score) tuples of the outliers
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    # stable sort keeps the first seen hop first on equal scores
+    sorted_index = np.argsort(-hop_means, kind='stable')
+    sorted_names = [hop_names[i] for i in sorted_index]
+    values = hop_means[sorted_index].tolist()
+    logger.debug("{}: Node score:{}".format(
+        current_f_name, list(zip(sorted_names, values))))
+
+    if len(values) <= 0:
+        return []
+
+    outliers_index = get_outliers(
+        values, app.config['MASTER_OUTLIER_Z_SCORE_THRESHOLD'],
+        app.config['MASTER_OUTLIER_MODIFIED_Z_SCORE_THRESHOLD'])
+    logger.debug("{}: outliers_index:{}".format(current_f_name,
+                                                outliers_index))
+    return [(sorted_names[i], values[i]) for i in outliers_index]
+
+
+def load_hop_baseline(hop_names):
+    """
+    Get the historic mean loss and its variance of the hops
+    Hops with less than MASTER_BASELINE_MIN_SAMPLES iterations of
+    history get a baseline of 0 (healthy) with a variance of 0
+    :param hop_names: list of network addresses
+    :return: tuple of numpy arrays, the baseline mean and variance of every
+        hop
+    """
+    baseline = np.zeros(len(hop_names), dtype=np.float64)
+    variance = np.zeros(len(hop_names), dtype=np.float64)
+    if not hop_names:
+        return baseline, variance
+
+    hop_index = {k: i for i, k in enumerate(hop_names)}
+    baseline_t = db.session.query(
+        models.HopBaseline.hop, models.HopBaseline.ewma_mean,
+        models.HopBaseline.ewma_variance).filter(
+        models.HopBaseline.hop.in_(hop_names),
+        models.HopBaseline.sample_count >=
+        app.config['MASTER_BASELINE_MIN_SAMPLES'])
+    for row in baseline_t:
+        baseline[hop_index[row.hop]] = row.ewma_mean
+        variance[hop_index[row.hop]] = row.ewma_variance
+
+    return baseline, variance
+
+
+def update_hop_baseline(master_iteration_id, hop_names, hop_means):
+    """
+    Add the scores of an iteration to the exponentially weighted moving
+    mean and variance of every hop, in a single upsert. The cost depends
+    only on the number of hops of this iteration
+    A hop is only updated by an iteration after the last one added to it
+    (last_master_iteration_id), a retried analysis does not add its
+    iteration twice
+    :param master_iteration_id: the master iteration id
+    :param hop_names: list with the network address of every hop id
+    :param hop_means: numpy array with the score of every hop id
+    :return:
+    """
+    if not hop_names:
+        return
+
+    alpha = app.config['MASTER_BASELINE_ALPHA']
+    now = datetime.now()
+
+    rows = sorted(
+        ({'hop': k, 'ewma_mean': v, 'ewma_variance': 0.0, 'sample_count': 1,
+          'last_seen_date': now,
+          'last_master_iteration_id': master_iteration_id}
+         for k, v in zip(hop_names, hop_means.tolist())),
+        key=lambda r: r['hop'])
+
+    baseline_table = models.HopBaseline.__table__
+    stmt = pg_insert(baseline_table).values(rows)
+    # the right side of the SET uses the values before the update
+    delta = stmt.excluded.ewma_mean - baseline_table.c.ewma_mean
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['hop'],
+        set_={
+            'ewma_mean': baseline_table.c.ewma_mean + alpha * delta,
+            'ewma_variance': (1 - alpha) * (
+                baseline_table.c.ewma_variance + alpha * delta * delta),
+            'sample_count': baseline_table.c.sample_count + 1,
+            'last_seen_date': stmt.excluded.last_seen_date,
+            'last_master_iteration_id':
+                stmt.excluded.last_master_iteration_id
+        },
+        where=func.coalesce(baseline_table.c.last_master_iteration_id, 0) <
+        stmt.excluded.last_master_iteration_id)
+    db.session.execute(stmt)
+
+
+def get_hop_scores(hop_names, hop_means):
+    """
+    The score used to find the outliers: the mean loss of the hop, or with
+    MASTER_BASELINE_SCORING how much the loss is over the usual loss of
+    this hop in standard deviations of its history, so a hop that is
+    always lossy does not hide a new problem and the same excess counts
+    more on a stable hop than on a noisy one. The deviation is at least
+    MASTER_BASELINE_MIN_STDDEV (the hops without enough history have no
+    variance)
+    :param hop_names: list with the network address of every hop id
+    :param hop_means: numpy array with the mean loss of every hop id
+    :return: numpy array with the score of every hop id
+    """
+    if not app.config['MASTER_BASELINE_SCORING']:
+        return hop_means
+
+    baseline, variance = load_hop_baseline(hop_names)
+    stddev = np.sqrt(variance + app.config['MASTER_BASELINE_MIN_STDDEV'] ** 2)
+    return np.maximum(hop_means - baseline, 0.0) / stddev
+
+
+def get_provisional_problematic_hosts(master_iteration_id):
+    """
+    Outliers of the results folded so far for an iteration that is still
+    running (MASTER_INCREMENTAL_ANALYSIS), nothing is stored
+    :param master_iteration_id: the master iteration id
+    :return: list of (host, score) tuples
+    """
+    hop_names, hop_means, _edges = load_hop_accumulators(master_iteration_id)
+    return rank_hop_outliers(hop_names, get_hop_scores(hop_names, hop_means))
+
+
+def build_json_graph(hop_names, hop_means, edges):
+    """
+    Generate the graph of an analysis level with the loss of every hop
+    :param hop_names: list with the network address of every hop id
+    :param hop_means: numpy array with the mean loss of every hop id
+    :param edges: set of (hop id, hop id) tuples
+    :return: the node link data of the graph
+    """
     G = nx.DiGraph()
-    for k, v in node_data_final.items():
-        G.add_node(k, mean=v['mean'])
+    for k, mean in zip(hop_names, hop_means.tolist()):
+        G.add_node(k, mean=mean)
+
+    G.add_edges_from([(hop_names[e[0]], hop_names[e[1]]) for e in edges])
+
+    return json_graph.node_link_data(G)
+
 
-    G.add_edges_from([(k[0], k[1]) for k in list(edges)])
+def store_iteration_analysis(master_iteration_id, levels):
+    """
+    Detect the outliers of the hop scores of an iteration and store them
+    as 'master_iteration_result' rows, also store the json graph of every
+    level of the iteration and add the hop scores to the historic baseline
+    The outliers and the baseline use the subnet level, its graph is the
+    'master_iteration' json_graph and the graphs of the other levels are
+    stored in 'master_iteration_graph'. The nodes of every level are also
+    indexed for the subgraph views (store_node_index)
+    :param master_iteration_id: the master iteration id
+    :param levels: dict level -> (hop_names, hop_means, edges), hop_means
+        is a numpy array with the mean loss of every hop id and edges a
+        set of (hop id, hop id) tuples
+    :return: the list of problematic hosts
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    s = db.session()
+
+    hop_names, hop_means, edges = levels[DEFAULT_ANALYSIS_LEVEL]
+
+    # a retried analysis replaces the results of the failed one
+    db.session.query(models.MasterIterationResult).filter_by(
+        master_iteration_id=master_iteration_id).delete()
+
+    problematic_nodes = []
+
+    outliers = rank_hop_outliers(hop_names,
+                                 get_hop_scores(hop_names, hop_means))
+    for k, score in outliers:
+        logger.debug("{}: problematic host:{} score:{}".format(
+            current_f_name, k, score))
+
+        s.add(
+            models.MasterIterationResult(
+                master_iteration_id=master_iteration_id,
+                problematic_host=k,
+                score=score))
+
+        problematic_nodes.append(k)
 
-    g_json = json_graph.node_link_data(G)
+    if outliers:
+        s.commit()
+
+    # generate the graph with the probabilities
+    g_json = build_json_graph(hop_names, hop_means, edges)
     logger.debug("{}: Json graph:{}".format(current_f_name, g_json))
 
     master_it = db.session.query(models.MasterIteration).filter_by(id=master_iteration_id).first()
     if master_it:
         master_it.json_graph = json.dumps(g_json)
+
+        graph_rows = [
+            {'master_iteration_id': master_iteration_id,
+             'level': level,
+             'json_graph': json.dumps(build_json_graph(*levels[level]))}
+            for level in levels if level != DEFAULT_ANALYSIS_LEVEL]
+        if graph_rows:
+            graph_table = models.MasterIterationGraph.__table__
+            stmt = pg_insert(graph_table).values(graph_rows)
+            stmt = stmt.on_conflict_do_update(
+                index_elements=['master_iteration_id', 'level'],
+                set_={'json_graph': stmt.excluded.json_graph})
+            s.execute(stmt)
+        store_node_index(master_iteration_id, levels)
+        invalidate_response_cache(master_iteration_id)
+        invalidate_master_status(master_iteration_id)
         s.commit()
 
+    update_hop_baseline(master_iteration_id, hop_names, hop_means)
+    s.commit()
+
     return problematic_nodes
 
 
+def store_node_index(master_iteration_id, levels):
+    """
+    Store the subgraph index of an iteration: a 'master_iteration_node' row
+    for every node of every level with its parent (the network of the node
+    on the next coarser level), its number of children and its adjacency,
+    every neighbour is stored as a [node, parent] pair
+    The changes are added to the current session, the caller commits them
+    :param master_iteration_id: the master iteration id
+    :param levels: dict level -> (hop_names, hop_means, edges)
+    :return: the number of nodes stored
+    """
+    level_indexes = get_level_indexes()
+    level_names = [level for level in ANALYSIS_LEVELS if level in levels]
+
+    s = db.session()
+
+    # a retried analysis replaces the index of the failed one
+    db.session.query(models.MasterIterationNode).filter_by(
+        master_iteration_id=master_iteration_id).delete()
+
+    rows = []
+    child_count = collections.Counter()
+    for i, level in enumerate(level_names):
+        hop_names, hop_means, edges = levels[level]
+
+        parents = [None] * len(hop_names)
+        if i + 1 < len(level_names):
+            parents = level_indexes[level_names[i + 1]].lookup_many(hop_names)
+            child_count.update((level_names[i + 1], p) for p in parents)
+
+        successors = [[] for _ in hop_names]
+        predecessors = [[] for _ in hop_names]
+        for a, b in sorted(edges):
+            successors[a].append([hop_names[b], parents[b]])
+            predecessors[b].append([hop_names[a], parents[a]])
+
+        rows.extend(
+            {'master_iteration_id': master_iteration_id,
+             'level': level,
+             'node': k,
+             'parent': parents[h],
+             'mean': mean,
+             'child_count': child_count[(level, k)],
+             'successors': successors[h],
+             'predecessors': predecessors[h]}
+            for h, (k, mean) in enumerate(zip(hop_names, hop_means.tolist())))
+
+    if rows:
+        s.execute(models.MasterIterationNode.__table__.insert(), rows)
+    return len(rows)
+
+
+def store_node_layout(master_iteration_id, level, json_graph_data):
+    """
+    Copy the node positions of a json_graph to the subgraph index
+    The changes are added to the current session, the caller commits them
+    :param master_iteration_id: the master iteration id
+    :param level: the analysis level of the graph
+    :param json_graph_data: json_graph (json text) with the x/y of the nodes
+    :return:
+    """
+    rows = [{'b_node': n['id'], 'b_x': n['x'], 'b_y': n['y']}
+            for n in json.loads(json_graph_data)['nodes']]
+    if not rows:
+        return
+
+    node_table = models.MasterIterationNode.__table__
+    stmt = node_table.update().where(and_(
+        node_table.c.master_iteration_id == master_iteration_id,
+        node_table.c.level == level,
+        node_table.c.node == bindparam('b_node'))).values(
+        x=bindparam('b_x'), y=bindparam('b_y'))
+    db.session().execute(stmt, rows)
+
+
+def node_link_json(nodes, links):
+    """
+    :param nodes: list of node dicts
+    :param links: iterable of (source, target) tuples
+    :return: the subgraph in the node link format of the json_graph
+    """
+    return {'directed': True,
+            'multigraph': False,
+            'graph': {},
+            'nodes': nodes,
+            'links': [{'source': a, 'target': b} for a, b in sorted(links)]}
+
+
+def node_json(node_t):
+    """
+    :param node_t: 'master_iteration_node' row
+    :return: the node dict of a subgraph
+    """
+    node = {'id': node_t.node,
+            'mean': node_t.mean,
+            'parent': node_t.parent,
+            'child_count': node_t.child_count}
+    if node_t.x is not None and node_t.y is not None:
+        node['x'] = node_t.x
+        node['y'] = node_t.y
+    return node
+
+
+def get_cluster_graph(master_iteration_id, level):
+    """
+    Collapsed view of an iteration: every node of the level is a cluster
+    of the nodes of the finer levels inside its network
+    :param master_iteration_id: the master iteration id
+    :param level: the analysis level of the clusters
+    :return: the subgraph in node link format
+    """
+    node_t = db.session.query(models.MasterIterationNode).filter_by(
+        master_iteration_id=master_iteration_id, level=level).all()
+
+    return node_link_json(
+        [node_json(n) for n in node_t],
+        {(n.node, succ) for n in node_t for succ, _parent in n.successors})
+
+
+def get_expanded_cluster(master_iteration_id, level, cluster):
+    """
+    Expand a cluster: the nodes of the finer level inside it, their links
+    and the links to the other clusters (kept collapsed)
+    :param master_iteration_id: the master iteration id
+    :param level: the analysis level of the cluster, not the host level
+    :param cluster: the network of the cluster
+    :return: the subgraph in node link format, None if the cluster is
+        not found
+    """
+    child_level = ANALYSIS_LEVELS[ANALYSIS_LEVELS.index(level) - 1]
+
+    node_t = db.session.query(models.MasterIterationNode).filter_by(
+        master_iteration_id=master_iteration_id, level=child_level,
+        parent=cluster).all()
+    if not node_t:
+        return None
+
+    links = set()
+    collapsed = set()
+    for n in node_t:
+        for succ, parent in n.successors:
+            if parent == cluster:
+                links.add((n.node, succ))
+            else:
+                links.add((n.node, parent))
+                collapsed.add(parent)
+        for pred, parent in n.predecessors:
+            if parent != cluster:
+                links.add((parent, n.node))
+                collapsed.add(parent)
+
+    nodes = [node_json(n) for n in node_t]
+    nodes.extend({'id': parent, 'collapsed': True}
+                 for parent in sorted(collapsed))
+    return node_link_json(nodes, links)
+
+
+def get_node_neighbourhood(master_iteration_id, level, seeds, hops):
+    """
+    k-hop neighbourhood of some nodes, the links are followed in both
+    directions and only the rows of the returned nodes are read
+    :param master_iteration_id: the master iteration id
+    :param level: the analysis level of the nodes
+    :param seeds: list of the nodes at the center of the neighbourhood
+    :param hops: maximum distance to the seeds
+    :return: the subgraph in node link format, the nodes have their
+        'distance' to the closest seed
+    """
+    node_rows = collections.OrderedDict()
+    distance = {}
+
+    frontier = set(seeds)
+    for d in range(hops + 1):
+        if not frontier:
+            break
+
+        node_t = db.session.query(models.MasterIterationNode).filter(and_(
+            models.MasterIterationNode.master_iteration_id ==
+            master_iteration_id,
+            models.MasterIterationNode.level == level,
+            models.MasterIterationNode.node.in_(sorted(frontier)))).all()
+
+        next_frontier = set()
+        for n in node_t:
+            node_rows[n.node] = n
+            distance[n.node] = d
+            next_frontier.update(k for k, _parent in n.successors)
+            next_frontier.update(k for k, _parent in n.predecessors)
+        frontier = next_frontier - set(node_rows)
+
+    nodes = []
+    for k, n in node_rows.items():
+        node = node_json(n)
+        node['distance'] = distance[k]
+        nodes.append(node)
+
+    return node_link_json(
+        nodes, {(k, succ) for k, n in node_rows.items()
+                for succ, _parent in n.successors if succ in node_rows})
+
+
+# supported content encodings of the cached responses, from the preferred
+RESPONSE_ENCODINGS = (('br', ) if brotli is not None else ()) + (
+    'gzip', 'identity')
+
+
+def compress_response(data, encodings=RESPONSE_ENCODINGS):
+    """
+    Compress a response body with some content encodings
+    :param data: the response body (bytes)
+    :param encodings: the content encodings (RESPONSE_ENCODINGS)
+    :return: OrderedDict content encoding -> body
+    """
+    bodies = collections.OrderedDict()
+    for encoding in encodings:
+        if encoding == 'br':
+            bodies[encoding] = brotli.compress(data)
+        elif encoding == 'gzip':
+            bodies[encoding] = gzip.compress(data, compresslevel=9)
+        else:
+            bodies[encoding] = data
+    return bodies
+
+
+def get_cached_response(master_iteration_id, key, encoding):
+    """
+    :param master_iteration_id: the master iteration id
+    :param key: the key of the response, the view and its arguments
+    :param encoding: the content encoding
+    :return: the 'master_iteration_response' row or None
+    """
+    return db.session.query(models.MasterIterationResponse).filter_by(
+        master_iteration_id=master_iteration_id, key=key,
+        encoding=encoding).first()
+
+
+def store_cached_response(master_iteration_id, key, data, mimetype):
+    """
+    Store a response of an iteration in the response cache, only the
+    responses that do not change any more (finished iterations) are stored
+    :param master_iteration_id: the master iteration id
+    :param key: the key of the response, the view and its arguments
+    :param data: the response body (bytes)
+    :param mimetype: the mimetype of the response
+    :return: tuple (etag, dict content encoding -> body)
+    """
+    etag = hashlib.sha1(data).hexdigest()
+    bodies = compress_response(data)
+
+    s = db.session()
+    stmt = pg_insert(models.MasterIterationResponse.__table__).values([
+        {'master_iteration_id': master_iteration_id,
+         'key': key,
+         'encoding': encoding,
+         'etag': etag,
+         'mimetype': mimetype,
+         'data': body,
+         'created_date': datetime.now()}
+        for encoding, body in bodies.items()]).on_conflict_do_nothing()
+    s.execute(stmt)
+    s.commit()
+    return etag, bodies
+
+
+def invalidate_response_cache(master_iteration_id):
+    """
+    Remove the cached responses of an iteration, its graphs changed
+    The changes are added to the current session, the caller commits them
+    :param master_iteration_id: the master iteration id
+    :return:
+    """
+    db.session.query(models.MasterIterationResponse).filter_by(
+        master_iteration_id=master_iteration_id).delete()
+
+
+PLOT_MIMETYPES = collections.OrderedDict([
+    ('png', 'image/png'),
+    ('svg', 'image/svg+xml'),
+])
+
+
+def compute_graph_layout(G):
+    """
+    Position of every node of a graph: graphviz 'dot' (layered layout) or
+    'sfdp' (multilevel force layout) for the graphs with more nodes than
+    MASTER_LAYOUT_DOT_MAX_NODES
+    :param G: networkx graph
+    :return: dict node -> (x, y) in screen coordinates: points, the y axis
+        goes down and the graph starts at (0, 0)
+    """
+    if G.number_of_nodes() == 0:
+        return {}
+
+    prog = 'dot'
+    if G.number_of_nodes() > app.config['MASTER_LAYOUT_DOT_MAX_NODES']:
+        prog = 'sfdp'
+
+    pos = nx.drawing.nx_agraph.graphviz_layout(G, prog=prog)
+    min_x = min(x for x, _y in pos.values())
+    max_y = max(y for _x, y in pos.values())
+    return {k: (round(x - min_x, 2), round(max_y - y, 2))
+            for k, (x, y) in pos.items()}
+
+
+def embed_graph_layout(json_graph_data):
+    """
+    Add the x/y position of every node to a json_graph, so the clients
+    can draw it without computing the layout
+    :param json_graph_data: json_graph (json text)
+    :return: tuple (json_graph text, True if the layout was computed), the
+        graphs that already have a layout are returned as they are
+    """
+    js_graph = json.loads(json_graph_data)
+    if all('x' in n and 'y' in n for n in js_graph['nodes']):
+        return json_graph_data, False
+
+    pos = compute_graph_layout(json_graph.node_link_graph(js_graph))
+    for n in js_graph['nodes']:
+        n['x'], n['y'] = pos[n['id']]
+    return json.dumps(js_graph), True
+
+
+def layout_iteration_graphs(master_iteration_id):
+    """
+    Compute once the layout of the graph of every level of an iteration,
+    the positions are stored in the json_graph of the level and in the
+    subgraph index
+    :param master_iteration_id: the master iteration id
+    :return: the number of graphs laid out
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    master_it = db.session.query(models.MasterIteration).filter_by(
+        id=master_iteration_id).first()
+    if master_it is None:
+        return 0
+
+    graphs = [(DEFAULT_ANALYSIS_LEVEL, master_it)] + [
+        (graph_t.level, graph_t)
+        for graph_t in db.session.query(models.MasterIterationGraph).filter_by(
+            master_iteration_id=master_iteration_id)]
+
+    start_time = time.time()
+    count = 0
+    for level, graph_t in graphs:
+        if not graph_t.json_graph:
+            continue
+        graph_t.json_graph, computed = embed_graph_layout(graph_t.json_graph)
+        if computed:
+            store_node_layout(master_iteration_id, level, graph_t.json_graph)
+            count += 1
+
+    if count:
+        invalidate_response_cache(master_iteration_id)
+        db.session.commit()
+        logger.info("{}: Master iteration {} {} graphs laid out in "
+                    "{:.2f}s".format(current_f_name, master_iteration_id,
+                                     count, time.time() - start_time))
+    return count
+
+
+def draw_json_graph(json_graph_data):
+    """
+    Draw the graph of an iteration on its own Figure, the global pyplot
+    figure is not used so nothing is kept between the renders
+    :param json_graph_data: the json_graph of the iteration (json text)
+    :return: dict format -> image bytes, for every PLOT_MIMETYPES format
+    """
+    G = json_graph.node_link_graph(json.loads(json_graph_data))
+
+    if all('x' in v and 'y' in v for _k, v in G.nodes(data=True)):
+        pos = {k: (v['x'], v['y']) for k, v in G.nodes(data=True)}
+    else:
+        pos = compute_graph_layout(G)
+    # screen coordinates, the y axis of the plot goes up
+    pos = {k: (x, -y) for k, (x, y) in pos.items()}
+
+    node_labels = {}
+    for k, v in G.nodes(data=True):
+        node_labels[k] = '{}\n{:.2f}%'.format(k, v['mean'])
+
+    fig = Figure(figsize=(30, 20))
+    FigureCanvasAgg(fig)
+    ax = fig.add_subplot(1, 1, 1)
+
+    nx.draw_networkx_labels(G, pos, labels=node_labels, font_size=5, ax=ax)
+
+    node_colors = [G.nodes[n]['mean'] for n in G.nodes()]
+
+    nx.draw_networkx_nodes(
+        G,
+        pos,
+        node_color=node_colors,
+        node_size=600,
+        node_shape='o',
+        cmap=cm.OrRd,
+        vmin=0.,
+        vmax=100.,
+        ax=ax)
+    nx.draw_networkx_edges(
+        G, pos, arrowstyle='-|>', arrowsize=20, edge_color='black', width=1,
+        ax=ax)
+
+    images = {}
+    for plot_format in PLOT_MIMETYPES.keys():
+        output = io.BytesIO()
+        fig.savefig(output, format=plot_format,
+                    dpi=app.config['MASTER_PLOT_DPI'])
+        images[plot_format] = output.getvalue()
+    return images
+
+
+# render_iteration_plot time limit, a render requested before is dead
+PLOT_RENDER_TIME_LIMIT = 600
+
+
+def request_iteration_plot(master_iteration_id):
+    """
+    Single flight trigger of the render of the plots of an iteration: only
+    the first request (or the first one after the render time limit)
+    enqueues render_iteration_plot, the request date is set with a
+    conditional update so concurrent requests can not enqueue it twice
+    :param master_iteration_id: the master iteration id
+    :return: True if this call enqueued the render
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    master_table = models.MasterIteration.__table__
+    stmt = master_table.update().where(and_(
+        master_table.c.id == master_iteration_id,
+        or_(master_table.c.plot_requested_date.is_(None),
+            master_table.c.plot_requested_date < datetime.now() -
+            timedelta(seconds=PLOT_RENDER_TIME_LIMIT)))).values(
+        plot_requested_date=datetime.now()).returning(master_table.c.id)
+    requested = db.session.execute(stmt).first() is not None
+    db.session.commit()
+
+    if requested:
+        render_iteration_plot.apply_async(args=[master_iteration_id],
+                                          kwargs={})
+
+    logger.debug("{}: Master iteration {} plot requested:{}".format(
+        current_f_name, master_iteration_id, requested))
+    return requested
+
+
+@celery.task(time_limit=PLOT_RENDER_TIME_LIMIT, soft_time_limit=550)
+def render_iteration_plot(master_iteration_id):
+    """
+    Render the plot images of an iteration in the background, they are
+    stored in the 'master_iteration_plot' table and served as they are by
+    /get_result_plot. The images are rendered again only if the graph of
+    the iteration changed.
+    The layout of the graphs of the iteration is computed first
+    (layout_iteration_graphs), the images and the javascript view use the
+    same node positions
+    :param master_iteration_id: the master iteration id
+    :return: True if the images were rendered
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    layout_iteration_graphs(master_iteration_id)
+
+    master_it = db.session.query(models.MasterIteration).filter_by(
+        id=master_iteration_id).first()
+    if master_it is None or not master_it.json_graph:
+        logger.error("{}: No json_graph found for master iteration: {}".format(
+            current_f_name, master_iteration_id))
+        return False
+
+    graph_hash = hashlib.sha1(
+        master_it.json_graph.encode('utf-8')).hexdigest()
+    plot_t = db.session.query(models.MasterIterationPlot).filter_by(
+        master_iteration_id=master_iteration_id)
+    rendered = {p.format: p.graph_hash for p in plot_t}
+    if all(rendered.get(f) == graph_hash for f in PLOT_MIMETYPES.keys()):
+        logger.debug("{}: Master iteration {} plot is up to date".format(
+            current_f_name, master_iteration_id))
+        return False
+
+    start_time = time.time()
+    images = draw_json_graph(master_it.json_graph)
+
+    s = db.session()
+    plot_table = models.MasterIterationPlot.__table__
+    stmt = pg_insert(plot_table).values([
+        {'master_iteration_id': master_iteration_id,
+         'format': plot_format,
+         'graph_hash': graph_hash,
+         'data': data,
+         'created_date': datetime.now()}
+        for plot_format, data in images.items()])
+    stmt = stmt.on_conflict_do_update(
+        index_elements=['master_iteration_id', 'format'],
+        set_={
+            'graph_hash': stmt.excluded.graph_hash,
+            'data': stmt.excluded.data,
+            'created_date': stmt.excluded.created_date
+        })
+    s.execute(stmt)
+    s.commit()
+
+    logger.info("{}: Master iteration {} plot rendered in {:.2f}s {}".format(
+        current_f_name, master_iteration_id, time.time() - start_time,
+        {k: len(v) for k, v in images.items()}))
+    return True
+
+
+# analysis config keys that can be changed by a replay parameter set
+REPLAY_PARAMETERS = (
+    'DEFAULT_NETWORK_SEGMENTATION',
+    'NETWORK_SEGMENTATION_PREFIXES',
+    'AGGREGATE_NETWORK_SEGMENTATION',
+    'MASTER_ANALYSIS_ENGINE',
+    'MASTER_TOMOGRAPHY_MIN_SUCCESS',
+    'MASTER_TOMOGRAPHY_MAX_ITER',
+    'MASTER_OUTLIER_Z_SCORE_THRESHOLD',
+    'MASTER_OUTLIER_MODIFIED_Z_SCORE_THRESHOLD',
+)
+
+# analysis config of every replay: the hop baseline is the history up to
+# now, the old iterations can not be scored against it
+REPLAY_FIXED_PARAMETERS = {
+    'MASTER_BASELINE_SCORING': False,
+}
+
+
+@contextlib.contextmanager
+def analysis_parameters(parameters):
+    """
+    Override the analysis config with a replay parameter set while the
+    context is active
+    :param parameters: dict config key -> value (keys of REPLAY_PARAMETERS)
+    """
+    previous = {k: app.config[k] for k in parameters}
+    app.config.update(parameters)
+    try:
+        yield
+    finally:
+        app.config.update(previous)
+
+
+_worker_app_context = None
+
+
+def _init_replay_worker(parameters):
+    """
+    Initializer of the replay pool processes, the parameter set only
+    changes the config of the pool process
+    """
+    global _worker_app_context
+    app.config.update(parameters)
+    _worker_app_context = app.app_context()
+    _worker_app_context.push()
+
+
+def get_summary_replay_conflict(master_iteration_id):
+    """
+    The pinger summaries (MASTER_PINGER_RESULT_SUMMARY) are reduced with
+    the segmentation of the iteration and only by the voting engine, the
+    paths they were computed from are on the pingers
+    :param master_iteration_id: the master iteration id
+    :return: the reason why the current config can not analyse the
+        summaries of the iteration, None if it can (or it has none)
+    """
+    pinger_table = models.MasterIterationPinger.__table__
+    segmentations = [row[0] for row in db.session.query(
+        pinger_table.c.result['segmentation']).filter(
+        pinger_table.c.master_iteration_id == master_iteration_id,
+        pinger_table.c.status == 'FINISHED',
+        func.jsonb_typeof(pinger_table.c.result) == 'object').distinct()]
+    if not segmentations:
+        return None
+
+    if app.config['MASTER_ANALYSIS_ENGINE'] != 'voting':
+        return "summary: the {} engine needs the paths".format(
+            app.config['MASTER_ANALYSIS_ENGINE'])
+
+    segmentation = level_segmentation(get_level_indexes())
+    if any(s != segmentation for s in segmentations):
+        return "summary: summarized with the segmentation {}".format(
+            [s for s in segmentations if s != segmentation][0])
+    return None
+
+
+def replay_iteration(master_iteration_id):
+    """
+    Analyse the stored pinger results of an iteration with the current
+    config, nothing is stored. An iteration with pinger summaries that
+    the config can not use is skipped (get_summary_replay_conflict)
+    :param master_iteration_id: the master iteration id
+    :return: tuple (id, outliers, error, skipped), outliers is a list of
+        (host, score) tuples or None on errors and skipped iterations,
+        skipped is the reason why the iteration was not analysed
+    """
+    try:
+        skipped = get_summary_replay_conflict(master_iteration_id)
+        if skipped is not None:
+            return master_iteration_id, None, None, skipped
+
+        levels = analyse_pinger_results(master_iteration_id, 1)
+        hop_names, hop_means, _edges = levels[DEFAULT_ANALYSIS_LEVEL]
+        outliers = rank_hop_outliers(hop_names,
+                                     get_hop_scores(hop_names, hop_means))
+        return master_iteration_id, outliers, None, None
+    except Exception as e:
+        db.session.rollback()
+        return master_iteration_id, None, str(e), None
+
+
+def map_replay_iterations(master_iteration_ids, parameters, workers):
+    """
+    Replay the analysis of several iterations with a parameter set, in a
+    pool of 'workers' processes if workers > 1 (every process analyses a
+    whole iteration). The results are yielded as soon as they are ready
+    :param master_iteration_ids: list of master iteration ids
+    :param parameters: dict config key -> value
+    :param workers: number of processes
+    :return: generator of replay_iteration tuples
+    """
+    if workers <= 1:
+        for master_iteration_id in master_iteration_ids:
+            with analysis_parameters(parameters):
+                replayed = replay_iteration(master_iteration_id)
+            yield replayed
+        return
+
+    # the pool processes must not inherit the database connections
+    db.session.remove()
+    db.engine.dispose()
+
+    pool = billiard.Pool(processes=workers, initializer=_init_replay_worker,
+                         initargs=(parameters,))
+    try:
+        for replayed in pool.imap_unordered(replay_iteration,
+                                            master_iteration_ids):
+            yield replayed
+    finally:
+        pool.terminate()
+        pool.join()
+
+
+@celery.task(time_limit=21600, soft_time_limit=21500)
+def replay_iterations(analysis_replay_id):
+    """
+    Re-analyse the stored iterations selected by an 'analysis_replay'
+    (one iteration or a date range) with its parameter set.
+    The problematic hosts are stored in 'analysis_replay_result' (the
+    result set of this replay), 'master_iteration_result', the graphs and
+    the hop baseline are not modified. The hops are scored by their loss,
+    without the baseline (REPLAY_FIXED_PARAMETERS). The iterations are
+    analysed in a pool of MASTER_REPLAY_WORKERS processes, the progress and
+    the throughput are updated after every iteration. The iterations whose
+    pinger summaries can not be analysed with the parameter set are
+    listed in 'skipped_iterations' with the reason
+    :param analysis_replay_id: the analysis replay id
+    :return: dict with the iteration count, the error count, the skipped
+        count, the elapsed seconds and the iterations per second
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    replay = db.session.query(models.AnalysisReplay).filter_by(
+        id=analysis_replay_id).first()
+    if replay is None:
+        logger.error("{}: No AnalysisReplay found with id: {}".format(
+            current_f_name, analysis_replay_id))
+        return None
+
+    iteration_query = db.session.query(models.MasterIteration.id).filter_by(
+        status='FINISHED')
+    if replay.master_iteration_id is not None:
+        iteration_query = iteration_query.filter(
+            models.MasterIteration.id == replay.master_iteration_id)
+    if replay.start_date is not None:
+        iteration_query = iteration_query.filter(
+            models.MasterIteration.created_date >= replay.start_date)
+    if replay.end_date is not None:
+        iteration_query = iteration_query.filter(
+            models.MasterIteration.created_date <= replay.end_date)
+    master_iteration_ids = [
+        row.id for row in iteration_query.order_by(models.MasterIteration.id)
+    ]
+    parameters = dict(replay.parameters or {}, **REPLAY_FIXED_PARAMETERS)
+
+    replay.status = 'STARTED'
+    replay.last_updated_date = datetime.now()
+    db.session.commit()
+
+    logger.info("{}: Replay {} iterations:{} parameters:{}".format(
+        current_f_name, analysis_replay_id, len(master_iteration_ids),
+        parameters))
+
+    start_time = time.time()
+    iteration_count = 0
+    error_count = 0
+    skipped_iterations = []
+    status = 'SUCCESS'
+    try:
+        for master_iteration_id, outliers, error, skipped in \
+                map_replay_iterations(master_iteration_ids, parameters,
+                                      app.config['MASTER_REPLAY_WORKERS']):
+            if skipped is not None:
+                logger.info(
+                    "{}: Replay {} skipped master iteration {}: {}".format(
+                        current_f_name, analysis_replay_id,
+                        master_iteration_id, skipped))
+                skipped_iterations.append({
+                    'master_iteration_id': master_iteration_id,
+                    'reason': 'skipped: {}'.format(skipped)
+                })
+                continue
+
+            if outliers is None:
+                logger.error(
+                    "{}: Replay {} error on master iteration {}: {}".format(
+                        current_f_name, analysis_replay_id,
+                        master_iteration_id, error))
+                error_count += 1
+                continue
+
+            db.session.add_all([
+                models.AnalysisReplayResult(
+                    analysis_replay_id=analysis_replay_id,
+                    master_iteration_id=master_iteration_id,
+                    problematic_host=host,
+                    score=score) for host, score in outliers
+            ])
+            iteration_count += 1
+            db.session.query(models.AnalysisReplay).filter_by(
+                id=analysis_replay_id).update({
+                    'iteration_count': iteration_count,
+                    'error_count': error_count,
+                    'skipped_iterations': skipped_iterations,
+                    'elapsed_seconds': time.time() - start_time,
+                    'last_updated_date': datetime.now()
+                })
+            db.session.commit()
+    except Exception as e:
+        logger.error("{}: Replay {} failed: {}".format(
+            current_f_name, analysis_replay_id, str(e)))
+        db.session.rollback()
+        status = 'FAILURE'
+
+    elapsed_seconds = time.time() - start_time
+    iterations_per_second = (iteration_count / elapsed_seconds
+                             if elapsed_seconds > 0 else 0.0)
+
+    db.session.query(models.AnalysisReplay).filter_by(
+        id=analysis_replay_id).update({
+            'status': status,
+            'iteration_count': iteration_count,
+            'error_count': error_count,
+            'skipped_iterations': skipped_iterations,
+            'elapsed_seconds': elapsed_seconds,
+            'last_updated_date': datetime.now()
+        })
+    db.session.commit()
+
+    logger.info(
+        "{}: Replay {} {} iterations:{} errors:{} skipped:{} seconds:{:.2f} "
+        "iterations/s:{:.2f}".format(current_f_name, analysis_replay_id,
+                                     status, iteration_count, error_count,
+                                     len(skipped_iterations), elapsed_seconds,
+                                     iterations_per_second))
+
+    return {
+        'iteration_count': iteration_count,
+        'error_count': error_count,
+        'skipped_count': len(skipped_iterations),
+        'elapsed_seconds': elapsed_seconds,
+        'iterations_per_second': iterations_per_second
+    }
+
+
 @celery.task(time_limit=120, soft_time_limit=120)
 def create_iteration():
     """
@@ -278,6 +2366,13 @@ def create_iteration():
     http_pass = app.config['HTTP_AUTH_PASS']
     tracert_qty = app.config['MASTER_TRACERT_QTY']
 
+    # the pingers summarize their results with the segmentation of this
+    # master, the tomography engine needs the paths
+    result_summary = None
+    if (app.config['MASTER_PINGER_RESULT_SUMMARY'] and
+            app.config['MASTER_ANALYSIS_ENGINE'] == 'voting'):
+        result_summary = level_segmentation(get_level_indexes())
+
     s = db.session()
 
     # get last iteration
@@ -298,6 +2393,7 @@ def create_iteration():
     master_ite_t = models.MasterIteration()
     s.add(master_ite_t)
     s.flush()
+    invalidate_master_status(master_ite_t.id)
     s.commit()
 
     # start the pinger sessions
@@ -313,6 +2409,7 @@ def create_iteration():
                     master_iteration_id=master_ite_t.id,
                     registered_pinger_id=pinger.id,
                     status="RUNNING"))
+            invalidate_master_status(master_ite_t.id)
             s.commit()
         else:
             # dont call any pinger that does not have pongers to query
@@ -325,6 +2422,8 @@ def create_iteration():
             "tracert_qty": tracert_qty,
             "master_iteration_id": master_ite_t.id
         }
+        if result_summary is not None:
+            post_json["result_summary"] = result_summary
         try:
             logger.debug("post url: {} json:{}".format(post_url, post_json))
             requests.post(
@@ -337,6 +2436,9 @@ def create_iteration():
                 "{}: Error calling create session on pinger {}:{} {}".format(
                     current_f_name, pinger.address, pinger.api_port, str(e)))
 
+    publish_master_event('iteration_created',
+                         master_iteration_id=master_ite_t.id)
+
     logger.debug("{}: Create_iteration finished".format(current_f_name))
 
 
@@ -344,6 +2446,8 @@ def create_iteration():
 def remove_old_nodes():
     """
     Delete older pinger and pongers registered in more than 30 minutes
+    The removed nodes are kept in 'master_removed_node' for the delta sync
+    (get_master_changes) during MASTER_DELTA_RETENTION_HOURS
     :return:
     """
     current_f_name = inspect.currentframe().f_code.co_name
@@ -358,28 +2462,455 @@ def remove_old_nodes():
     s = db.session()
 
     pinger_t = db.session.query(models.RegisteredPingerNode).filter(
-        or_(models.RegisteredPingerNode.last_updated_date is None,
-            models.RegisteredPingerNode.last_updated_date < since))
+        models.RegisteredPingerNode.last_updated_date < since)
 
     logger.debug("{}: Old pingers: {}".format(current_f_name,
                                               pinger_t.count()))
-    pinger_t.delete()
+    record_removed_nodes('pinger', models.RegisteredPingerNode, pinger_t)
+    removed = pinger_t.delete()
 
     ponger_t = db.session.query(models.RegisteredPongerNode).filter(
-        or_(models.RegisteredPongerNode.last_updated_date is None,
-            models.RegisteredPongerNode.last_updated_date < since))
+        models.RegisteredPongerNode.last_updated_date < since)
 
     logger.debug("{}: Old pongers: {}".format(current_f_name,
                                               ponger_t.count()))
-    ponger_t.delete()
+    record_removed_nodes('ponger', models.RegisteredPongerNode, ponger_t)
+    removed += ponger_t.delete()
+
+    if removed:
+        invalidate_master_status()
+
+    # the clients that synced before the pruned removals need a full sync
+    retention = datetime.now() - timedelta(
+        hours=app.config['MASTER_DELTA_RETENTION_HOURS'])
+    pruned_t = db.session.query(models.MasterRemovedNode).filter(
+        models.MasterRemovedNode.created_date < retention)
+    pruned_version = pruned_t.with_entities(
+        func.max(models.MasterRemovedNode.change_version)).scalar()
+    if pruned_version is not None:
+        pruned_t.delete(synchronize_session=False)
+        set_pruned_version(pruned_version)
+    s.commit()
+
+    if removed:
+        publish_master_event('nodes_changed')
+
+
+def record_removed_nodes(kind, model, node_t):
+    """
+    Keep the nodes that are going to be removed in 'master_removed_node'
+    The changes are added to the current session, the caller commits them
+    :param kind: 'pinger' or 'ponger'
+    :param model: RegisteredPingerNode or RegisteredPongerNode
+    :param node_t: query of the nodes of the model that are removed
+    :return:
+    """
+    db.session.execute(
+        models.MasterRemovedNode.__table__.insert().from_select(
+            ['kind', 'address', 'api_port'],
+            node_t.with_entities(literal(kind), model.address,
+                                 model.api_port).statement))
 
+
+MASTER_STATUS_ID = 1
+
+
+def query_iterations_status():
+    """
+    :return: query of the columns of the master iterations shown by the
+        status views (get_iterations_status)
+    """
+    return db.session.query(
+        models.MasterIteration.id, models.MasterIteration.status,
+        models.MasterIteration.created_date,
+        models.MasterIteration.json_graph.isnot(None),
+        models.MasterIteration.created_version)
+
+
+def get_iterations_status(iter_t, progress_ids=()):
+    """
+    Status of master iterations with their problematic hosts
+    :param iter_t: rows of query_iterations_status
+    :param progress_ids: ids of the iterations that include their progress
+        (get_master_iteration_progress)
+    :return: list of dicts, one for every row
+    """
+    hosts = collections.defaultdict(list)
+    if iter_t:
+        result_t = db.session.query(
+            models.MasterIterationResult.master_iteration_id,
+            models.MasterIterationResult.problematic_host,
+            models.MasterIterationResult.score).filter(
+            models.MasterIterationResult.master_iteration_id.in_(
+                [e[0] for e in iter_t])).order_by(
+            models.MasterIterationResult.id)
+        for it_id, host, score in result_t:
+            hosts[it_id].append({'host': str(host), 'score': float(score)})
+
+    iterations = []
+    for it_id, status, created_date, has_graph, _version in iter_t:
+        it_info = {
+            'id': int(it_id),
+            'status': str(status),
+            'has_graph': bool(has_graph),
+            'created_date': str(created_date),
+            'problematic_hosts': hosts[it_id]
+        }
+        if it_id in progress_ids:
+            it_info['progress'] = get_master_iteration_progress(it_id, status)
+        iterations.append(it_info)
+
+    return iterations
+
+
+def query_registered_nodes(model):
+    """
+    :param model: RegisteredPingerNode or RegisteredPongerNode
+    :return: query of the columns of the registered nodes shown by the
+        status views, ordered by id
+    """
+    return db.session.query(
+        model.address, model.api_port, model.api_protocol,
+        model.created_version).order_by(model.id)
+
+
+def registered_node_json(node_t):
+    """
+    :param node_t: row of query_registered_nodes
+    :return: dict with address, api_port and api_protocol
+    """
+    return {'address': node_t.address, 'api_port': node_t.api_port,
+            'api_protocol': node_t.api_protocol}
+
+
+def get_master_status():
+    """
+    Status of this master: the last two iterations with their problematic
+    hosts, the progress of the current one and the registered nodes
+    The progress is aggregated by the database (count of the pingers of the
+    iteration by status), no row is loaded by pinger
+    :return: dict with the 'master_info' of the home view
+    """
+    master_info = {}
+
+    iter_t = query_iterations_status().order_by(
+        desc(models.MasterIteration.created_date)).limit(2).all()
+
+    iterations = get_iterations_status(iter_t, [e[0] for e in iter_t[:1]])
+    for i, it_info in enumerate(iterations):
+        iteration_label = "previous_iteration"
+        if i == 0:
+            iteration_label = "current_iteration"
+        master_info[iteration_label] = it_info
+
+    master_info['registrered_pingers'] = [
+        registered_node_json(e) for e in query_registered_nodes(
+            models.RegisteredPingerNode)]
+    master_info['registrered_pongers'] = [
+        registered_node_json(e) for e in query_registered_nodes(
+            models.RegisteredPongerNode)]
+
+    return master_info
+
+
+def get_master_changes(since=None):
+    """
+    Changes of the registered nodes and of the iterations after the
+    version 'since' (delta sync)
+    The versions are the ids of the transactions that created and changed
+    every row. The returned version is the last one of the transactions
+    already finished, the changes of the transactions still running have a
+    greater version and are returned by the next call with this 'since'
+    (the changes already returned can be returned again). Without 'since'
+    or when the removed nodes after it were pruned (master_removed_node
+    rows older than MASTER_DELTA_RETENTION_HOURS) every node and the last
+    two iterations are returned as added and 'full' is True
+    :param since: version returned by the previous call or None
+    :return: dict with version, full, pingers, pongers (added, changed and
+        removed lists) and iterations (added and changed lists)
+    """
+    version = db.session.execute(
+        text("SELECT txid_snapshot_xmin(txid_current_snapshot()) - 1")
+    ).scalar()
+
+    pruned_version = db.session.query(
+        models.MasterStatus.pruned_version).filter_by(
+        id=MASTER_STATUS_ID).scalar()
+
+    full = since is None or since < (pruned_version or 0)
+
+    changes = {'version': version, 'full': full}
+
+    for key, kind, model in [('pingers', 'pinger',
+                              models.RegisteredPingerNode),
+                             ('pongers', 'ponger',
+                              models.RegisteredPongerNode)]:
+        node_changes = {'added': [], 'changed': [], 'removed': []}
+
+        node_t = query_registered_nodes(model)
+        if not full:
+            node_t = node_t.filter(model.change_version > since)
+        for e in node_t:
+            if full or e.created_version > since:
+                node_changes['added'].append(registered_node_json(e))
+            else:
+                node_changes['changed'].append(registered_node_json(e))
+
+        if not full:
+            # a node registered again after being removed is only added
+            registered = db.session.query(model.id).filter(
+                model.address == models.MasterRemovedNode.address,
+                model.api_port == models.MasterRemovedNode.api_port)
+            removed_t = db.session.query(
+                models.MasterRemovedNode.address,
+                models.MasterRemovedNode.api_port).filter(
+                models.MasterRemovedNode.kind == kind,
+                models.MasterRemovedNode.change_version > since,
+                ~registered.exists()).distinct()
+            node_changes['removed'] = [
+                {'address': address, 'api_port': api_port}
+                for address, api_port in removed_t]
+
+        changes[key] = node_changes
+
+    iter_t = query_iterations_status()
+    if full:
+        iter_t = iter_t.order_by(
+            desc(models.MasterIteration.created_date)).limit(2)
+    else:
+        iter_t = iter_t.filter(
+            models.MasterIteration.change_version > since).order_by(
+            models.MasterIteration.change_version)
+    iter_t = iter_t.all()
+
+    iteration_changes = {'added': [], 'changed': []}
+    iterations = get_iterations_status(iter_t, [e[0] for e in iter_t])
+    for e, it_info in zip(iter_t, iterations):
+        if full or e.created_version > since:
+            iteration_changes['added'].append(it_info)
+        else:
+            iteration_changes['changed'].append(it_info)
+    changes['iterations'] = iteration_changes
+
+    return changes
+
+
+def get_master_iteration_progress(master_iteration_id, status):
+    """
+    Progress of an iteration, same fields as check_master_iteration_done
+    without finishing the iteration
+    :param master_iteration_id: the master iteration id
+    :param status: the status of the master iteration
+    :return: dict with is_finished, percentage, count, total and timed_out
+    """
+    counts = dict(
+        db.session.query(models.MasterIterationPinger.status,
+                         func.count(models.MasterIterationPinger.id)).filter(
+            models.MasterIterationPinger.master_iteration_id ==
+            master_iteration_id).group_by(
+            models.MasterIterationPinger.status).all())
+
+    total = sum(counts.values())
+    count = counts.get('FINISHED', 0)
+
+    percent = 0
+    if total > 0:
+        percent = (count / float(total)) * 100
+
+    return {'is_finished': status == 'FINISHED', 'percentage': percent,
+            'count': count, 'total': total,
+            'timed_out': counts.get('TIMED_OUT', 0)}
+
+
+def count_unfinished_results():
+    """
+    Number of pinger results of the iterations not finished yet, it changes
+    with every pinger result without a write to a shared row (see
+    get_master_status_snapshot)
+    :return: the number of FINISHED pingers of the unfinished iterations
+    """
+    return db.session.query(func.count(models.MasterIterationPinger.id)).join(
+        models.MasterIteration,
+        models.MasterIteration.id ==
+        models.MasterIterationPinger.master_iteration_id).filter(
+        models.MasterIteration.status != 'FINISHED',
+        models.MasterIterationPinger.status == 'FINISHED').scalar()
+
+
+def get_master_status_snapshot():
+    """
+    Cached status of this master (get_master_status)
+    The snapshot is computed again when it was invalidated
+    (invalidate_master_status), when a pinger sent its results (the count
+    of results of the unfinished iterations changed) or when it is older
+    than MASTER_STATUS_CACHE_SECONDS
+    :return: dict with the 'master_info' of the home view
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    s = db.session()
+
+    status_t = db.session.query(models.MasterStatus).filter_by(
+        id=MASTER_STATUS_ID).first()
+    if status_t is None:
+        s.execute(
+            pg_insert(models.MasterStatus.__table__).values(
+                id=MASTER_STATUS_ID, version=0).on_conflict_do_nothing())
+        s.commit()
+        status_t = db.session.query(models.MasterStatus).filter_by(
+            id=MASTER_STATUS_ID).first()
+
+    result_count = count_unfinished_results()
+    since = datetime.now() - timedelta(
+        seconds=app.config['MASTER_STATUS_CACHE_SECONDS'])
+    if (status_t.snapshot is not None and
+            status_t.snapshot_version == status_t.version and
+            status_t.snapshot_result_count == result_count and
+            status_t.snapshot_date >= since):
+        return status_t.snapshot
+
+    version = status_t.version
+    snapshot = get_master_status()
+
+    # an invalidation while the status was computed bumped the version,
+    # this snapshot is not stored and the next call computes it again
+    stored = db.session.query(models.MasterStatus).filter_by(
+        id=MASTER_STATUS_ID, version=version).update(
+        {'snapshot': snapshot,
+         'snapshot_version': version,
+         'snapshot_result_count': result_count,
+         'snapshot_date': datetime.now()},
+        synchronize_session=False)
     s.commit()
 
+    logger.debug("{}: Master status computed, version:{} stored:{}".format(
+        current_f_name, version, stored))
+    return snapshot
+
+
+def set_pruned_version(pruned_version):
+    """
+    Raise the version before which the delta sync is not complete any more
+    (get_master_changes returns 'full'). The master_status row is created
+    if it does not exist yet, the clients must not miss the removals
+    The change is added to the current session, the caller commits it
+    :param pruned_version: the last version of the removed rows
+    :return:
+    """
+    status_table = models.MasterStatus.__table__
+    db.session.execute(
+        pg_insert(status_table).values(
+            id=MASTER_STATUS_ID, version=0,
+            pruned_version=pruned_version).on_conflict_do_update(
+            index_elements=[status_table.c.id],
+            set_={'pruned_version': func.greatest(
+                func.coalesce(status_table.c.pruned_version, 0),
+                pruned_version)}))
+
+
+def invalidate_master_status(master_iteration_id=None):
+    """
+    Invalidate the cached status of this master, a node was registered or
+    removed or the state of an iteration changed. The pinger results do
+    not invalidate it, every result would lock the master_status row
+    (see count_unfinished_results)
+    The change version of the changed iteration is also updated for the
+    delta sync (get_master_changes)
+    The changes are added to the current session, the caller commits them
+    :param master_iteration_id: the master iteration id that changed
+    :return:
+    """
+    db.session.query(models.MasterStatus).filter_by(
+        id=MASTER_STATUS_ID).update(
+        {'version': models.MasterStatus.version + 1},
+        synchronize_session=False)
+
+    if master_iteration_id is not None:
+        db.session.query(models.MasterIteration).filter_by(
+            id=master_iteration_id).update(
+            {'change_version': func.txid_current()},
+            synchronize_session=False)
+
+
+MASTER_EVENTS_CHANNEL = 'piponger_master_events'
+# events with the 'progress' of their iteration instead of 'master_info'
+MASTER_PROGRESS_EVENTS = ('pinger_result', )
+
+_master_events_redis = None
+
+
+def get_master_events_redis():
+    """
+    :return: redis client of MASTER_EVENTS_REDIS_URL, shared by the
+        publishers and the subscribers of this process
+    """
+    global _master_events_redis
+    if _master_events_redis is None:
+        _master_events_redis = redis.StrictRedis.from_url(
+            app.config['MASTER_EVENTS_REDIS_URL'])
+    return _master_events_redis
+
+
+def format_master_event(event, data):
+    """
+    Server-sent event message
+    :param event: the event name
+    :param data: the event data, serialized as JSON
+    :return: the text of the message
+    """
+    return "event: {}\ndata: {}\n\n".format(event, json.dumps(data))
+
+
+def publish_master_event(event, **data):
+    """
+    Publish a master event to the dashboards (the subscribers of
+    MASTER_EVENTS_CHANNEL), the event has the current master status
+    ('master_info', see get_master_status_snapshot) so the dashboards
+    do not query the database. The events that only change the progress
+    of an iteration (MASTER_PROGRESS_EVENTS) have their 'progress'
+    instead, the status is not computed for every pinger result
+    The errors are logged and ignored, the events are only a notification
+    :param event: iteration_created, pinger_result, iteration_finished,
+        analysis_finished or nodes_changed
+    :param data: other fields of the event, e.g. master_iteration_id
+    :return: the number of subscribers that received the event
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not app.config['MASTER_EVENTS_REDIS_URL']:
+        return 0
+
+    try:
+        data['event'] = event
+        if event not in MASTER_PROGRESS_EVENTS:
+            data['master_info'] = get_master_status_snapshot()
+        return get_master_events_redis().publish(
+            MASTER_EVENTS_CHANNEL, format_master_event(event, data))
+    except Exception as e:
+        logger.error("{}: Error publishing the event {}: {}".format(
+            current_f_name, event, str(e)))
+        return 0
+
+
+def subscribe_master_events():
+    """
+    Subscribe to the master events (publish_master_event)
+    :return: redis PubSub object, the caller closes it
+    """
+    pubsub = get_master_events_redis().pubsub(
+        ignore_subscribe_messages=True)
+    pubsub.subscribe(MASTER_EVENTS_CHANNEL)
+    return pubsub
+
 
 @celery.task(time_limit=120, soft_time_limit=120)
 def check_master_iteration_done(master_iteration_id):
     """
     Check if for the specific iteration all the pingers have sent their results
+    The iteration is also finished when MASTER_ITERATION_QUORUM_PERCENT of
+    the pingers have sent their results or when it is older than
+    MASTER_ITERATION_DEADLINE_MINUTES, the pingers that did not report
+    are set as TIMED_OUT (finalize_master_iteration)
     :return:
     """
 
@@ -393,56 +2924,198 @@ def check_master_iteration_done(master_iteration_id):
             current_f_name, master_iteration_id))
         return {'is_finished': is_finished, 'percentage': 0.0}
 
-    count = 0
-    pinger_size = len(master_it.master_iteration_pinger)
-    for master_pinger_it in master_it.master_iteration_pinger:
-        if master_pinger_it.status == "FINISHED":
-            count += 1
+    # counted by the database, the pingers of the iteration are not loaded
+    progress = get_master_iteration_progress(master_iteration_id,
+                                             master_it.status)
+    if master_it.status == 'FINISHED':
+        # finished by a previous check (quorum or deadline), nothing to do
+        return progress
+
+    count = progress['count']
+    pinger_size = progress['total']
+    percent = progress['percentage']
+
+    deadline = master_it.created_date + timedelta(
+        minutes=app.config['MASTER_ITERATION_DEADLINE_MINUTES'])
 
+    timed_out = 0
     if count >= pinger_size:
         s = db.session()
         is_finished = True
         master_it.status = 'FINISHED'
+        invalidate_master_status(master_iteration_id)
         s.commit()
+        publish_master_event('iteration_finished',
+                             master_iteration_id=master_iteration_id,
+                             timed_out=0)
+    elif (percent >= app.config['MASTER_ITERATION_QUORUM_PERCENT'] or
+          datetime.now() >= deadline):
+        is_finished = True
+        timed_out = finalize_master_iteration(master_iteration_id)
 
-    if count > pinger_size:
-        logger.warn("{}: count > pinger_size {}>{}".format(
-            current_f_name, count, pinger_size))
-        count = pinger_size
+    return {'is_finished': is_finished, 'percentage': percent, 'count': count,
+            'total': pinger_size, 'timed_out': timed_out}
 
-    percent = 0
-    if pinger_size > 0:
-        percent = (count / float(pinger_size)) * 100
 
-    return {'is_finished': is_finished, 'percentage': percent, 'count': count,
-            'total': pinger_size}
+def finalize_master_iteration(master_iteration_id):
+    """
+    Finish an iteration without waiting for the pingers that did not send
+    their results yet, these ones are set as TIMED_OUT (their results
+    will be rejected) and the analysis of the available results is
+    requested (request_iteration_analysis)
+    :param master_iteration_id: the master iteration id
+    :return: the number of pingers set as TIMED_OUT
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    s = db.session()
+
+    timed_out = db.session.query(models.MasterIterationPinger).filter(
+        models.MasterIterationPinger.master_iteration_id ==
+        master_iteration_id,
+        or_(models.MasterIterationPinger.status.is_(None),
+            models.MasterIterationPinger.status != 'FINISHED')).update(
+        {'status': 'TIMED_OUT',
+         'last_updated_date': datetime.now()},
+        synchronize_session=False)
+
+    db.session.query(models.MasterIteration).filter_by(
+        id=master_iteration_id).update({'status': 'FINISHED'},
+                                       synchronize_session=False)
+    invalidate_master_status(master_iteration_id)
+    s.commit()
+
+    publish_master_event('iteration_finished',
+                         master_iteration_id=master_iteration_id,
+                         timed_out=timed_out)
+
+    logger.info("{}: Master iteration {} finished, pingers timed out:{}".
+                format(current_f_name, master_iteration_id, timed_out))
+
+    # no late result will finish it again, this is its only trigger
+    request_iteration_analysis(master_iteration_id)
+    return timed_out
 
 
 @celery.task(time_limit=120, soft_time_limit=120)
 def finish_old_iterations():
     """
-    Finish the iterations that are older than 30 minutes
+    Finish the iterations that are older than
+    MASTER_ITERATION_DEADLINE_MINUTES, the pingers that did not report are
+    set as TIMED_OUT and the iteration is analysed with the available
+    results. At most HOUSEKEEPING_BATCH_SIZE iterations per run, the
+    oldest first
     :return:
     """
     current_f_name = inspect.currentframe().f_code.co_name
 
-    logger.info("{}: Remove_old_nodes called".format(current_f_name))
+    logger.info("{}: Finish_old_iterations called".format(current_f_name))
 
     if not pipong_is_master():
         return None
 
-    since = datetime.now() - timedelta(minutes=30)
-
-    s = db.session()
+    since = datetime.now() - timedelta(
+        minutes=app.config['MASTER_ITERATION_DEADLINE_MINUTES'])
 
-    master_t = db.session.query(models.MasterIteration).filter(
-        or_(models.MasterIteration.created_date is None,
-            models.MasterIteration.created_date < since))
+    # only the iterations that are not finished yet (partial index)
+    master_t = db.session.query(models.MasterIteration.id).filter(
+        models.MasterIteration.status != 'FINISHED',
+        models.MasterIteration.created_date < since).order_by(
+        models.MasterIteration.created_date).limit(
+        app.config['HOUSEKEEPING_BATCH_SIZE']).all()
 
     logger.debug("{}: Old iterations: {}".format(current_f_name,
-                                                 master_t.count()))
+                                                 len(master_t)))
 
     for e in master_t:
-        e.status = "FINISHED"
+        finalize_master_iteration(e.id)
 
-    s.commit()
+
+def archive_master_iterations(iteration_ids):
+    """
+    :param iteration_ids: ids of the master iterations, sorted
+    :return: the records of the archive of the iterations: the iteration,
+        its problematic hosts and the results of its pingers (the graphs,
+        plots and accumulators can be computed again from them)
+    """
+    records = {}
+    for iter_t in db.session.query(models.MasterIteration).filter(
+            models.MasterIteration.id.in_(iteration_ids)):
+        records[iter_t.id] = dict(row_to_dict(iter_t),
+                                  master_iteration_result=[],
+                                  master_iteration_pinger=[])
+
+    for model in (models.MasterIterationResult, models.MasterIterationPinger):
+        for row in db.session.query(model).filter(
+                model.master_iteration_id.in_(iteration_ids)):
+            records[row.master_iteration_id][model.__tablename__].append(
+                row_to_dict(row))
+
+    return [records[i] for i in iteration_ids if i in records]
+
+
+@celery.task(time_limit=3600, soft_time_limit=3500)
+def remove_old_master_iterations():
+    """
+    Archive and delete the finished master iterations older than
+    MASTER_ITERATION_RETENTION_DAYS with their pingers, results, graphs
+    and plots (deleted by the foreign keys). HOUSEKEEPING_MAX_BATCHES
+    batches of HOUSEKEEPING_BATCH_SIZE iterations are removed per run, each
+    one in its own transaction. The delta sync clients get the whole
+    state in their next sync (the removed iterations are not recorded).
+    The paths of master_path no result uses are removed after the batches
+    :return: the number of iterations removed
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        return None
+
+    retention_days = app.config['MASTER_ITERATION_RETENTION_DAYS']
+    if retention_days is None:
+        return None
+
+    since = datetime.now() - timedelta(days=retention_days)
+    removed = 0
+    try:
+        for _batch in range(app.config['HOUSEKEEPING_MAX_BATCHES']):
+            # the running analyses keep their iteration
+            iteration_ids = [e.id for e in db.session.query(
+                models.MasterIteration.id).filter(
+                models.MasterIteration.status == 'FINISHED',
+                models.MasterIteration.created_date < since,
+                or_(models.MasterIteration.analysis_status.is_(None),
+                    models.MasterIteration.analysis_status.notin_(
+                        ['PENDING', 'STARTED']))).order_by(
+                models.MasterIteration.created_date).limit(
+                app.config['HOUSEKEEPING_BATCH_SIZE'])]
+            if not iteration_ids:
+                break
+            iteration_ids.sort()
+
+            archive = write_iteration_archive(
+                'master_iteration', archive_master_iterations(iteration_ids))
+
+            db.session.query(models.MasterIteration).filter(
+                models.MasterIteration.id.in_(iteration_ids)).delete(
+                synchronize_session=False)
+            set_pruned_version(func.txid_current())
+            invalidate_master_status()
+            db.session.commit()
+            removed += len(iteration_ids)
+
+            logger.info("{}: Removed {} master iterations, archive: {}".
+                        format(current_f_name, len(iteration_ids), archive))
+    except SoftTimeLimitExceeded:
+        db.session.rollback()
+
+    if removed:
+        # the paths that no result uses any more
+        path_table = models.MasterPath.__table__
+        result_table = models.MasterPathResult.__table__
+        db.session.execute(path_table.delete().where(and_(
+            path_table.c.last_seen_date < since,
+            ~exists().where(result_table.c.path_id == path_table.c.id))))
+        db.session.commit()
+
+    return removed
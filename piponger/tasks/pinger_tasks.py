@@ -16,9 +16,89 @@ import requests
 import json
 from requests.auth import HTTPBasicAuth as requestHTTPAuth
 import inspect
+import ipaddress
+import tasks.master_tasks
+from tasks.common_tasks import encode_raw_result
 
 from main import app, db, celery, logger
 
+# the sums of the iperf output stored in the Iperf columns
+IPERF_SUM_FIELDS = ('seconds', 'bytes', 'bits_per_second', 'lost_percent')
+
+
+def ip_to_int(address):
+    """
+    :param address: an IPv4 or IPv6 address
+    :return: the address as an integer
+    """
+    return int(ipaddress.ip_address(address))
+
+
+def int_to_ip(value):
+    """
+    :param value: an address as an integer (ip_to_int)
+    :return: the address as a string
+    """
+    return str(ipaddress.ip_address(value))
+
+
+def compact_tracert_result(tracert_results, target):
+    """
+    Extract the paths of a dublin traceroute output, the hops that replied
+    to every flow until the last hop or the target
+    :param tracert_results: the output of the dublin traceroute (dict)
+    :param target: the address of the ponger
+    :return: dict source port (str) -> dict with 'dst_port', 'src' (the
+        local address), 'hops' (the addresses of the hops) and 'complete'
+        (the path reached the last hop or the target), the addresses are
+        integers (ip_to_int)
+    """
+    paths = {}
+    for src_port, flows in tracert_results['flows'].items():
+        hops = []
+        complete = False
+        for flow in flows:
+            if flow['name'] != "":
+                hops.append(flow['received']['ip']['src'])
+            if flow['is_last'] or (hops and hops[-1] == target):
+                complete = True
+                break
+
+        sent = flows[0]['sent'] if flows else None
+        paths[str(src_port)] = {
+            'dst_port': sent['udp']['dport'] if sent else None,
+            'src': ip_to_int(sent['ip']['src']) if sent else None,
+            'hops': [ip_to_int(h) for h in hops],
+            'complete': complete,
+        }
+    return paths
+
+
+def get_tracert_paths(tracert_t):
+    """
+    :param tracert_t: a Tracert row
+    :return: the paths of the traceroute (compact_tracert_result), the
+        rows stored before the compact results are extracted again
+    """
+    if tracert_t.paths is not None:
+        return tracert_t.paths
+    if not tracert_t.result:
+        return {}
+    return compact_tracert_result(json.loads(tracert_t.result),
+                                  str(tracert_t.ponger_port.ponger.address))
+
+
+def get_iperf_summary(iperf_t):
+    """
+    :param iperf_t: an Iperf row
+    :return: dict with the IPERF_SUM_FIELDS of the iperf, the rows stored
+        before the compact results are read from their raw output
+    """
+    if iperf_t.lost_percent is None and iperf_t.result:
+        iperf_sum = json.loads(iperf_t.result)['end']['sum']
+        return {field: iperf_sum[field] for field in IPERF_SUM_FIELDS}
+    return {field: getattr(iperf_t, field) for field in IPERF_SUM_FIELDS}
+
 
 @celery.task(time_limit=12000, soft_time_limit=11000)
 def do_iperf3_client(ponger_id):
@@ -168,7 +248,10 @@ def do_iperf3_client(ponger_id):
                                  iperf_t.ponger_port.ponger.address))
             else:
                 iperf_t.status = "SUCCESS"
-                iperf_t.result = cmd_result_str
+                for field in IPERF_SUM_FIELDS:
+                    setattr(iperf_t, field, iperf_res['end']['sum'][field])
+                iperf_t.raw_encoding, iperf_t.raw_result = \
+                    encode_raw_result(cmd_result_str)
                 db.session.commit()
 
     except SoftTimeLimitExceeded:
@@ -240,10 +323,13 @@ def do_dublin_tracert(tracert_id):
             logger.error(
                 "{}: Tracert client cannot generate trace for server at:{}".
                 format(current_f_name, tracert_t.ponger_port.ponger.address))
-
-        tracert_t.status = "SUCCESS"
-        tracert_t.result = json.dumps(tracert_results)
-        db.session.commit()
+        else:
+            tracert_t.status = "SUCCESS"
+            tracert_t.paths = compact_tracert_result(
+                tracert_results, str(tracert_t.ponger_port.ponger.address))
+            tracert_t.raw_encoding, tracert_t.raw_result = \
+                encode_raw_result(json.dumps(tracert_results))
+            db.session.commit()
 
         logger.debug("{}: result:{}".format(current_f_name, tracert_results))
     except SoftTimeLimitExceeded:
@@ -263,6 +349,62 @@ def do_dublin_tracert(tracert_id):
     return True
 
 
+def get_iteration_result(pinger_iteration_id):
+    """
+    Compile the results of an iteration: the path and the iperf result of
+    every ponger port, from the compact results of the traceroutes and
+    the iperfs
+    :param pinger_iteration_id: the iteration id from the db
+    :return: list of path results
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    # the paths of the first successful traceroute of every ponger port
+    tracert_paths = {}
+    tracert_t = db.session.query(models.Tracert).filter_by(
+        pinger_iteration_id=pinger_iteration_id, status='SUCCESS').order_by(
+        models.Tracert.id)
+    for tracert in tracert_t:
+        if tracert.ponger_port_id not in tracert_paths:
+            tracert_paths[tracert.ponger_port_id] = get_tracert_paths(tracert)
+
+    iteration_result = []
+    iperf_t = db.session.query(models.Iperf).filter_by(
+        pinger_iteration_id=pinger_iteration_id, status='SUCCESS')
+    for iperf in iperf_t:
+        if iperf.ponger_port_id not in tracert_paths:
+            logger.info("{}: No tracert for ponger_port_id:{}".format(
+                current_f_name, iperf.ponger_port_id))
+            continue
+
+        ponger_address = str(iperf.ponger_port.ponger.address)
+        result_dict = {
+            "ponger_address": ponger_address,
+            "src_port": int(iperf.src_port),
+            "dst_port": int(iperf.ponger_port.dst_port)
+        }
+
+        try:
+            flow_path = tracert_paths[iperf.ponger_port_id][str(
+                iperf.src_port)]
+
+            result_dict["path"] = [
+                int_to_ip(h) for h in flow_path['hops']
+                if h != flow_path['src'] and int_to_ip(h) != ponger_address
+            ]
+            result_dict.update(get_iperf_summary(iperf))
+            iteration_result.append(result_dict)
+        except Exception as e:
+            logger.error(
+                "{}: Error obtaining data from iperf iteration:{} "
+                "lost_percent for this host:{} result_dict:{}".format(
+                    current_f_name, str(e), ponger_address,
+                    str(result_dict)))
+
+    return iteration_result
+
+
 @celery.task(time_limit=1200, soft_time_limit=1100)
 def perform_pipong_iteration_3(result, pinger_iteration_id):
     """
@@ -294,62 +436,14 @@ def perform_pipong_iteration_3(result, pinger_iteration_id):
     iter_t.status = "RUNNING_FINISHING"
     s.commit()
 
-    iteration_result = []
-    iperf_t = db.session.query(models.Iperf).filter_by(
-        pinger_iteration_id=pinger_iteration_id, status='SUCCESS')
-    for iperf in iperf_t:
-        tracert_t = db.session.query(models.Tracert).filter_by(
-            pinger_iteration_id=pinger_iteration_id,
-            ponger_port_id=iperf.ponger_port_id,
-            status='SUCCESS').first()
-
-        iperf_res = json.loads(iperf.result)
-
-        logger.info(
-            "{}: tracert_t.ponger_port_id:{} iperf.ponger_port_id:{}".format(
-                current_f_name, tracert_t.ponger_port_id,
-                iperf.ponger_port_id))
-
-        if tracert_t:
-            result_dict = {
-                "ponger_address": str(iperf.ponger_port.ponger.address),
-                "src_port": int(iperf.src_port),
-                "dst_port": int(iperf.ponger_port.dst_port)
-            }
-
-            try:
-                tracert_res = json.loads(tracert_t.result)
-
-                tracert_path = []
-                src_ip = tracert_res['flows'][str(
-                    iperf.src_port)][0]['sent']['ip']['src']
-
-                for flow in tracert_res['flows'][str(iperf.src_port)]:
-                    flow_name = flow['name']
-                    if flow_name is not "":
-                        ip_addr_node = flow['received']['ip']['src']
-                        if ip_addr_node != src_ip and ip_addr_node != str(
-                                iperf.ponger_port.ponger.address):
-                            tracert_path.append(ip_addr_node)
-
-                result_dict["path"] = tracert_path
-                result_dict["seconds"] = iperf_res['end']['sum']['seconds']
-                result_dict["bytes"] = iperf_res['end']['sum']['bytes']
-                result_dict["bits_per_second"] = iperf_res['end']['sum'][
-                    'bits_per_second']
-                result_dict["lost_percent"] = iperf_res['end']['sum'][
-                    'lost_percent']
-                iteration_result.append(result_dict)
-            except Exception as e:
-                logger.error(
-                    "{}: Error obtaining data from iperf iteration:{} "
-                    "lost_percent for this host:{} result_dict:{}".format(
-                        current_f_name, str(e),
-                        str(iperf.ponger_port.ponger.address),
-                        str(result_dict)))
-                # result_dict["path"] = [str(iperf.ponger_port.ponger.address)]
-                # result_dict["lost_percent"] = 999
-                pass
+    iteration_result = get_iteration_result(pinger_iteration_id)
+    if iter_t.result_summary is not None:
+        # the master requested a summary, only the votes of every
+        # network are sent (the paths are kept on this pinger)
+        level_indexes = tasks.master_tasks.build_level_indexes(
+            **iter_t.result_summary)
+        iteration_result = tasks.master_tasks.summarize_pinger_result(
+            iteration_result, level_indexes)
 
     master_host = app.config['MASTER_SERVER']
     master_port = app.config['MASTER_PORT']
@@ -425,40 +519,27 @@ def perform_pipong_iteration_2(result, pinger_iteration_id):
             try:
                 logger.debug("{}: Task tracert id:{} status:{}".format(
                     current_f_name, row.id, row.status))
-                json_res = json.loads(row.result)
-
-                for src_port in json_res['flows']:
-                    local_path = []
-
-                    for flow in json_res['flows'][src_port]:
-                        flow_name = flow['name']
-                        if flow_name is not "":
-                            ip_addr_node = flow['received']['ip']['src']
-                            local_path.append(ip_addr_node)
-
-                        if flow['is_last'] or (len(local_path) > 0 and
-                                               local_path[-1] == pong.address):
-                            if len(local_path) > 0:
-                                if local_path[-1] == pong.address:
-                                    # delete the last element that contains
-                                    # the target
-                                    del local_path[-1]
-
-                                paths_port.append({
-                                    'ponger_port_id':
-                                    row.ponger_port.id,
-                                    'src_port':
-                                    flow['sent']['udp']['sport'],
-                                    'dst_port':
-                                    flow['sent']['udp']['dport'],
-                                    'path':
-                                    local_path,
-                                })
+
+                for src_port, flow_path in get_tracert_paths(row).items():
+                    local_path = [int_to_ip(h) for h in flow_path['hops']]
+                    if not flow_path['complete'] or len(local_path) == 0:
+                        continue
+
+                    if local_path[-1] == pong.address:
+                        # delete the last element that contains the target
+                        del local_path[-1]
+
+                    paths_port.append({
+                        'ponger_port_id': row.ponger_port.id,
+                        'src_port': int(src_port),
+                        'dst_port': flow_path['dst_port'],
+                        'path': local_path,
+                    })
 
             except Exception as e:
-                logger.error("{}: Error loading data from json result. "
-                             "Tracert id: {} result:{} error:{}".format(
-                                 current_f_name, row.id, row.result, str(e)))
+                logger.error("{}: Error loading the tracert paths. "
+                             "Tracert id: {} error:{}".format(
+                                 current_f_name, row.id, str(e)))
                 continue
 
         unique_paths = [
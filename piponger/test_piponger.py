@@ -9,13 +9,21 @@ from main import (app, db, get_local_free_port,
                   pipong_is_pinger, pipong_is_ponger, pipong_is_master,
                   get_local_ip)
 import tasks
+import assets
+import views.master_views
+import migrate
 import unittest
 import models
 import sqlalchemy as sa
 from sqlalchemy import desc
 import socket
 import json
-import os.path
+import gzip
+import os
+import tempfile
+import numpy as np
+from datetime import timedelta
+from unittest import mock
 
 
 class PipongerTestCase(unittest.TestCase):
@@ -44,6 +52,7 @@ class PipongerTestCase(unittest.TestCase):
             IS_PINGER=True,
             IS_PONGER=True,
             IS_MASTER=True,
+            MASTER_PATH_RESULT_TABLE=False,
         )
 
         self.client = self.app.test_client()
@@ -87,6 +96,7 @@ class PipongerTestCase(unittest.TestCase):
             s.add(models.PingerIterationStatusType(type_id='RUNNING_FINISHING'))
             s.add(models.PingerIterationStatusType(type_id='FINISHED'))
             s.add(models.PingerIterationStatusType(type_id='ERROR'))
+            s.add(models.PingerIterationStatusType(type_id='TIMED_OUT'))
             s.add(models.TaskStatusType(type_id='PENDING'))
             s.add(models.TaskStatusType(type_id='STARTED'))
             s.add(models.TaskStatusType(type_id='SUCCESS'))
@@ -423,6 +433,79 @@ class PipongerTestCase(unittest.TestCase):
         assert 'application/json' in rv.headers['content-type']
         assert "capabilities" in str(rv.data)
 
+    def test_static_assets(self):
+        """
+        Check the asset bundles of the monitor page: hashed names, gzip
+        variant and immutable cache
+        :return:
+        """
+        rv = self.client.get('/monitor', headers=self.auth_header)
+        page = rv.data.decode('utf-8')
+        assert 'js/main.js' not in page
+
+        main_url = assets.asset_url('main.js')
+        assert main_url in page
+
+        rv = self.client.get(main_url, headers={'Accept-Encoding': 'gzip'})
+        assert rv.status_code == 200
+        assert rv.headers['Content-Encoding'] == 'gzip'
+        assert 'immutable' in rv.headers['Cache-Control']
+        main_js = gzip.decompress(rv.data)
+        assert b'function render_info' in main_js
+
+        rv = self.client.get(main_url)
+        assert 'Content-Encoding' not in rv.headers
+        assert rv.data == main_js
+
+        rv = self.client.get('/dist/manifest.json')
+        assert rv.status_code == 404
+
+        # the bundles of a previous build, for the pages loaded before it
+        old_name = 'main.0123456789ab.js'
+        old_path = os.path.join(app.static_folder, assets.ASSETS_DIR,
+                                old_name)
+        with open(old_path, 'w') as f:
+            f.write('function render_info() {}')
+        try:
+            rv = self.client.get('/dist/' + old_name)
+            assert rv.status_code == 200
+            assert b'function render_info' in rv.data
+        finally:
+            os.remove(old_path)
+
+        rv = self.client.get('/dist/' + old_name)
+        assert rv.status_code == 404
+
+    def test_schema_migrations(self):
+        """
+        Check that the models, the schema and its migrations are in sync
+        and the baseline of a database upgraded by hand or created before
+        the schema_migration table
+        :return:
+        """
+        assert migrate.check_schema(models.metadata) == []
+
+        versions = [m[0] for m in migrate.list_migrations()]
+        assert versions == sorted(set(versions))
+
+        status = migrate.get_migration_status()
+        assert all(applied is None for _v, _n, applied in status)
+
+        assert migrate.apply_migrations(baseline=versions[-1]) == versions
+        status = migrate.get_migration_status()
+        assert all(applied is not None for _v, _n, applied in status)
+
+        # nothing left to apply
+        assert migrate.apply_migrations() == []
+
+        # a database created before the schema_migration table gets one
+        with app.app_context():
+            db.session.execute("DROP TABLE public.schema_migration")
+            db.session.commit()
+        status = migrate.get_migration_status()
+        assert all(applied is None for _v, _n, applied in status)
+        assert migrate.apply_migrations(baseline=versions[-1]) == versions
+
     def test_register_pinger_ponger(self):
         """
         Test if register ponger/pinger is working
@@ -518,6 +601,103 @@ class PipongerTestCase(unittest.TestCase):
             elem in out3_k
             for elem in ['10.0.21.0', '10.0.11.0', '10.0.131.0', '10.0.111.0'])
 
+    def test_vote_pinger_samples(self):
+        """
+        Check the per hop voting: majority value or mean of the samples
+        :return:
+        """
+        hop_ids = np.array([0, 1, 0, 1, 0, 2, 1], dtype=np.int64)
+        losses = np.array([0, 10.0, 0, 20.0, 30.0, 5.0, 30.0])
+
+        hops, loss = tasks.master_tasks.vote_pinger_samples(hop_ids, losses)
+
+        assert hops.tolist() == [0, 1, 2]
+        # hop 0 has a majority of 0, hop 1 has no majority, hop 2 single
+        assert loss.tolist() == [0.0, 20.0, 5.0]
+
+        accumulator = tasks.master_tasks.HopLossAccumulator(capacity=1)
+        accumulator.add(hops, loss)
+        accumulator.add(np.array([0]), np.array([50.0]))
+        assert accumulator.means(3).tolist() == [25.0, 20.0, 5.0]
+
+    def test_summarize_pinger_result(self):
+        """
+        The summary computed by a pinger gives the same votes as the paths
+        :return:
+        """
+        level_indexes = tasks.master_tasks.build_level_indexes(
+            24, {'10.0.0.0/16': 31}, 16)
+        json_data = self.get_dummy_pinger_results()[0]
+
+        summary = json.loads(json.dumps(
+            tasks.master_tasks.summarize_pinger_result(
+                json_data, level_indexes)))
+        assert summary['path_count'] == len(json_data)
+        assert summary['segmentation'] == {
+            'default_netmask': 24, 'prefix_netmasks': {'10.0.0.0/16': 31},
+            'aggregate_netmask': 16}
+
+        expected = tasks.master_tasks.reduce_pinger_result(
+            json_data, level_indexes)
+        reduction = tasks.master_tasks.reduce_pinger_result(
+            summary, level_indexes)
+        for level, (hop_names, loss, edges) in expected.items():
+            assert reduction[level][0] == hop_names
+            assert reduction[level][1].tolist() == loss.tolist()
+            assert reduction[level][2] == edges
+
+        # a summary of another segmentation can not be used
+        with self.assertRaises(ValueError):
+            tasks.master_tasks.reduce_pinger_result(
+                summary, tasks.master_tasks.build_level_indexes(24, {}, 16))
+
+    def test_solve_hop_loss(self):
+        """
+        Check the tomography engine: only the hop shared by the lossy
+        paths gets the loss
+        :return:
+        """
+        level_indexes = tasks.master_tasks.build_level_indexes(24, {}, 16)
+        json_data = [
+            {'path': ['10.0.1.1', '10.0.2.1', '10.0.3.1'], 'lost_percent': 0},
+            {'path': ['10.0.1.1', '10.0.4.1', '?'], 'lost_percent': 50.0},
+            {'path': ['10.0.5.1', '10.0.4.1'], 'lost_percent': 50.0},
+            {'path': ['10.0.5.1', '10.0.2.1'], 'lost_percent': 0}]
+
+        hop_index = {}
+        edges = set()
+        builder = tasks.master_tasks.PathMatrixBuilder()
+        tasks.master_tasks.merge_pinger_paths(
+            tasks.master_tasks.reduce_pinger_paths(json_data, level_indexes),
+            hop_index, edges, builder)
+
+        levels = tasks.master_tasks.roll_up_levels(
+            level_indexes, list(hop_index.keys()))
+        hop_names, ids = levels['subnet']
+        routing, path_loss = builder.matrix(len(hop_names), ids)
+        assert routing.shape == (4, 5)
+
+        hop_loss = tasks.master_tasks.solve_hop_loss(routing, path_loss)
+        assert np.round(hop_loss, 3).tolist() == [0.0, 0.0, 0.0, 50.0, 0.0]
+        assert hop_names[int(np.argmax(hop_loss))] == '10.0.4.0'
+
+        # all the hops are in the same /16
+        hop_names, ids = levels['aggregate']
+        assert hop_names == ['10.0.0.0']
+        assert builder.matrix(len(hop_names), ids)[0].sum() == 4
+
+    def test_network_prefix_index(self):
+        """
+        Check the longest prefix match grouping of the hops
+        :return:
+        """
+        prefix_index = tasks.master_tasks.NetworkPrefixIndex(
+            24, {'10.0.0.0/16': 31, '10.0.128.0/17': 16})
+
+        networks = prefix_index.lookup_many(
+            ['10.0.1.3', '10.0.130.5', '10.2.3.4', '?'])
+        assert networks == ['10.0.1.2', '10.0.0.0', '10.2.3.0', None]
+
     def test_create_master_iteration(self):
         """
         Create a master iteration
@@ -662,11 +842,120 @@ class PipongerTestCase(unittest.TestCase):
 
             tracert_t = s.query(
                 models.Tracert).filter_by(id=tracert_id).first()
-            tracert_result = tracert_t.result
+            tracert_paths = tracert_t.paths
             s.commit()
             s.close_all()
 
-            assert "flows" in tracert_result
+            assert str(src_port) in tracert_paths
+
+    def test_compact_pinger_results(self):
+        """
+        Check the compact traceroute and iperf results of a pinger
+        iteration and its compressed raw outputs
+        :return:
+        """
+        def flow(name, src, is_last=False):
+            return {'name': name, 'is_last': is_last,
+                    'sent': {'ip': {'src': '10.0.0.1'},
+                             'udp': {'sport': 40000, 'dport': 4000}},
+                    'received': {'ip': {'src': src}} if name else None}
+
+        tracert_output = {'flows': {'40000': [
+            flow('a', '10.0.1.1'), flow('', None), flow('b', '10.0.2.1'),
+            flow('c', '192.168.1.10'), flow('c', '192.168.1.10', True)]}}
+        iperf_output = {'end': {'sum': {
+            'seconds': 10.0, 'bytes': 1250000, 'bits_per_second': 1000000.0,
+            'lost_percent': 2.5}, 'cpu_utilization_percent': {}}}
+
+        paths = tasks.pinger_tasks.compact_tracert_result(tracert_output,
+                                                          '192.168.1.10')
+        assert paths['40000']['complete']
+        assert paths['40000']['dst_port'] == 4000
+        assert [tasks.pinger_tasks.int_to_ip(h)
+                for h in paths['40000']['hops']] == [
+                    '10.0.1.1', '10.0.2.1', '192.168.1.10']
+
+        default_encoding = app.config['PINGER_RAW_RESULT_ENCODING']
+        app.config['PINGER_RAW_RESULT_ENCODING'] = 'gzip'
+        try:
+            with self.app.app_context():
+                s = db.session()
+                iter_t = models.PingerIteration(
+                    remote_id='1', remote_address='127.0.0.1')
+                s.add(iter_t)
+                s.flush()
+                ponger_t = models.Ponger(address='192.168.1.10',
+                                         pinger_iteration_id=iter_t.id)
+                s.add(ponger_t)
+                s.flush()
+                ponger_port_t = models.PongerPort(
+                    ponger_id=ponger_t.id, dst_port=4000,
+                    src_port_min=40000, src_port_max=40001)
+                s.add(ponger_port_t)
+                s.flush()
+
+                raw_encoding, raw_result = \
+                    tasks.common_tasks.encode_raw_result(
+                        json.dumps(tracert_output))
+                tracert_t = models.Tracert(
+                    pinger_iteration_id=iter_t.id, status='SUCCESS',
+                    ponger_port_id=ponger_port_t.id, paths=paths,
+                    raw_encoding=raw_encoding, raw_result=raw_result)
+                s.add(tracert_t)
+                s.add(models.Iperf(
+                    pinger_iteration_id=iter_t.id, status='SUCCESS',
+                    ponger_port_id=ponger_port_t.id, src_port=40000,
+                    **iperf_output['end']['sum']))
+                s.commit()
+
+                assert json.loads(tasks.common_tasks.decode_raw_result(
+                    tracert_t)) == tracert_output
+
+                result = tasks.pinger_tasks.get_iteration_result(iter_t.id)
+                assert result == [{
+                    'ponger_address': '192.168.1.10', 'src_port': 40000,
+                    'dst_port': 4000, 'path': ['10.0.1.1', '10.0.2.1'],
+                    'seconds': 10.0, 'bytes': 1250000,
+                    'bits_per_second': 1000000.0, 'lost_percent': 2.5}]
+
+                # the rows stored before the compact results
+                tracert_t.paths = None
+                tracert_t.result = json.dumps(tracert_output)
+                iperf_t = db.session.query(models.Iperf).first()
+                iperf_t.lost_percent = None
+                iperf_t.result = json.dumps(iperf_output)
+                s.commit()
+                assert tasks.pinger_tasks.get_iteration_result(
+                    iter_t.id) == result
+        finally:
+            app.config['PINGER_RAW_RESULT_ENCODING'] = default_encoding
+
+    def test_iteration_result(self):
+        """
+        The paths of an iteration are only served to the master that
+        started it
+        :return:
+        """
+        with self.app.app_context():
+            s = db.session()
+            iter_t = models.PingerIteration(
+                remote_id='1', remote_address='10.0.0.99')
+            s.add(iter_t)
+            s.commit()
+
+            rv = self.client.get('/api/v1.0/iteration_result/1',
+                                 headers=self.auth_header)
+            assert json.loads(rv.data.decode())['msg'] == \
+                'iteration not found'
+
+            iter_t.remote_address = '127.0.0.1'
+            s.commit()
+
+            rv = self.client.get('/api/v1.0/iteration_result/1',
+                                 headers=self.auth_header)
+            data = json.loads(rv.data.decode())
+            assert data['result'] == 'success'
+            assert data['iteration_result'] == []
 
     def test_register_pinger_result(self):
         """
@@ -707,6 +996,58 @@ class PipongerTestCase(unittest.TestCase):
 
         assert b'success' in rv.data
 
+    def test_path_results(self):
+        """
+        Load the pinger results into the normalized path results table
+        :return:
+        """
+        # MASTER_PATH_RESULT_TABLE is set back to False by setUp
+        app.config['MASTER_PATH_RESULT_TABLE'] = True
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+            dummy_res = self.get_dummy_pinger_results()
+
+            rv = self.client.post(
+                '/api/v1.0/master/register_pinger_result',
+                data=json.dumps({
+                    "master_remote_id": 1,
+                    "local_port": 1234,
+                    "result": dummy_res[0]
+                }),
+                follow_redirects=True,
+                headers=self.auth_header,
+                content_type='application/json')
+            assert b'success' in rv.data
+
+            # one row per path and the distinct paths once
+            assert db.session.query(models.MasterPathResult).count() == \
+                len(dummy_res[0])
+            assert db.session.query(models.MasterPath).count() == \
+                len(set(tuple(e['path']) for e in dummy_res[0]))
+
+        rv = self.client.get('/api/v1.0/master/path_results/1',
+                             headers=self.auth_header)
+        json_data = json.loads(str(rv.data, 'utf-8'))
+        assert json_data['result'] == 'success'
+        assert sorted(tuple(e['path'])
+                      for e in json_data['path_results']) == \
+            sorted(tuple(e['path']) for e in dummy_res[0])
+        assert json_data['path_results'][0]['lost_percent'] == \
+            dummy_res[0][0]['lost_percent']
+
     def test_analyse_result(self):
         """
         Analyse pinger results
@@ -748,20 +1089,500 @@ class PipongerTestCase(unittest.TestCase):
             analyse_result = tasks.master_tasks.analyse_iteration(1)
             assert '10.0.21.0' in analyse_result
 
-            plot_filename = '/tmp/last_generated_result.png'
-
-            if os.path.isfile(plot_filename):
-                try:
-                    os.remove(plot_filename)
-                except OSError:
-                    pass
-
             master_it = db.session.query(models.MasterIteration).order_by(
                 desc(models.MasterIteration.created_date)).first()
-
-            rv = self.client.get('/get_result_plot/{}'.format(master_it.id), headers=self.auth_header)
+            # the tasks remove the session of their app context, master_it
+            # is detached after them
+            master_it_id = master_it.id
+
+            # a plot not rendered yet is requested once for all the clients
+            rv = self.client.get('/get_result_plot/{}'.format(master_it_id), headers=self.auth_header)
+            assert rv.status_code == 202
+            assert tasks.master_tasks.request_iteration_plot(
+                master_it_id) is False
+            rv = self.client.get('/get_result_plot/{}'.format(master_it_id), headers=self.auth_header)
+            assert rv.status_code == 202
+
+            # the plots are pre-rendered once, until the graph changes
+            tasks.master_tasks.render_iteration_plot(master_it_id)
+            assert tasks.master_tasks.render_iteration_plot(
+                master_it_id) is False
+
+            rv = self.client.get('/get_result_plot/{}'.format(master_it_id), headers=self.auth_header)
             assert 'image/png' in rv.headers['content-type']
-            assert os.path.isfile(plot_filename) is True
+            assert 'max-age' in rv.headers['cache-control']
+            etag = rv.headers['etag']
+
+            headers = dict(self.auth_header)
+            headers['If-None-Match'] = etag
+            rv = self.client.get('/get_result_plot/{}'.format(master_it_id), headers=headers)
+            assert rv.status_code == 304
+
+            rv = self.client.get('/get_result_plot/{}?format=svg'.format(master_it_id), headers=self.auth_header)
+            assert 'image/svg+xml' in rv.headers['content-type']
+
+            # the node positions are computed by the master
+            rv = self.client.get('/get_result_plot_json/{}'.format(master_it_id), headers=self.auth_header)
+            nodes = json.loads(rv.data.decode('utf-8'))['nodes']
+            assert nodes and all('x' in n and 'y' in n for n in nodes)
+
+            # the laid out graph of a finished iteration is cached
+            headers = dict(self.auth_header)
+            headers['Accept-Encoding'] = 'gzip'
+            cached = self.client.get('/get_result_plot_json/{}'.format(master_it_id), headers=headers)
+            assert cached.headers['content-encoding'] == 'gzip'
+            assert 'max-age' in cached.headers['cache-control']
+            assert json.loads(gzip.decompress(cached.data).decode('utf-8')) == \
+                json.loads(rv.data.decode('utf-8'))
+
+            headers['If-None-Match'] = cached.headers['etag']
+            rv = self.client.get('/get_result_plot_json/{}'.format(master_it_id), headers=headers)
+            assert rv.status_code == 304
+
+            # the other analysis levels are stored too
+            rv = self.client.get(
+                '/get_result_plot_json/{}?level=aggregate'.format(master_it_id),
+                headers=self.auth_header)
+            assert b'10.0.0.0' in rv.data
+            assert b'10.0.21.0' not in rv.data
+
+            rv = self.client.get(
+                '/get_result_plot_json/{}?level=rack'.format(master_it_id),
+                headers=self.auth_header)
+            assert rv.status_code == 400
+
+            # subgraphs: collapsed clusters, expanded cluster, neighbourhood
+            rv = self.client.get(
+                '/get_result_clusters_json/{}'.format(master_it_id),
+                headers=self.auth_header)
+            clusters = json.loads(rv.data.decode('utf-8'))
+            assert [n['id'] for n in clusters['nodes']] == ['10.0.0.0']
+            assert clusters['nodes'][0]['child_count'] > 1
+
+            rv = self.client.get(
+                '/get_result_cluster_json/{}/10.0.0.0'.format(master_it_id),
+                headers=self.auth_header)
+            expanded = json.loads(rv.data.decode('utf-8'))
+            assert '10.0.21.0' in [n['id'] for n in expanded['nodes']]
+            assert len(expanded['nodes']) == clusters['nodes'][0]['child_count']
+
+            rv = self.client.get(
+                '/get_result_neighbourhood_json/{}?hops=1'.format(master_it_id),
+                headers=self.auth_header)
+            neighbourhood = json.loads(rv.data.decode('utf-8'))
+            distance = {n['id']: n['distance'] for n in neighbourhood['nodes']}
+            assert distance['10.0.21.0'] == 0
+            assert 1 in distance.values()
+            assert len(distance) < len(expanded['nodes'])
+
+    def test_parallel_analyse_result(self):
+        """
+        The pinger results reduced in a pool of processes give the same
+        analysis as the ones reduced in the calling process
+        :return:
+        """
+        dummy_res = self.get_dummy_pinger_results()
+
+        # one registered pinger per result
+        for i in range(len(dummy_res)):
+            rv = self.client.post(
+                '/api/v1.0/master/register_pinger',
+                data=json.dumps(dict(api_port=str(1234 + i),
+                                     api_protocol='http://')),
+                follow_redirects=True,
+                headers=self.auth_header,
+                content_type='application/json')
+            assert b'success' in rv.data
+
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+            for i in range(len(dummy_res)):
+                rv = self.client.post(
+                    '/api/v1.0/master/register_pinger_result',
+                    data=json.dumps({
+                        "master_remote_id": 1,
+                        "local_port": 1234 + i,
+                        "result": dummy_res[i]
+                    }),
+                    follow_redirects=True,
+                    headers=self.auth_header,
+                    content_type='application/json')
+                assert b'success' in rv.data
+
+            levels = tasks.master_tasks.analyse_pinger_results(1, 1)
+            parallel_levels = tasks.master_tasks.analyse_pinger_results(1, 3)
+
+            assert list(parallel_levels.keys()) == list(levels.keys())
+            for level, (hop_names, hop_means, edges) in levels.items():
+                assert hop_names
+                assert parallel_levels[level][0] == hop_names
+                assert np.allclose(parallel_levels[level][1], hop_means)
+                assert parallel_levels[level][2] == edges
+
+    def test_incremental_analyse_result(self):
+        """
+        Fold the pinger results as they arrive and analyse the accumulators
+        :return:
+        """
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        app.config['MASTER_INCREMENTAL_ANALYSIS'] = True
+        try:
+            with self.app.app_context():
+                tasks.master_tasks.create_iteration()
+
+                dummy_res = self.get_dummy_pinger_results()
+
+                for i in range(len(dummy_res)):
+                    self.client.post(
+                        '/api/v1.0/master/register_pinger_result',
+                        data=json.dumps({
+                            "master_remote_id": 1,
+                            "local_port": 1234,
+                            "result": dummy_res[i]
+                        }),
+                        follow_redirects=True,
+                        headers=self.auth_header,
+                        content_type='application/json')
+
+                hop_count = db.session.query(
+                    models.MasterIterationHop).filter_by(
+                    master_iteration_id=1).count()
+                assert hop_count > 0
+
+                rv = self.client.get(
+                    '/api/v1.0/master/provisional_result/1',
+                    headers=self.auth_header)
+                assert b'10.0.21.0' in rv.data
+
+                analyse_result = tasks.master_tasks.analyse_iteration(1)
+                assert '10.0.21.0' in analyse_result
+        finally:
+            app.config['MASTER_INCREMENTAL_ANALYSIS'] = False
+
+    def test_hop_baseline_scoring(self):
+        """
+        The baseline score is the excess loss over the history of the hop
+        in standard deviations: a stable hop ranks over a noisy hop with
+        the same excess loss
+        :return:
+        """
+        baseline_scoring = app.config['MASTER_BASELINE_SCORING']
+        app.config['MASTER_BASELINE_SCORING'] = True
+        try:
+            with self.app.app_context():
+                samples = app.config['MASTER_BASELINE_MIN_SAMPLES']
+                db.session.add(models.HopBaseline(
+                    hop='10.0.1.0', ewma_mean=1.0, ewma_variance=0.01,
+                    sample_count=samples))
+                db.session.add(models.HopBaseline(
+                    hop='10.0.2.0', ewma_mean=1.0, ewma_variance=25.0,
+                    sample_count=samples))
+                db.session.commit()
+
+                hop_names = ['10.0.1.0', '10.0.2.0', '10.0.3.0']
+                scores = tasks.master_tasks.get_hop_scores(
+                    hop_names, np.array([6.0, 6.0, 0.0]))
+                assert scores[0] > scores[1] > scores[2] == 0.0
+
+                # a retried analysis does not add its iteration again
+                for _retry in range(2):
+                    tasks.master_tasks.update_hop_baseline(
+                        7, hop_names, np.array([6.0, 6.0, 0.0]))
+                    db.session.commit()
+                counts = dict(db.session.query(
+                    models.HopBaseline.hop, models.HopBaseline.sample_count))
+                assert counts == {'10.0.1.0': samples + 1,
+                                  '10.0.2.0': samples + 1, '10.0.3.0': 1}
+        finally:
+            app.config['MASTER_BASELINE_SCORING'] = baseline_scoring
+
+    def test_single_flight_analysis(self):
+        """
+        Only one analysis runs for an iteration, the repeated triggers get
+        the stored outcome
+        :return:
+        """
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+            dummy_res = self.get_dummy_pinger_results()
+
+            for i in range(len(dummy_res)):
+                self.client.post(
+                    '/api/v1.0/master/register_pinger_result',
+                    data=json.dumps({
+                        "master_remote_id": 1,
+                        "local_port": 1234,
+                        "result": dummy_res[i]
+                    }),
+                    follow_redirects=True,
+                    headers=self.auth_header,
+                    content_type='application/json')
+
+            # the iteration finished and its analysis is already requested
+            outcome = tasks.master_tasks.request_iteration_analysis(1)
+            assert outcome['requested'] is False
+            assert outcome['analysis_status'] in ('PENDING', 'STARTED',
+                                                  'SUCCESS')
+
+            analyse_result = tasks.master_tasks.analyse_iteration(1)
+            assert '10.0.21.0' in analyse_result
+            result_count = db.session.query(
+                models.MasterIterationResult).filter_by(
+                master_iteration_id=1).count()
+
+            # repeated analysis: cached outcome, no duplicated results
+            assert tasks.master_tasks.analyse_iteration(1) == analyse_result
+            assert db.session.query(models.MasterIterationResult).filter_by(
+                master_iteration_id=1).count() == result_count
+
+            outcome = tasks.master_tasks.request_iteration_analysis(1)
+            assert outcome['requested'] is False
+            assert outcome['analysis_status'] == 'SUCCESS'
+            assert [h['host'] for h in outcome['problematic_hosts']] == \
+                analyse_result
+
+    def test_iteration_deadline(self):
+        """
+        An iteration older than MASTER_ITERATION_DEADLINE_MINUTES is finished
+        without the missing pingers, their late results are rejected
+        :return:
+        """
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        self.add_ponger_localhost()
+
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+            res = tasks.master_tasks.check_master_iteration_done(1)
+            assert res['is_finished'] is False
+
+            master_it = db.session.query(models.MasterIteration).filter_by(
+                id=1).first()
+            master_it.created_date = master_it.created_date - timedelta(
+                minutes=app.config['MASTER_ITERATION_DEADLINE_MINUTES'] + 1)
+            db.session.commit()
+
+            res = tasks.master_tasks.check_master_iteration_done(1)
+            assert res['is_finished'] is True
+            assert res['timed_out'] == 1
+
+            master_it = db.session.query(models.MasterIteration).filter_by(
+                id=1).first()
+            assert master_it.status == 'FINISHED'
+            assert master_it.master_iteration_pinger[0].status == 'TIMED_OUT'
+            # no late result will request it
+            assert master_it.analysis_status is not None
+
+            # already finished, not finalized again
+            res = tasks.master_tasks.check_master_iteration_done(1)
+            assert res['is_finished'] is True
+            assert res['timed_out'] == 1
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger_result',
+            data=json.dumps({
+                "master_remote_id": 1,
+                "local_port": 1234,
+                "result": self.get_dummy_pinger_results()[0]
+            }),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'failure' in rv.data
+
+    def test_replay_iterations(self):
+        """
+        Replay the analysis of a stored iteration with other parameters
+        :return:
+        """
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+            dummy_res = self.get_dummy_pinger_results()
+
+            for i in range(len(dummy_res)):
+                self.client.post(
+                    '/api/v1.0/master/register_pinger_result',
+                    data=json.dumps({
+                        "master_remote_id": 1,
+                        "local_port": 1234,
+                        "result": dummy_res[i]
+                    }),
+                    follow_redirects=True,
+                    headers=self.auth_header,
+                    content_type='application/json')
+
+            tasks.master_tasks.analyse_iteration(1)
+            result_count = db.session.query(
+                models.MasterIterationResult).count()
+
+            rv = self.client.post(
+                '/api/v1.0/master/replay',
+                data=json.dumps({
+                    "master_iteration_id": 1,
+                    "parameters": {"UNKNOWN_PARAMETER": 1}
+                }),
+                headers=self.auth_header,
+                content_type='application/json')
+            assert b'failure' in rv.data
+
+            # scored against the baseline of today, not reproducible
+            rv = self.client.post(
+                '/api/v1.0/master/replay',
+                data=json.dumps({
+                    "master_iteration_id": 1,
+                    "parameters": {"MASTER_BASELINE_SCORING": True}
+                }),
+                headers=self.auth_header,
+                content_type='application/json')
+            assert b'hop baseline' in rv.data
+
+            rv = self.client.post(
+                '/api/v1.0/master/replay',
+                data=json.dumps({
+                    "master_iteration_id": 1,
+                    "parameters": {"DEFAULT_NETWORK_SEGMENTATION": 32}
+                }),
+                headers=self.auth_header,
+                content_type='application/json')
+            replay_id = json.loads(rv.data.decode())['analysis_replay_id']
+
+            app.config['MASTER_REPLAY_WORKERS'] = 1
+            replay_res = tasks.master_tasks.replay_iterations(replay_id)
+            assert replay_res['iteration_count'] == 1
+            assert app.config['DEFAULT_NETWORK_SEGMENTATION'] == 24
+
+            rv = self.client.get(
+                '/api/v1.0/master/replay/{}'.format(replay_id),
+                headers=self.auth_header)
+            replay = json.loads(rv.data.decode())['replay']
+            assert replay['status'] == 'SUCCESS'
+            # the hosts are not grouped with a /32 segmentation
+            hosts = [r['problematic_host'] for r in replay['results']]
+            assert '10.0.21.1' in hosts or '10.0.21.2' in hosts
+
+            # the results of the iteration are not modified
+            assert db.session.query(
+                models.MasterIterationResult).count() == result_count
+
+    def test_replay_summary_iterations(self):
+        """
+        An iteration with pinger summaries is replayed with its segmentation
+        and the voting engine, it is reported as skipped otherwise
+        :return:
+        """
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+            summary = tasks.master_tasks.summarize_pinger_result(
+                self.get_dummy_pinger_results()[0],
+                tasks.master_tasks.get_level_indexes())
+            self.client.post(
+                '/api/v1.0/master/register_pinger_result',
+                data=json.dumps({
+                    "master_remote_id": 1,
+                    "local_port": 1234,
+                    "result": summary
+                }),
+                follow_redirects=True,
+                headers=self.auth_header,
+                content_type='application/json')
+            tasks.master_tasks.analyse_iteration(1)
+
+            app.config['MASTER_REPLAY_WORKERS'] = 1
+            replay_ids = []
+            for parameters in ({"MASTER_OUTLIER_Z_SCORE_THRESHOLD": 0.9},
+                               {"DEFAULT_NETWORK_SEGMENTATION": 32},
+                               {"MASTER_ANALYSIS_ENGINE": 'tomography'}):
+                rv = self.client.post(
+                    '/api/v1.0/master/replay',
+                    data=json.dumps({
+                        "master_iteration_id": 1,
+                        "parameters": parameters
+                    }),
+                    headers=self.auth_header,
+                    content_type='application/json')
+                replay_ids.append(
+                    json.loads(rv.data.decode())['analysis_replay_id'])
+
+            replay_res = tasks.master_tasks.replay_iterations(replay_ids[0])
+            assert replay_res['iteration_count'] == 1
+            assert replay_res['skipped_count'] == 0
+
+            for replay_id in replay_ids[1:]:
+                replay_res = tasks.master_tasks.replay_iterations(replay_id)
+                assert replay_res['iteration_count'] == 0
+                assert replay_res['error_count'] == 0
+                assert replay_res['skipped_count'] == 1
+
+                rv = self.client.get(
+                    '/api/v1.0/master/replay/{}'.format(replay_id),
+                    headers=self.auth_header)
+                replay = json.loads(rv.data.decode())['replay']
+                assert replay['status'] == 'SUCCESS'
+                skipped = replay['skipped_iterations']
+                assert [e['master_iteration_id'] for e in skipped] == [1]
+                assert skipped[0]['reason'].startswith('skipped: summary')
 
     def test_check_master_iteration_done(self):
         """
@@ -813,6 +1634,301 @@ class PipongerTestCase(unittest.TestCase):
             assert 100.0 == int(res['percentage'])
             assert True is res['is_finished']
 
+    def test_master_status_snapshot(self):
+        """
+        Check the cached master status of the home view, it is computed
+        again after the registrations, the results and the iterations
+        :return:
+        """
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        rv = self.client.get('/', headers=self.auth_header)
+        master_info = json.loads(rv.data.decode('utf-8'))['master_info']
+        assert len(master_info['registrered_pingers']) == 1
+        assert len(master_info['registrered_pongers']) == 1
+        assert 'current_iteration' not in master_info
+
+        with self.app.app_context():
+            status_t = db.session.query(models.MasterStatus).first()
+            assert status_t.snapshot_version == status_t.version
+            version = status_t.version
+
+            # refreshing a registration does not change the status
+            rv = self.client.post(
+                '/api/v1.0/master/register_pinger',
+                data=json.dumps(dict(api_port='1234',
+                                     api_protocol='http://')),
+                follow_redirects=True,
+                headers=self.auth_header,
+                content_type='application/json')
+            assert b'success' in rv.data
+            db.session.expire_all()
+            status_t = db.session.query(models.MasterStatus).first()
+            assert status_t.version == version
+
+            tasks.master_tasks.create_iteration()
+
+        rv = self.client.get('/', headers=self.auth_header)
+        master_info = json.loads(rv.data.decode('utf-8'))['master_info']
+        progress = master_info['current_iteration']['progress']
+        assert master_info['current_iteration']['status'] == 'CREATED'
+        assert progress['count'] == 0
+        assert progress['total'] == 1
+        assert progress['is_finished'] is False
+
+        dummy_res = self.get_dummy_pinger_results()
+        self.client.post(
+            '/api/v1.0/master/register_pinger_result',
+            data=json.dumps({
+                "master_remote_id": 1,
+                "local_port": 1234,
+                "result": dummy_res[0]
+            }),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+
+        rv = self.client.get('/', headers=self.auth_header)
+        master_info = json.loads(rv.data.decode('utf-8'))['master_info']
+        progress = master_info['current_iteration']['progress']
+        assert master_info['current_iteration']['status'] == 'FINISHED'
+        assert progress['count'] == 1
+        assert int(progress['percentage']) == 100
+        assert progress['is_finished'] is True
+
+    def test_master_status_pinger_result(self):
+        """
+        A pinger result does not bump the master status version, the
+        snapshot is computed again because the count of results changed
+        :return:
+        """
+        # add a ponger that is not the same as the pinger
+        self.add_ponger_localhost()
+
+        for api_port in ('1234', '1235'):
+            rv = self.client.post(
+                '/api/v1.0/master/register_pinger',
+                data=json.dumps(dict(api_port=api_port,
+                                     api_protocol='http://')),
+                follow_redirects=True,
+                headers=self.auth_header,
+                content_type='application/json')
+            assert b'success' in rv.data
+
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+        rv = self.client.get('/', headers=self.auth_header)
+        progress = json.loads(rv.data.decode('utf-8'))[
+            'master_info']['current_iteration']['progress']
+        assert progress['count'] == 0
+        assert progress['total'] == 2
+
+        with self.app.app_context():
+            version = db.session.query(models.MasterStatus.version).scalar()
+
+        dummy_res = self.get_dummy_pinger_results()
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger_result',
+            data=json.dumps({
+                "master_remote_id": 1,
+                "local_port": 1234,
+                "result": dummy_res[0]
+            }),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        with self.app.app_context():
+            assert db.session.query(
+                models.MasterStatus.version).scalar() == version
+
+        rv = self.client.get('/', headers=self.auth_header)
+        master_info = json.loads(rv.data.decode('utf-8'))['master_info']
+        progress = master_info['current_iteration']['progress']
+        assert master_info['current_iteration']['status'] == 'CREATED'
+        assert progress['count'] == 1
+        assert progress['total'] == 2
+
+    def test_master_events(self):
+        """
+        Check the server-sent events of the master and the disabled stream
+        :return:
+        """
+        message = tasks.master_tasks.format_master_event(
+            'pinger_result', {'master_iteration_id': 1})
+        assert message.startswith("event: pinger_result\ndata: ")
+        assert message.endswith("\n\n")
+        assert json.loads(message.split("data: ")[1]) == {
+            'master_iteration_id': 1}
+
+        events_url = app.config['MASTER_EVENTS_REDIS_URL']
+        app.config['MASTER_EVENTS_REDIS_URL'] = None
+        try:
+            with self.app.app_context():
+                assert 0 == tasks.master_tasks.publish_master_event(
+                    'nodes_changed')
+
+            rv = self.client.get('/api/v1.0/master/events',
+                                 headers=self.auth_header)
+            assert rv.status_code == 404
+        finally:
+            app.config['MASTER_EVENTS_REDIS_URL'] = events_url
+
+        # no stream available, the dashboard polls
+        max_streams = app.config['MASTER_EVENTS_MAX_STREAMS']
+        app.config['MASTER_EVENTS_MAX_STREAMS'] = 0
+        try:
+            rv = self.client.get('/api/v1.0/master/events',
+                                 headers=self.auth_header)
+            assert rv.status_code == 503
+            assert 'Retry-After' in rv.headers
+        finally:
+            app.config['MASTER_EVENTS_MAX_STREAMS'] = max_streams
+
+    def test_master_events_stream(self):
+        """
+        Read the events stream with a fake redis pub/sub, the slot of the
+        stream is released when it is closed
+        :return:
+        """
+        event = tasks.master_tasks.format_master_event(
+            'nodes_changed', {'event': 'nodes_changed'})
+
+        class FakePubSub(object):
+            def __init__(self):
+                self.channels = []
+                self.messages = [{'data': event.encode('utf-8')}]
+                self.closed = False
+
+            def subscribe(self, channel):
+                self.channels.append(channel)
+
+            def get_message(self, timeout=None):
+                return self.messages.pop(0) if self.messages else None
+
+            def close(self):
+                self.closed = True
+
+        pubsub = FakePubSub()
+        fake_redis = mock.Mock()
+        fake_redis.pubsub.return_value = pubsub
+
+        streams = views.master_views._events_streams
+        with mock.patch.object(tasks.master_tasks, 'get_master_events_redis',
+                               return_value=fake_redis):
+            rv = self.client.get('/api/v1.0/master/events',
+                                 headers=self.auth_header)
+            assert rv.status_code == 200
+            assert 'text/event-stream' in rv.headers['content-type']
+            assert pubsub.channels == [
+                tasks.master_tasks.MASTER_EVENTS_CHANNEL]
+            assert views.master_views._events_streams == streams + 1
+
+            frames = iter(rv.response)
+            status = next(frames).decode('utf-8')
+            assert status.startswith("event: status\ndata: ")
+            assert 'master_info' in json.loads(status.split("data: ")[1])
+            assert next(frames).decode('utf-8') == event
+            assert next(frames).decode('utf-8') == ": keepalive\n\n"
+            rv.close()
+
+        assert pubsub.closed
+        assert views.master_views._events_streams == streams
+
+    def test_master_changes(self):
+        """
+        Check the delta sync of the registered nodes and the iterations
+        :return:
+        """
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        rv = self.client.get('/api/v1.0/master/changes',
+                             headers=self.auth_header)
+        changes = json.loads(rv.data.decode('utf-8'))
+        assert changes['full'] is True
+        assert len(changes['pingers']['added']) == 1
+        assert len(changes['pongers']['added']) == 0
+        version = changes['version']
+
+        # nothing changed
+        rv = self.client.get(
+            '/api/v1.0/master/changes?since={}'.format(version),
+            headers=self.auth_header)
+        changes = json.loads(rv.data.decode('utf-8'))
+        assert changes['full'] is False
+        assert changes['pingers'] == {'added': [], 'changed': [],
+                                      'removed': []}
+        assert changes['iterations'] == {'added': [], 'changed': []}
+
+        # registered again with another protocol
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='https://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        rv = self.client.get(
+            '/api/v1.0/master/changes?since={}'.format(version),
+            headers=self.auth_header)
+        changes = json.loads(rv.data.decode('utf-8'))
+        assert changes['pingers']['added'] == []
+        assert changes['pingers']['changed'] == [
+            {'address': '127.0.0.1', 'api_port': 1234,
+             'api_protocol': 'https://'}]
+        version = changes['version']
+
+        self.add_ponger_localhost()
+        with self.app.app_context():
+            tasks.master_tasks.create_iteration()
+
+        rv = self.client.get(
+            '/api/v1.0/master/changes?since={}'.format(version),
+            headers=self.auth_header)
+        changes = json.loads(rv.data.decode('utf-8'))
+        assert len(changes['pingers']['added']) == 0
+        assert len(changes['pongers']['added']) == 1
+        assert len(changes['iterations']['added']) == 1
+        assert changes['iterations']['added'][0]['progress']['total'] == 1
+        version = changes['version']
+
+        with self.app.app_context():
+            s = db.session()
+            db.session.query(models.RegisteredPingerNode).update(
+                {'last_updated_date': "2000-11-16 17:30:00"})
+            s.commit()
+            tasks.master_tasks.remove_old_nodes()
+
+        rv = self.client.get(
+            '/api/v1.0/master/changes?since={}'.format(version),
+            headers=self.auth_header)
+        changes = json.loads(rv.data.decode('utf-8'))
+        assert changes['pingers']['removed'] == [
+            {'address': '127.0.0.1', 'api_port': 1234}]
+        assert len(changes['pongers']['removed']) == 0
+
+        rv = self.client.get('/api/v1.0/master/changes?since=x',
+                             headers=self.auth_header)
+        assert rv.status_code == 400
+
     def test_finish_old_iterations(self):
         """
         Check finishing old iterations that are probably hanging
@@ -849,6 +1965,124 @@ class PipongerTestCase(unittest.TestCase):
                 desc(models.MasterIteration.created_date)).first()
             assert master_it_q.status == "FINISHED"
 
+    def test_remove_old_iterations(self):
+        """
+        Check the retention of the pinger and master iterations: the old
+        ones are archived and deleted with their rows, the recent ones
+        are kept
+        :return:
+        """
+        rv = self.client.post(
+            '/api/v1.0/master/register_pinger',
+            data=json.dumps(dict(api_port='1234', api_protocol='http://')),
+            follow_redirects=True,
+            headers=self.auth_header,
+            content_type='application/json')
+        assert b'success' in rv.data
+
+        archive_dir = tempfile.mkdtemp()
+        default_archive_dir = app.config['RETENTION_ARCHIVE_DIR']
+        default_batch_size = app.config['HOUSEKEEPING_BATCH_SIZE']
+        default_retention = (app.config['PINGER_ITERATION_RETENTION_DAYS'],
+                             app.config['MASTER_ITERATION_RETENTION_DAYS'])
+        app.config['RETENTION_ARCHIVE_DIR'] = archive_dir
+        app.config['HOUSEKEEPING_BATCH_SIZE'] = 1
+        # disabled by default
+        with self.app.app_context():
+            assert tasks.common_tasks.remove_old_pinger_iterations() is None
+            assert tasks.master_tasks.remove_old_master_iterations() is None
+        app.config['PINGER_ITERATION_RETENTION_DAYS'] = 7
+        app.config['MASTER_ITERATION_RETENTION_DAYS'] = 90
+        try:
+            with self.app.app_context():
+                s = db.session()
+                for remote_id, created_date in (('1', '2000-11-16 17:30:00'),
+                                                ('2', '2000-11-17 17:30:00'),
+                                                ('3', None)):
+                    iter_t = models.PingerIteration(
+                        remote_id=remote_id, remote_address='127.0.0.1',
+                        status='FINISHED')
+                    if created_date is not None:
+                        iter_t.created_date = created_date
+                    s.add(iter_t)
+                    s.flush()
+                    ponger_t = models.Ponger(address='127.0.0.1',
+                                             pinger_iteration_id=iter_t.id)
+                    s.add(ponger_t)
+                    s.flush()
+                    ponger_port_t = models.PongerPort(
+                        ponger_id=ponger_t.id, dst_port=4000,
+                        src_port_min=4001, src_port_max=4002)
+                    s.add(ponger_port_t)
+                    s.flush()
+                    s.add(models.Tracert(pinger_iteration_id=iter_t.id,
+                                         status='SUCCESS',
+                                         ponger_port_id=ponger_port_t.id,
+                                         result='{"flows": {}}'))
+                s.commit()
+
+                # two batches of one iteration
+                assert tasks.common_tasks.remove_old_pinger_iterations() == 2
+                assert [e.remote_id for e in db.session.query(
+                    models.PingerIteration)] == ['3']
+                assert db.session.query(models.Tracert).count() == 1
+                assert db.session.query(models.PongerPort).count() == 1
+
+                archives = sorted(os.listdir(archive_dir))
+                assert len(archives) == 2
+                with gzip.open(os.path.join(archive_dir, archives[0]),
+                               'rt') as f:
+                    record = json.loads(f.readline())
+                assert record['remote_id'] == '1'
+                assert record['tracert'][0]['result'] == '{"flows": {}}'
+                assert record['ponger'][0]['ponger_port'][0]['dst_port'] == \
+                    4000
+
+                # the only copy of the paths of a summarised iteration
+                iter_t = models.PingerIteration(
+                    remote_id='4', remote_address='127.0.0.1',
+                    status='FINISHED', created_date='2000-11-18 17:30:00',
+                    result_summary={'default_netmask': 24,
+                                    'prefix_netmasks': {},
+                                    'aggregate_netmask': 16})
+                s.add(iter_t)
+                s.commit()
+                assert tasks.common_tasks.remove_old_pinger_iterations() == 0
+                app.config['PINGER_SUMMARY_RETENTION_DAYS'] = 7
+                try:
+                    assert tasks.common_tasks.remove_old_pinger_iterations() \
+                        == 1
+                finally:
+                    app.config['PINGER_SUMMARY_RETENTION_DAYS'] = None
+                assert [e.remote_id for e in db.session.query(
+                    models.PingerIteration)] == ['3']
+
+                tasks.master_tasks.create_iteration()
+                master_it = db.session.query(models.MasterIteration).first()
+                master_it.created_date = "2000-11-16 17:30:00"
+                master_it.status = 'FINISHED'
+                # the removal creates the master_status row if needed
+                db.session.query(models.MasterStatus).delete()
+                s.commit()
+
+                assert tasks.master_tasks.remove_old_master_iterations() == 1
+                assert db.session.query(models.MasterIteration).count() == 0
+                assert db.session.query(
+                    models.MasterIterationPinger).count() == 0
+                assert tasks.master_tasks.get_master_changes(0)['full']
+                assert any(a.startswith('master_iteration_')
+                           for a in os.listdir(archive_dir))
+
+                # nothing left to remove
+                assert tasks.common_tasks.remove_old_pinger_iterations() == 0
+                assert tasks.master_tasks.remove_old_master_iterations() == 0
+        finally:
+            app.config['RETENTION_ARCHIVE_DIR'] = default_archive_dir
+            app.config['HOUSEKEEPING_BATCH_SIZE'] = default_batch_size
+            (app.config['PINGER_ITERATION_RETENTION_DAYS'],
+             app.config['MASTER_ITERATION_RETENTION_DAYS']) = \
+                default_retention
+
 
 if __name__ == '__main__':
     unittest.main(verbosity=2)
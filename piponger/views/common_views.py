@@ -4,7 +4,10 @@
 # This source code is licensed under the BSD-style license found in the
 # LICENSE file in the root directory of this source tree.
 
-from flask import jsonify, Blueprint, url_for
+from flask import (jsonify, Blueprint, url_for, request, abort,
+                   send_from_directory)
+import os
+import assets
 import models
 from main import (app, db, auth, logger, pipong_is_pinger, pipong_is_ponger,
                   pipong_is_master)
@@ -85,55 +88,46 @@ def home():
         result_dict['ponger_info'] = {'pinger_port_list': pinger_port_list}
 
     if is_master:
-        registrered_pingers = []
-        registrered_pongers = []
-        result_dict['master_info'] = {}
-
-        i = 0
-        iter_ids = [e.id for e in db.session.query(models.MasterIteration).order_by(desc(models.MasterIteration.created_date)).limit(2).all()]
-        for m_iter_id in iter_ids:
-            m_iter = db.session.query(models.MasterIteration).filter_by(id=m_iter_id).first()
-            it_id = int(m_iter.id)
-
-            it_info = {
-                'id': int(m_iter.id),
-                'status': str(m_iter.status),
-                'has_graph': True if m_iter.json_graph else False,
-                'created_date': str(m_iter.created_date),
-                'problematic_hosts': [{'host': str(h.problematic_host), 'score':float(h.score)} for h in m_iter.master_iteration_result]
-            }
-
-            iteration_label = "previous_iteration"
-            if i == 0:
-                iteration_label = "current_iteration"
-                res = tasks.master_tasks.check_master_iteration_done.apply(args=[it_id])
-                it_info['progress'] = res.get()
-
-            result_dict['master_info'][iteration_label] = it_info
-            i += 1
-
-        r_pingers_t = db.session.query(models.RegisteredPingerNode)
-        for pinger in r_pingers_t:
-            registrered_pingers.append({
-                'address': pinger.address,
-                'api_port': pinger.api_port,
-                'api_protocol': pinger.api_protocol
-            })
-
-        r_pongers_t = db.session.query(models.RegisteredPongerNode)
-        for ponger in r_pongers_t:
-            registrered_pongers.append({
-                'address': ponger.address,
-                'api_port': ponger.api_port,
-                'api_protocol': ponger.api_protocol
-            })
-
-        result_dict['master_info']['registrered_pingers'] = registrered_pingers
-        result_dict['master_info']['registrered_pongers'] = registrered_pongers
+        # snapshot cached in the database, computed again only after a
+        # registration, a pinger result or an iteration change
+        result_dict['master_info'] = tasks.master_tasks.get_master_status_snapshot()
 
     return jsonify(result_dict)
 
 
+@bp.route('/dist/<file_name>', methods=['GET'])
+def get_asset(file_name):
+    """
+    Static asset bundle (see assets.py), the precompressed gzip file is
+    sent to the clients that accept it. The file names change with their
+    content, so the browsers can keep them forever. The bundles of the
+    previous builds are served too, for the pages loaded before a deploy
+    :param file_name: the file name of a bundle
+    :return:
+    """
+    dist_folder = os.path.join(app.static_folder, assets.ASSETS_DIR)
+    if assets.ASSET_FILE_RE.match(file_name) is None or \
+            not os.path.isfile(os.path.join(dist_folder, file_name)):
+        abort(404)
+
+    mimetype = assets.ASSET_MIMETYPES[os.path.splitext(file_name)[1]]
+
+    gzipped = request.accept_encodings['gzip'] > 0 and os.path.exists(
+        os.path.join(dist_folder, file_name + '.gz'))
+    if gzipped:
+        response = send_from_directory(dist_folder, file_name + '.gz',
+                                       mimetype=mimetype)
+        response.headers['Content-Encoding'] = 'gzip'
+    else:
+        response = send_from_directory(dist_folder, file_name,
+                                       mimetype=mimetype)
+
+    response.headers['Vary'] = 'Accept-Encoding'
+    response.headers['Cache-Control'] = 'public, max-age={}, immutable'.format(
+        app.config['ASSETS_MAX_AGE'])
+    return response
+
+
 @bp.route("/site-map", methods=('GET', 'POST'))
 def site_map():
     links = []
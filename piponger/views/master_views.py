@@ -7,22 +7,95 @@
 from flask import request, abort, jsonify, send_from_directory, Blueprint, render_template
 import models
 import tasks.master_tasks
-from main import db, auth, logger, pipong_is_master
+from main import app, db, auth, logger, pipong_is_master
 from datetime import datetime
 import inspect
 from sqlalchemy import inspect as isql
 from sqlalchemy import desc
-import networkx as nx
-import matplotlib.pyplot as plt
-from networkx.readwrite import json_graph
+from sqlalchemy import func
 import json
-from matplotlib.backends.backend_agg import FigureCanvasAgg as FigureCanvas
-import io
+import hashlib
+import threading
+import time
 from flask import Response
 
 bp = Blueprint('master', __name__, template_folder='templates')
 
 
+def negotiate_encoding():
+    """
+    :return: the preferred content encoding accepted by the client
+    """
+    return request.accept_encodings.best_match(
+        tasks.master_tasks.RESPONSE_ENCODINGS, default='identity')
+
+
+def encoded_response(body, mimetype, etag, encoding, max_age):
+    """
+    Build a conditional response with an encoded body
+    :param body: the body, already encoded
+    :param mimetype: the mimetype of the response
+    :param etag: the etag of the response (before the encoding)
+    :param encoding: the content encoding of the body
+    :param max_age: Cache-Control max-age, the clients revalidate the
+        response on every request if None
+    :return:
+    """
+    response = Response(body, mimetype=mimetype)
+    if encoding != 'identity':
+        response.headers['Content-Encoding'] = encoding
+    response.vary.add('Accept-Encoding')
+    response.set_etag('{}-{}'.format(etag, encoding))
+    response.cache_control.public = True
+    if max_age is None:
+        response.cache_control.no_cache = True
+    else:
+        response.cache_control.max_age = max_age
+    return response.make_conditional(request)
+
+
+def cached_graph_response(master_iteration_id, key):
+    """
+    Get a response from the response cache of the iteration
+    :param master_iteration_id: the master iteration id
+    :param key: the key of the response, the view and its arguments
+    :return: the response, None if it is not cached
+    """
+    encoding = negotiate_encoding()
+    cache_t = tasks.master_tasks.get_cached_response(
+        master_iteration_id, key, encoding)
+    if cache_t is None:
+        return None
+    return encoded_response(cache_t.data, cache_t.mimetype, cache_t.etag,
+                            encoding, app.config['MASTER_RESPONSE_MAX_AGE'])
+
+
+def graph_response(master_iteration_id, key, js_graph, final):
+    """
+    Serve a graph of an iteration, the response is added to the response
+    cache if the graph will not change any more
+    :param master_iteration_id: the master iteration id
+    :param key: the key of the response, the view and its arguments
+    :param js_graph: the graph
+    :param final: True if the graph will not change any more
+    :return: the response
+    """
+    encoding = negotiate_encoding()
+    data = json.dumps(js_graph, separators=(',', ':')).encode('utf-8')
+    mimetype = 'application/json'
+
+    if final:
+        etag, bodies = tasks.master_tasks.store_cached_response(
+            master_iteration_id, key, data, mimetype)
+        return encoded_response(bodies[encoding], mimetype, etag, encoding,
+                                app.config['MASTER_RESPONSE_MAX_AGE'])
+
+    # the analysis or the layout are not finished, not cached
+    body = tasks.master_tasks.compress_response(data, [encoding])[encoding]
+    return encoded_response(body, mimetype, hashlib.sha1(data).hexdigest(),
+                            encoding, None)
+
+
 def object_as_dict(obj):
     return {c.key: getattr(obj, c.key) for c in isql(obj).mapper.column_attrs}
 
@@ -121,7 +194,7 @@ def register_pinger_result():
             'msg': 'the master pinger iteration was not found'
         })
 
-    if pinger_iteration_t.status == "FINISHED":
+    if pinger_iteration_t.status in ("FINISHED", "TIMED_OUT"):
         logger.error("{}: Error, the pinger iteration was finished. "
                      "Pinger iteration:{} status:{}".format(
             current_f_name, pinger_iteration_t.id,
@@ -134,10 +207,25 @@ def register_pinger_result():
         })
 
     s = db.session()
-    for e in pinger_result:
-        e['pinger_address'] = ip_addr
+    if isinstance(pinger_result, dict):
+        # summary of the results already reduced by the pinger
+        pinger_result['pinger_address'] = ip_addr
+    else:
+        for e in pinger_result:
+            e['pinger_address'] = ip_addr
+
+    if app.config['MASTER_INCREMENTAL_ANALYSIS']:
+        tasks.master_tasks.fold_pinger_result(master_iteration_id,
+                                              pinger_result)
 
-    pinger_iteration_t.result = str(pinger_result)
+    if app.config['MASTER_PATH_RESULT_TABLE'] and \
+            not isinstance(pinger_result, dict):
+        tasks.master_tasks.store_pinger_path_results(
+            master_iteration_id, pinger_iteration_t.id, pinger_result)
+
+    # the master status is not invalidated, the snapshot counts the
+    # results (get_master_status_snapshot)
+    pinger_iteration_t.result = pinger_result
     pinger_iteration_t.status = "FINISHED"
     s.commit()
 
@@ -150,19 +238,345 @@ def register_pinger_result():
         "{}: check_master_iteration_done: {}".format(
             current_f_name, res))
 
+    # only the progress changed, the master status is not computed again
+    tasks.master_tasks.publish_master_event(
+        'pinger_result', master_iteration_id=int(master_iteration_id),
+        pinger_address=ip_addr, progress=res)
+
     if res['is_finished']:
 
-        # big info message on the logs for easy visualization
-        logger.info("{}: ################################".format(current_f_name))
-        logger.info("{}: # ITERATION id:{} FINISHED".format(current_f_name, master_iteration_id))
-        logger.info("{}: ################################".format(current_f_name))
+        # analyse last iteration results, only the first request of the
+        # iteration enqueues the analysis
+        analysis = tasks.master_tasks.request_iteration_analysis(
+            master_iteration_id)
 
-        # analyse last iteration results
-        tasks.master_tasks.analyse_iteration.apply_async(args=[master_iteration_id], kwargs={})
+        if analysis['requested']:
+            # big info message on the logs for easy visualization
+            logger.info("{}: ################################".format(current_f_name))
+            logger.info("{}: # ITERATION id:{} FINISHED".format(current_f_name, master_iteration_id))
+            logger.info("{}: ################################".format(current_f_name))
+
+        return jsonify({'result': 'success', 'analysis': analysis})
 
     return jsonify({'result': 'success'})
 
 
+@bp.route('/api/v1.0/master/provisional_result/<master_iteration_id>',
+          methods=['GET'])
+@auth.login_required
+def provisional_result(master_iteration_id):
+    """
+    Get the problematic hosts of the pinger results received so far for
+    an iteration (only with MASTER_INCREMENTAL_ANALYSIS enabled)
+    :return:
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        return jsonify({
+            'result': 'failure',
+            'msg': 'this server is not a master'
+        })
+
+    if not app.config['MASTER_INCREMENTAL_ANALYSIS']:
+        return jsonify({
+            'result': 'failure',
+            'msg': 'incremental analysis is not enabled'
+        })
+
+    master_it = db.session.query(models.MasterIteration).filter_by(
+        id=master_iteration_id).first()
+    if master_it is None:
+        return jsonify({
+            'result': 'failure',
+            'msg': 'the master iteration was not found'
+        })
+
+    # read only, the iteration is finished by the pinger results and
+    # finish_old_iterations
+    progress = tasks.master_tasks.get_master_iteration_progress(
+        master_iteration_id, master_it.status)
+    outliers = tasks.master_tasks.get_provisional_problematic_hosts(
+        master_iteration_id)
+    logger.debug("{}: Master iteration:{} provisional outliers:{}".format(
+        current_f_name, master_iteration_id, outliers))
+
+    return jsonify({
+        'result': 'success',
+        'progress': progress,
+        'problematic_hosts': [{'host': h, 'score': score}
+                              for h, score in outliers]
+    })
+
+
+@bp.route('/api/v1.0/master/path_results/<master_iteration_id>',
+          methods=['GET'])
+@auth.login_required
+def path_results(master_iteration_id):
+    """
+    Get the path results of an iteration from master_path_result, one per
+    measured path, optionally only the paths to the 'ponger_address'
+    argument (only with MASTER_PATH_RESULT_TABLE enabled)
+    :return:
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        return jsonify({
+            'result': 'failure',
+            'msg': 'this server is not a master'
+        })
+
+    if not app.config['MASTER_PATH_RESULT_TABLE']:
+        return jsonify({
+            'result': 'failure',
+            'msg': 'the path result table is not enabled'
+        })
+
+    results = tasks.master_tasks.get_path_results(
+        master_iteration_id, request.args.get('ponger_address'))
+    logger.debug("{}: Master iteration:{} path results:{}".format(
+        current_f_name, master_iteration_id, len(results)))
+
+    return jsonify({'result': 'success', 'path_results': results})
+
+
+@bp.route('/api/v1.0/master/replay', methods=['POST'])
+@auth.login_required
+def create_replay():
+    """
+    Replay the analysis of stored iterations with another parameter set
+    The JSON body selects the iterations with 'master_iteration_id' or
+    with 'start_date' / 'end_date' ('%Y-%m-%d %H:%M:%S'), and 'parameters'
+    is a dict of analysis config keys with their new values
+    :return:
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        return jsonify({
+            'result': 'failure',
+            'msg': 'this server is not a master'
+        })
+
+    data = request.get_json() or {}
+    parameters = data.get('parameters', {})
+
+    fixed_parameters = [
+        k for k in parameters
+        if k in tasks.master_tasks.REPLAY_FIXED_PARAMETERS
+    ]
+    if fixed_parameters:
+        return jsonify({
+            'result': 'failure',
+            'msg': 'the replays do not use the hop baseline: {}'.format(
+                fixed_parameters)
+        })
+
+    unknown_parameters = [
+        k for k in parameters
+        if k not in tasks.master_tasks.REPLAY_PARAMETERS
+    ]
+    if unknown_parameters:
+        return jsonify({
+            'result': 'failure',
+            'msg': 'unknown parameters: {}'.format(unknown_parameters)
+        })
+
+    try:
+        dates = {
+            k: datetime.strptime(data[k], '%Y-%m-%d %H:%M:%S')
+            for k in ('start_date', 'end_date') if data.get(k)
+        }
+    except ValueError as e:
+        return jsonify({'result': 'failure', 'msg': str(e)})
+
+    if data.get('master_iteration_id') is None and not dates:
+        return jsonify({
+            'result': 'failure',
+            'msg': 'a master_iteration_id or a date range is required'
+        })
+
+    s = db.session()
+    replay = models.AnalysisReplay(
+        parameters=parameters,
+        master_iteration_id=data.get('master_iteration_id'),
+        **dates)
+    s.add(replay)
+    s.commit()
+
+    logger.info("{}: Replay {} created".format(current_f_name, replay.id))
+    tasks.master_tasks.replay_iterations.apply_async(
+        args=[replay.id], kwargs={})
+
+    return jsonify({'result': 'success', 'analysis_replay_id': replay.id})
+
+
+@bp.route('/api/v1.0/master/replay/<analysis_replay_id>', methods=['GET'])
+@auth.login_required
+def get_replay(analysis_replay_id):
+    """
+    Get the progress, the throughput and the result set of a replay
+    :return:
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        return jsonify({
+            'result': 'failure',
+            'msg': 'this server is not a master'
+        })
+
+    replay = db.session.query(models.AnalysisReplay).filter_by(
+        id=analysis_replay_id).first()
+    if replay is None:
+        logger.error("{}: No AnalysisReplay found with id: {}".format(
+            current_f_name, analysis_replay_id))
+        abort(404)
+
+    replay_results = db.session.query(models.AnalysisReplayResult).filter_by(
+        analysis_replay_id=analysis_replay_id).order_by(
+        models.AnalysisReplayResult.master_iteration_id,
+        models.AnalysisReplayResult.id)
+
+    replay_dict = object_as_dict(replay)
+    replay_dict['iterations_per_second'] = (
+        replay.iteration_count / replay.elapsed_seconds
+        if replay.elapsed_seconds else 0.0)
+    replay_dict['results'] = [{
+        'master_iteration_id': r.master_iteration_id,
+        'problematic_host': r.problematic_host,
+        'score': float(r.score)
+    } for r in replay_results]
+
+    return jsonify({'result': 'success', 'replay': replay_dict})
+
+
+# events streams open in this process, each one holds a uwsgi thread
+_events_streams = 0
+_events_streams_lock = threading.Lock()
+
+
+def release_events_stream():
+    """
+    Release the slot of an events stream of this process
+    :return:
+    """
+    global _events_streams
+    with _events_streams_lock:
+        _events_streams -= 1
+
+
+@bp.route('/api/v1.0/master/events', methods=['GET'])
+@auth.login_required
+def master_events():
+    """
+    Stream of the master events (server-sent events): iteration_created,
+    pinger_result, iteration_finished, analysis_finished and nodes_changed
+    The data of every event is a JSON object with the master status
+    ('master_info', same as the home view), the first event ('status')
+    is the current one. pinger_result only has the 'progress' of its
+    iteration. The dashboards receive the changes without polling and
+    without querying the database
+    At most MASTER_EVENTS_MAX_STREAMS streams per process are served, the
+    next dashboards get a 503 and poll '/'. A stream ends after
+    MASTER_EVENTS_STREAM_SECONDS, the browser opens it again
+    :return:
+    """
+    global _events_streams
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master() or not app.config['MASTER_EVENTS_REDIS_URL']:
+        abort(404)
+
+    with _events_streams_lock:
+        available = _events_streams < app.config['MASTER_EVENTS_MAX_STREAMS']
+        if available:
+            _events_streams += 1
+    if not available:
+        logger.debug("{}: too many events streams, {} polls".format(
+            current_f_name, request.remote_addr))
+        response = Response("too many events streams", status=503,
+                            mimetype='text/plain')
+        response.headers['Retry-After'] = str(
+            app.config['MASTER_EVENTS_STREAM_SECONDS'])
+        return response
+
+    try:
+        # subscribe first, the events published meanwhile are not lost
+        pubsub = tasks.master_tasks.subscribe_master_events()
+        first_event = tasks.master_tasks.format_master_event(
+            'status', {'event': 'status',
+                       'master_info':
+                           tasks.master_tasks.get_master_status_snapshot()})
+    except Exception:
+        release_events_stream()
+        raise
+    keepalive = app.config['MASTER_EVENTS_KEEPALIVE_SECONDS']
+    end_time = time.time() + app.config['MASTER_EVENTS_STREAM_SECONDS']
+
+    logger.debug("{}: dashboard subscribed from {}".format(
+        current_f_name, request.remote_addr))
+
+    def generate():
+        yield first_event
+        while time.time() < end_time:
+            message = pubsub.get_message(timeout=keepalive)
+            if message is None:
+                # comment line, keeps the connection open
+                yield ": keepalive\n\n"
+            else:
+                yield message['data'].decode('utf-8')
+
+    def close():
+        pubsub.close()
+        release_events_stream()
+
+    response = Response(generate(), mimetype='text/event-stream')
+    # also when the stream was never read (client gone)
+    response.call_on_close(close)
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@bp.route('/api/v1.0/master/changes', methods=['GET'])
+@auth.login_required
+def master_changes():
+    """
+    Delta sync of the registered nodes and the iterations: the nodes added,
+    changed and removed and the iterations added and changed after the
+    version 'since' (see get_master_changes). The next request uses the
+    returned 'version' as 'since', without 'since' (or when it is too old)
+    the whole state is returned with 'full' set
+    :return:
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        return jsonify({
+            'result': 'failure',
+            'msg': 'this server is not a master'
+        })
+
+    since = request.args.get('since')
+    if since is not None:
+        try:
+            since = int(since)
+        except ValueError:
+            logger.error("{}: Invalid since version: {}".format(
+                current_f_name, since))
+            abort(400)
+
+    changes = tasks.master_tasks.get_master_changes(since)
+    changes['result'] = 'success'
+    return jsonify(changes)
+
+
 @bp.route('/api/v1.0/master/register_ponger', methods=['POST'])
 @auth.login_required
 def register_ponger():
@@ -189,18 +603,32 @@ def register_ponger():
 
     s = db.session()
 
+    changed = not registrered_t
     if not registrered_t:
         pingp_t = models.RegisteredPongerNode(
             address=ip_addr, api_port=api_port, api_protocol=api_protocol)
         s.add(pingp_t)
+        tasks.master_tasks.invalidate_master_status()
         logger.debug(
             "{}: Registering pong: host:{} api_port:{} api_protocol:{}".format(
                 current_f_name, ip_addr, api_port, api_protocol))
     else:
         registrered_t.last_updated_date = datetime.now()
+        if registrered_t.api_protocol != api_protocol:
+            # returned as changed by the delta sync (get_master_changes)
+            registrered_t.api_protocol = api_protocol
+            registrered_t.change_version = func.txid_current()
+            tasks.master_tasks.invalidate_master_status()
+            changed = True
+            logger.debug(
+                "{}: Updating pong: host:{} api_port:{} api_protocol:{}".format(
+                    current_f_name, ip_addr, api_port, api_protocol))
 
     s.commit()
 
+    if changed:
+        tasks.master_tasks.publish_master_event('nodes_changed')
+
     return jsonify({'result': 'success'})
 
 
@@ -230,18 +658,32 @@ def register_pinger():
 
     s = db.session()
 
+    changed = not registrered_t
     if not registrered_t:
         pingp_t = models.RegisteredPingerNode(
             address=ip_addr, api_port=api_port, api_protocol=api_protocol)
         s.add(pingp_t)
+        tasks.master_tasks.invalidate_master_status()
         logger.debug(
             "{}: Registering ping: host:{} api_port:{} api_protocol:{}".format(
                 current_f_name, ip_addr, api_port, api_protocol))
     else:
         registrered_t.last_updated_date = datetime.now()
+        if registrered_t.api_protocol != api_protocol:
+            # returned as changed by the delta sync (get_master_changes)
+            registrered_t.api_protocol = api_protocol
+            registrered_t.change_version = func.txid_current()
+            tasks.master_tasks.invalidate_master_status()
+            changed = True
+            logger.debug(
+                "{}: Updating ping: host:{} api_port:{} api_protocol:{}".format(
+                    current_f_name, ip_addr, api_port, api_protocol))
 
     s.commit()
 
+    if changed:
+        tasks.master_tasks.publish_master_event('nodes_changed')
+
     return jsonify({'result': 'success'})
 
 
@@ -249,7 +691,9 @@ def register_pinger():
 @auth.login_required
 def get_result_plot(master_iteration_id):
     """
-    Get the last result plot using matplotlib
+    Get the result plot of an iteration, pre-rendered by
+    render_iteration_plot. The 'format' argument selects the image
+    format: png (default) or svg. 202 if the plot is not rendered yet
     :return:
     """
 
@@ -261,6 +705,12 @@ def get_result_plot(master_iteration_id):
                 current_f_name))
         abort(404)
 
+    plot_format = request.args.get('format', 'png')
+    if plot_format not in tasks.master_tasks.PLOT_MIMETYPES:
+        logger.error("{}: Unknown plot format: {}".format(
+            current_f_name, plot_format))
+        abort(400)
+
     master_it = db.session.query(models.MasterIteration).filter_by(id=master_iteration_id).first()
     if master_it is None:
         logger.error("{}: No MasterIteration found with id: {}".format(
@@ -272,43 +722,36 @@ def get_result_plot(master_iteration_id):
             current_f_name, master_iteration_id))
         abort(404)
 
-    js_graph = json.loads(master_it.json_graph)
-    G = json_graph.node_link_graph(js_graph)
-
-    pos = nx.drawing.nx_agraph.graphviz_layout(G, prog='dot')
-    node_labels = {}
-    for k, v in G.nodes(data=True):
-        node_labels[k] = '{}\n{:.2f}%'.format(k, v['mean'])
-
-    nx.draw_networkx_labels(G, pos, labels=node_labels, font_size=5)
-
-    node_colors = [G.node[n]['mean'] for n in G.nodes()]
-
-    nx.draw_networkx_nodes(
-        G,
-        pos,
-        node_color=node_colors,
-        node_size=600,
-        node_shape='o',
-        cmap=plt.cm.OrRd,
-        vmin=0.,
-        vmax=100.)
-    nx.draw_networkx_edges(
-        G, pos, arrowstyle='-|>', arrowsize=20, edge_color='black', width=1)
-
-    fig = plt.gcf()
-    fig.set_size_inches(30, 20)
-    plt.savefig('/tmp/last_generated_result.png', dpi=250)
-
-    output = io.BytesIO()
-    FigureCanvas(fig).print_png(output)
-    return Response(output.getvalue(), mimetype='image/png')
+    plot_t = db.session.query(models.MasterIterationPlot).filter_by(
+        master_iteration_id=master_it.id, format=plot_format).first()
+    if plot_t is None:
+        # not rendered yet (iterations analysed before the plots were
+        # stored), it will be available once rendered, the render is
+        # enqueued once for all the requests
+        requested = tasks.master_tasks.request_iteration_plot(master_it.id)
+        logger.info("{}: No plot rendered for id: {}, render requested:{}".format(
+            current_f_name, master_iteration_id, requested))
+        response = Response("plot not rendered yet", status=202,
+                            mimetype='text/plain')
+        response.headers['Retry-After'] = '10'
+        return response
+
+    response = Response(
+        plot_t.data,
+        mimetype=tasks.master_tasks.PLOT_MIMETYPES[plot_format])
+    response.set_etag(plot_t.graph_hash)
+    response.last_modified = plot_t.created_date
+    response.cache_control.public = True
+    response.cache_control.max_age = app.config['MASTER_PLOT_MAX_AGE']
+    return response.make_conditional(request)
 
 @bp.route('/get_result_plot_json/<master_iteration_id>', methods=['GET'])
 @auth.login_required
 def get_result_plot_json(master_iteration_id):
     """
     Get the last result plot data in json
+    The 'level' argument selects the analysis level of the graph:
+    host, subnet (default) or aggregate
     :return:
     """
 
@@ -320,30 +763,179 @@ def get_result_plot_json(master_iteration_id):
                 current_f_name))
         abort(404)
 
+    level = request.args.get('level',
+                             tasks.master_tasks.DEFAULT_ANALYSIS_LEVEL)
+    if level not in tasks.master_tasks.ANALYSIS_LEVELS:
+        logger.error("{}: Unknown analysis level: {}".format(
+            current_f_name, level))
+        abort(400)
+
+    cache_key = 'plot_json:{}'.format(level)
+    response = cached_graph_response(master_iteration_id, cache_key)
+    if response is not None:
+        return response
+
     master_it = db.session.query(models.MasterIteration).filter_by(id=master_iteration_id).first()
     if master_it is None:
         logger.error("{}: No MasterIteration found with id: {}".format(
             current_f_name, master_iteration_id))
         abort(404)
 
-    if not master_it.json_graph:
-        logger.error("{}: Empty json_graph for id: {}".format(
-            current_f_name, master_iteration_id))
+    json_graph_data = master_it.json_graph
+    if level != tasks.master_tasks.DEFAULT_ANALYSIS_LEVEL:
+        graph_t = db.session.query(models.MasterIterationGraph).filter_by(
+            master_iteration_id=master_iteration_id, level=level).first()
+        json_graph_data = graph_t.json_graph if graph_t else None
+
+    if not json_graph_data:
+        logger.error("{}: Empty json_graph for id: {} level: {}".format(
+            current_f_name, master_iteration_id, level))
         abort(404)
 
-    js_graph = json.loads(master_it.json_graph)
+    js_graph = json.loads(json_graph_data)
 
     for e in js_graph['links']:
         e['left'] = False
         e['right'] = True
 
-    return jsonify(js_graph)
+    # the graph of a finished iteration does not change once laid out
+    final = (master_it.analysis_status == 'SUCCESS' and
+             all('x' in n for n in js_graph['nodes']))
+    return graph_response(master_it.id, cache_key, js_graph, final)
+
+
+@bp.route('/get_result_clusters_json/<master_iteration_id>', methods=['GET'])
+@auth.login_required
+def get_result_clusters_json(master_iteration_id):
+    """
+    Get the collapsed graph of an iteration: the nodes of the 'level'
+    argument (aggregate by default) are clusters of the finer levels
+    :return:
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        logger.debug(
+            "{}: This node is not a master".format(
+                current_f_name))
+        abort(404)
+
+    level = request.args.get('level', 'aggregate')
+    if level not in tasks.master_tasks.ANALYSIS_LEVELS:
+        logger.error("{}: Unknown analysis level: {}".format(
+            current_f_name, level))
+        abort(400)
+
+    cache_key = 'clusters_json:{}'.format(level)
+    response = cached_graph_response(master_iteration_id, cache_key)
+    if response is not None:
+        return response
+
+    master_it = db.session.query(models.MasterIteration).filter_by(id=master_iteration_id).first()
+    if master_it is None:
+        logger.error("{}: No MasterIteration found with id: {}".format(
+            current_f_name, master_iteration_id))
+        abort(404)
+
+    js_graph = tasks.master_tasks.get_cluster_graph(master_it.id, level)
+    final = (master_it.analysis_status == 'SUCCESS' and
+             all('x' in n for n in js_graph['nodes']))
+    return graph_response(master_it.id, cache_key, js_graph, final)
+
+
+@bp.route('/get_result_cluster_json/<master_iteration_id>/<cluster>', methods=['GET'])
+@auth.login_required
+def get_result_cluster_json(master_iteration_id, cluster):
+    """
+    Expand a cluster of the collapsed graph: the nodes inside the network
+    'cluster' of the 'level' argument (aggregate by default), the other
+    clusters linked to them are kept collapsed
+    :return:
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        logger.debug(
+            "{}: This node is not a master".format(
+                current_f_name))
+        abort(404)
+
+    level = request.args.get('level', 'aggregate')
+    if level not in tasks.master_tasks.ANALYSIS_LEVELS[1:]:
+        logger.error("{}: Analysis level without clusters: {}".format(
+            current_f_name, level))
+        abort(400)
+
+    subgraph = tasks.master_tasks.get_expanded_cluster(
+        master_iteration_id, level, cluster)
+    if subgraph is None:
+        logger.error("{}: No cluster {} found for id: {} level: {}".format(
+            current_f_name, cluster, master_iteration_id, level))
+        abort(404)
+
+    return jsonify(subgraph)
+
+
+@bp.route('/get_result_neighbourhood_json/<master_iteration_id>', methods=['GET'])
+@auth.login_required
+def get_result_neighbourhood_json(master_iteration_id):
+    """
+    Get the nodes at most 'hops' links away (1 by default, at most
+    MASTER_SUBGRAPH_MAX_HOPS) of the 'node' arguments, or of the problematic
+    hosts of the iteration if there is none, on the 'level' argument
+    (subnet by default)
+    :return:
+    """
+
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    if not pipong_is_master():
+        logger.debug(
+            "{}: This node is not a master".format(
+                current_f_name))
+        abort(404)
+
+    level = request.args.get('level',
+                             tasks.master_tasks.DEFAULT_ANALYSIS_LEVEL)
+    if level not in tasks.master_tasks.ANALYSIS_LEVELS:
+        logger.error("{}: Unknown analysis level: {}".format(
+            current_f_name, level))
+        abort(400)
+
+    try:
+        hops = int(request.args.get('hops', 1))
+    except ValueError:
+        abort(400)
+    hops = max(0, min(hops, app.config['MASTER_SUBGRAPH_MAX_HOPS']))
+
+    master_it = db.session.query(models.MasterIteration).filter_by(id=master_iteration_id).first()
+    if master_it is None:
+        logger.error("{}: No MasterIteration found with id: {}".format(
+            current_f_name, master_iteration_id))
+        abort(404)
+
+    seeds = request.args.getlist('node')
+    if not seeds:
+        # the problematic hosts are nodes of the subnet level
+        if level != tasks.master_tasks.DEFAULT_ANALYSIS_LEVEL:
+            logger.error("{}: No node given for level: {}".format(
+                current_f_name, level))
+            abort(400)
+        seeds = [r.problematic_host for r in master_it.master_iteration_result]
+
+    return jsonify(tasks.master_tasks.get_node_neighbourhood(
+        master_it.id, level, seeds, hops))
+
 
 @bp.route('/get_result_plot_js/<master_iteration_id>', methods=['GET'])
 @auth.login_required
 def get_result_plot_js(master_iteration_id):
     """
     Get the last result plot using html/javascript
+    The page draws the graph of /get_result_plot_json with the node
+    positions computed by the master, the 'level' argument is passed to it
     :return:
     """
 
@@ -355,17 +947,30 @@ def get_result_plot_js(master_iteration_id):
                 current_f_name))
         abort(404)
 
-    master_it = db.session.query(models.MasterIteration).filter_by(id=master_iteration_id).first()
+    level = request.args.get('level',
+                             tasks.master_tasks.DEFAULT_ANALYSIS_LEVEL)
+    if level not in tasks.master_tasks.ANALYSIS_LEVELS:
+        logger.error("{}: Unknown analysis level: {}".format(
+            current_f_name, level))
+        abort(400)
+
+    # the graph itself is not loaded
+    master_it = db.session.query(
+        models.MasterIteration.id,
+        models.MasterIteration.json_graph.isnot(None).label('has_graph')).filter_by(
+        id=master_iteration_id).first()
     if master_it is None:
         logger.error("{}: No MasterIteration found with id: {}".format(
             current_f_name, master_iteration_id))
         abort(404)
 
-    if not master_it.json_graph:
+    if not master_it.has_graph:
         logger.error("{}: Empty json_graph for id: {}".format(
             current_f_name, master_iteration_id))
         abort(404)
 
-    return render_template('master/result_plot_js.html', title='Result Plot JS', graph_data_json=master_it.json_graph, master_iteration_id=master_iteration_id)
+    # the graph is not embedded in the page, it is loaded from
+    # get_result_plot_json
+    return render_template('master/result_plot_js.html', title='Result Plot JS', master_iteration_id=master_it.id, level=level)
 
 
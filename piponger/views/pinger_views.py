@@ -28,8 +28,15 @@ def start_session():
             }
         },
         "tracert_qty": 20,
-        "master_iteration_id": "myremoteid02"
+        "master_iteration_id": "myremoteid02",
+        "result_summary": {
+            "default_netmask": 24,
+            "prefix_netmasks": {},
+            "aggregate_netmask": 16
+        }
     }
+    "result_summary" is optional, if present the pinger sends a summary
+    of its results grouped with this segmentation instead of the paths
     :return:
     """
     current_f_name = inspect.currentframe().f_code.co_name
@@ -62,7 +69,8 @@ def start_session():
                 status="CREATED",
                 remote_id=str(remote_id),
                 remote_address=ip_addr,
-                tracert_qty=tracert_qty)
+                tracert_qty=tracert_qty,
+                result_summary=data.get('result_summary'))
             s.add(iter_t)
             s.flush()
 
@@ -101,3 +109,40 @@ def start_session():
         jsonify({'result': 'failure', 'msg': exception_log})
 
     return jsonify(response)
+
+
+@bp.route('/api/v1.0/iteration_result/<remote_id>', methods=['GET'])
+@auth.login_required
+def iteration_result(remote_id):
+    """
+    Get the raw results (the paths) of an iteration, also available when
+    only a summary of them was sent to the master. The iteration must have
+    been started by the master requesting it (same remote address)
+    :param remote_id: the master iteration id of the iteration
+    :return:
+    """
+    current_f_name = inspect.currentframe().f_code.co_name
+
+    logger.info('{}: Iteration_result called'.format(current_f_name))
+
+    if not pipong_is_pinger():
+        return jsonify({
+            'result': 'failure',
+            'msg': 'this server is not a pinger'
+        })
+
+    iter_t = db.session.query(models.PingerIteration).filter_by(
+        remote_id=str(remote_id),
+        remote_address=request.remote_addr).first()
+    if iter_t is None:
+        return jsonify({
+            'result': 'failure',
+            'msg': 'iteration not found'
+        })
+
+    return jsonify({
+        'result': 'success',
+        'status': iter_t.status,
+        'iteration_result':
+            tasks.pinger_tasks.get_iteration_result(iter_t.id)
+    })